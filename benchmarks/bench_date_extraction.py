@@ -0,0 +1,63 @@
+"""Compare regex-prefiltered date-extraction with the former full-text dateparser search.
+
+The corpus consists of the synthetic sample-texts (also as long, dense pages) and
+optionally of real OCR-results (.txt) from a directory.
+
+usage:
+    python benchmarks/bench_date_extraction.py [directory with .txt files] [--lang de]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from synthetic_documents import sample_texts
+
+sys.path.insert(0, Path(__file__).parent.parent.as_posix())
+
+from photo2pdf.date_extraction import extract_date
+from photo2pdf.date_extraction import extract_date_full_search
+
+
+def build_corpus(directory: Path | None, lang: str) -> list[tuple[str, str, str]]:
+    """Get (name, language, text) - short pages, dense pages and OCR-results."""
+    corpus = [(f"sample_{id1}", id1, text) for id1, text in sample_texts.items()]
+    corpus += [(f"dense_{id1}", id1, "\n".join(20 * [text])) for id1, text in sample_texts.items()]
+    if directory is not None:
+        corpus += [
+            (path.name, lang, path.read_text(encoding="utf-8-sig"))
+            for path in sorted(directory.glob("*.txt"))
+        ]
+    return corpus
+
+
+def measure(fn: callable, corpus: list[tuple[str, str, str]]) -> tuple[list[str | None], float]:
+    """Run fn on whole corpus, return results & duration."""
+    results = []
+    timestamp = time.perf_counter()
+    for _, lang, text in corpus:
+        results.append(fn(text, lang))
+    return results, time.perf_counter() - timestamp
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark date-extraction")
+    parser.add_argument("directory", type=Path, nargs="?", help="with OCR-results (.txt)")
+    parser.add_argument("--lang", default="de", help="ISO 639-1 language of the .txt files")
+    args = parser.parse_args()
+
+    corpus_ = build_corpus(args.directory, args.lang)
+    # warm up caches & locale-loading, so only extraction is measured
+    extract_date(corpus_[0][2], corpus_[0][1])
+    extract_date_full_search(corpus_[0][2], corpus_[0][1])
+
+    dates_fast, duration_fast = measure(extract_date, corpus_)
+    dates_full, duration_full = measure(extract_date_full_search, corpus_)
+
+    print(f"{'document':<24}{'chars':>8}{'prefiltered':>14}{'full search':>14}")
+    for (name, _, text), date_fast, date_full in zip(corpus_, dates_fast, dates_full, strict=True):
+        print(f"{name:<24}{len(text):>8}{date_fast!s:>14}{date_full!s:>14}")
+    agreement = sum(a == b for a, b in zip(dates_fast, dates_full, strict=True)) / len(corpus_)
+    print(f"\nprefiltered: {duration_fast:.3f} s, full search: {duration_full:.3f} s")
+    print(f"speedup: {duration_full / max(duration_fast, 1e-9):.1f} x, agreement: {agreement:.0%}")
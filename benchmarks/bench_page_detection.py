@@ -0,0 +1,74 @@
+"""Compare the page-detectors (template matching vs. contour) in speed and corner-error.
+
+The synthetic photos store the true sheet-corners as ground truth, the error is
+the distance (in pixels of the photo) between detected and true corner.
+
+usage:
+    python benchmarks/bench_page_detection.py [--corpus benchmarks/corpus] [--count 12]
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+from synthetic_documents import generate_corpus
+from synthetic_documents import load_ground_truth
+
+path_here = Path(__file__).parent
+sys.path.insert(0, path_here.parent.as_posix())
+
+from photo2pdf.photo_preprocessing import SheetFilter  # noqa: E402
+from photo2pdf.photo_preprocessing import page_detectors  # noqa: E402
+from photo2pdf.template_bank import bank_scales  # noqa: E402
+
+a4_mm = (210, 297)
+
+
+def measure(
+    detector: str, images: list[Path], template_scale: float = 1.0
+) -> list[tuple[float, list[float] | None]]:
+    """Detect corners of every image, return duration & error per corner (None if failed)."""
+    sheet = SheetFilter(a4_mm, detector=detector, template_scale=template_scale)
+    results = []
+    for image in images:
+        sheet.open_picture(image)
+        timestamp = time.perf_counter()
+        corners = sheet.find_corners()
+        duration = time.perf_counter() - timestamp
+        truth = load_ground_truth(image)["corners"]
+        errors = None
+        if corners is not None:
+            errors = [math.dist(found, true) for found, true in zip(corners, truth, strict=True)]
+        results.append((duration, errors))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark page-detection")
+    parser.add_argument("--corpus", type=Path, default=path_here / "corpus")
+    parser.add_argument("--count", type=int, default=12, help="size of generated corpus")
+    args = parser.parse_args()
+
+    if not any(args.corpus.glob("*.jpg")):
+        print(f"generating corpus with {args.count} documents in {args.corpus}")
+        generate_corpus(args.corpus, args.count)
+    images_ = [path for path in sorted(args.corpus.glob("*.jpg")) if load_ground_truth(path)]
+
+    print(
+        f"{'detector':<16}{'mean ms':>10}{'max ms':>10}{'mean px':>10}{'max px':>10}{'failed':>8}"
+    )
+    variants = [("template", scale) for scale in bank_scales]
+    variants += [(detector, 1.0) for detector in page_detectors if detector != "template"]
+    for detector_, scale_ in variants:
+        results_ = measure(detector_, images_, scale_)
+        durations = [duration * 1000 for duration, _ in results_]
+        errors_ = [error for _, errors in results_ if errors is not None for error in errors]
+        failed = sum(errors is None for _, errors in results_)
+        name = f"{detector_}@{scale_}"
+        print(
+            f"{name:<16}{sum(durations) / len(durations):>10.1f}{max(durations):>10.1f}"
+            f"{sum(errors_) / max(len(errors_), 1):>10.2f}{max(errors_, default=0):>10.2f}"
+            f"{failed:>8}"
+        )
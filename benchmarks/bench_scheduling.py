@@ -0,0 +1,84 @@
+"""Makespan of a mixed batch in directory-order vs. longest-first (estimated cost).
+
+Every photo of a mixed corpus (many small, few large documents) gets processed
+once to measure its duration. The dispatch of the pool (an idle worker takes the
+next file) is then replayed for several worker-counts, so the result does not
+depend on the cores of the benchmark-machine.
+
+usage:
+    python benchmarks/bench_scheduling.py [--corpus benchmarks/corpus_mixed] [--workers 4 8 16]
+"""
+
+import argparse
+import heapq
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from synthetic_documents import generate_document
+from synthetic_documents import sample_texts
+
+path_here = Path(__file__).parent
+sys.path.insert(0, path_here.parent.as_posix())
+
+from photo2pdf import ImageProcessor  # noqa: E402
+from photo2pdf.scheduling import CostModel  # noqa: E402
+
+
+def generate_mixed_corpus(path: Path, small: int = 12, large: int = 3, seed: int = 7) -> None:
+    """Small photos (7 MP) first, the large ones (29 MP) come last in directory-order."""
+    path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    langs = sorted(sample_texts)
+    for index in range(small + large):
+        dpi, canvas = (150, (2400, 3000)) if index < small else (300, (4800, 6000))
+        path_image = path / f"mixed_{index:04d}.jpg"
+        generate_document(path_image, langs[index % len(langs)], rng, dpi, canvas)
+
+
+def makespan(order: list[Path], durations: dict[Path, float], workers: int) -> float:
+    """Replay dispatch: each file goes to the worker that gets idle first."""
+    idle_at = [0.0] * workers
+    for path in order:
+        heapq.heappush(idle_at, heapq.heappop(idle_at) + durations[path])
+    return max(idle_at)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark longest-first scheduling")
+    parser.add_argument("--corpus", type=Path, default=path_here / "corpus_mixed")
+    parser.add_argument("--workers", type=int, nargs="*", default=[2, 4, 8, 16])
+    args = parser.parse_args()
+
+    if not any(args.corpus.glob("*.jpg")):
+        print(f"generating mixed corpus in {args.corpus}")
+        generate_mixed_corpus(args.corpus)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        images = []
+        for image in sorted(args.corpus.glob("*.jpg")):
+            images.append(workdir / image.name)
+            shutil.copy2(image, images[-1])
+        estimated = CostModel().order(images)  # from headers only
+        processor = ImageProcessor(
+            workdir, save_meta=False, sheet_size_mm=(210, 297), use_manifest=False
+        )
+        durations_ = {}
+        for image in images:
+            result = processor.process_one(image)
+            durations_[image] = result.durations["total"][0]
+
+    total = sum(durations_.values())
+    print(f"{len(images)} files, {total:.1f} s of work, longest {max(durations_.values()):.1f} s")
+    print(f"{'workers':>8}{'dir-order s':>14}{'longest-first s':>18}{'bound s':>10}{'gain':>8}")
+    for workers_ in args.workers:
+        naive = makespan(images, durations_, workers_)
+        scheduled = makespan(estimated, durations_, workers_)
+        bound = max(total / workers_, *durations_.values())
+        print(
+            f"{workers_:>8}{naive:>14.2f}{scheduled:>18.2f}{bound:>10.2f}"
+            f"{1 - scheduled / naive:>8.0%}"
+        )
@@ -0,0 +1,242 @@
+"""Reproducible benchmark of the processing pipeline on synthetic documents.
+
+Every configuration runs in a fresh interpreter on a fresh copy of the corpus and
+measures throughput, peak RSS, OCR character error rate (CER) and output size.
+Results can be stored as baseline and later runs get compared against it.
+
+usage:
+    python benchmarks/run_benchmarks.py                   # run & compare with baseline
+    python benchmarks/run_benchmarks.py --save-baseline   # run & store as new baseline
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_documents import generate_corpus
+from synthetic_documents import load_ground_truth
+
+try:
+    import resource  # not available on windows
+except ImportError:
+    resource = None
+
+path_here = Path(__file__).parent
+sys.path.insert(0, path_here.parent.as_posix())
+
+from photo2pdf import ImageProcessor  # noqa: E402
+
+a4_mm = (210, 297)
+
+configurations: dict[str, dict] = {
+    "sp_plain": {"multiprocess": False},
+    "mp_plain": {"multiprocess": True},
+    "thread_plain": {"multiprocess": True, "backend": "thread"},
+    "mp_sheet_d40": {"multiprocess": True, "sheet_size_mm": a4_mm, "darken_percent": 40},
+    "mp_sheet_d50": {"multiprocess": True, "sheet_size_mm": a4_mm, "darken_percent": 50},
+    "mp_sheet_d60": {"multiprocess": True, "sheet_size_mm": a4_mm, "darken_percent": 60},
+    "mp_sheet_auto": {"multiprocess": True, "sheet_size_mm": a4_mm, "darken_percent": None},
+    "mp_sheet_contour": {"multiprocess": True, "sheet_size_mm": a4_mm, "page_detector": "contour"},
+    "mp_sheet_gs": {"multiprocess": True, "sheet_size_mm": a4_mm, "compress_level": 2},
+    # speed vs accuracy of the OCR-profiles (tessdata_fast / _best installed next to tessdata)
+    "mp_sheet_ocr_fast": {"multiprocess": True, "sheet_size_mm": a4_mm, "ocr_profile": "fast"},
+    "mp_sheet_ocr_best": {"multiprocess": True, "sheet_size_mm": a4_mm, "ocr_profile": "best"},
+    "mp_sheet_probe_fast": {
+        "multiprocess": True,
+        "sheet_size_mm": a4_mm,
+        "ocr_profile": "best",
+        "probe_profile": "fast",
+    },
+}
+
+# allowed relative deviation from baseline before it is reported as regression
+tolerances: dict[str, float] = {
+    "images_per_s": -0.10,
+    "cer": 0.01,  # absolute
+    "output_kib": 0.10,
+    "peak_rss_worker_mib": 0.15,
+}
+
+
+def levenshtein(reference: str, hypothesis: str) -> int:
+    """Edit distance with a rolling row (O(n*m) time, O(m) memory)."""
+    if len(reference) < len(hypothesis):
+        reference, hypothesis = hypothesis, reference
+    previous = list(range(len(hypothesis) + 1))
+    for index_ref, char_ref in enumerate(reference, start=1):
+        current = [index_ref]
+        for index_hyp, char_hyp in enumerate(hypothesis, start=1):
+            current.append(
+                min(
+                    previous[index_hyp] + 1,
+                    current[index_hyp - 1] + 1,
+                    previous[index_hyp - 1] + (char_ref != char_hyp),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(reference: str, hypothesis: str) -> float:
+    """Edit distance relative to the reference, whitespace is normalized."""
+    reference = " ".join(reference.split())
+    hypothesis = " ".join(hypothesis.split())
+    if len(reference) < 1:
+        return float(len(hypothesis) > 0)
+    return levenshtein(reference, hypothesis) / len(reference)
+
+
+def peak_rss_mib() -> float:
+    """Peak RSS of this process.
+
+    RUSAGE_CHILDREN is no measure for the pool-workers, it reports the largest of all
+    reaped children, including tesseract & ghostscript. The workers measure themselves,
+    their peak is part of the timing-report.
+    """
+    if resource is None:
+        return 0.0
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / 1024**2  # KiB vs byte
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def run_single(name: str, corpus: Path) -> dict:
+    """Process a copy of the corpus with one configuration (meant to run in a fresh process)."""
+    options = dict(configurations[name])
+    multiprocess = options.pop("multiprocess")
+    threaded = options.get("backend") == "thread"
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp) / "corpus"
+        workdir.mkdir()
+        images = sorted(corpus.glob("*.jpg"))
+        for image in images:
+            shutil.copy2(image, workdir / image.name)
+            shutil.copy2(image.with_suffix(".json"), workdir / image.with_suffix(".json").name)
+        path_report = Path(tmp) / "report.json"
+
+        processor = ImageProcessor(
+            path=workdir,
+            save_text=True,
+            save_pdf=True,
+            save_meta=False,
+            report_path=path_report,
+            **options,
+        )
+        timestamp = time.perf_counter()
+        processor.process(multiprocess=multiprocess)
+        duration = time.perf_counter() - timestamp
+
+        errors = []
+        for image in sorted(workdir.glob("*.jpg")):
+            truth = load_ground_truth(image)
+            path_text = image.with_suffix(".txt")
+            text = path_text.read_text(encoding="utf-8-sig") if path_text.exists() else ""
+            errors.append(character_error_rate(truth["text"], text))
+        output_size = sum(path.stat().st_size for path in workdir.glob("*.pdf"))
+        with path_report.open(encoding="utf-8") as file:
+            report = json.load(file)
+
+    rss_self = peak_rss_mib()
+    # largest peak of a pool-worker while processing a file (reported by the worker itself)
+    rss_worker = report["peak_rss_mib"]["max"] if multiprocess and not threaded else rss_self
+    return {
+        "images": len(images),
+        "duration_s": duration,
+        "images_per_s": len(images) / duration,
+        "cer": sum(errors) / max(len(errors), 1),
+        "output_kib": output_size / 1024,
+        "peak_rss_main_mib": rss_self,
+        "peak_rss_worker_mib": rss_worker,
+        "stages": {stage: round(stats["total"], 4) for stage, stats in report["stages"].items()},
+    }
+
+
+def run_isolated(name: str, corpus: Path) -> dict:
+    """Start run_single() in a fresh interpreter to get unbiased RSS-values."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, __file__, "--corpus", corpus.as_posix(), "--single", name],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict]) -> list[str]:
+    """List all metrics that got worse than allowed by tolerances."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric, tolerance in tolerances.items():
+            value = result[metric]
+            reference = baseline[name][metric]
+            if metric == "cer":
+                worse = value - reference > tolerance
+            elif tolerance < 0:
+                worse = reference > 0 and (value / reference - 1) < tolerance
+            else:
+                worse = reference > 0 and (value / reference - 1) > tolerance
+            if worse:
+                regressions.append(f"{name}: {metric} {reference:.4g} -> {value:.4g}")
+    return regressions
+
+
+def print_table(results: dict[str, dict], baseline: dict[str, dict]) -> None:
+    """Show results with relative change to the baseline."""
+    columns = ["images_per_s", "cer", "output_kib", "peak_rss_main_mib", "peak_rss_worker_mib"]
+    print(f"{'configuration':<16}" + "".join(f"{column:>22}" for column in columns))
+    for name, result in results.items():
+        cells = []
+        for column in columns:
+            cell = f"{result[column]:.3f}"
+            if name in baseline and baseline[name].get(column):
+                cell += f" ({result[column] / baseline[name][column] - 1:+.0%})"
+            cells.append(f"{cell:>22}")
+        print(f"{name:<16}" + "".join(cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark photo2pdf on synthetic documents")
+    parser.add_argument("--corpus", type=Path, default=path_here / "corpus")
+    parser.add_argument("--count", type=int, default=12, help="size of generated corpus")
+    parser.add_argument("--baseline", type=Path, default=path_here / "baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--configs", nargs="*", default=list(configurations), choices=list(configurations)
+    )
+    parser.add_argument("--single", choices=list(configurations), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_single(args.single, args.corpus)))
+        sys.exit(0)
+
+    if not any(args.corpus.glob("*.jpg")):
+        print(f"generating corpus with {args.count} documents in {args.corpus}")
+        generate_corpus(args.corpus, args.count)
+
+    results_ = {}
+    for config in args.configs:
+        print(f"running {config} ...")
+        results_[config] = run_isolated(config, args.corpus)
+
+    baseline_ = {}
+    if args.baseline.exists():
+        with args.baseline.open(encoding="utf-8") as fp:
+            baseline_ = json.load(fp)
+    print_table(results_, baseline_)
+
+    if args.save_baseline:
+        with args.baseline.open("w", encoding="utf-8") as fp:
+            json.dump(baseline_ | results_, fp, indent=2)
+        print(f"saved baseline to {args.baseline}")
+    elif regressions_ := compare(results_, baseline_):
+        print("Regressions compared to baseline:")
+        for regression in regressions_:
+            print(f"\t{regression}")
+        sys.exit(1)
@@ -0,0 +1,208 @@
+"""Generator for synthetic document-photos with known content.
+
+Renders text in several languages onto an A4 sheet, warps it in perspective onto
+a dark background (precondition of the page-detection) and adds lighting gradient
+& noise. Ground truth (text, language, sheet-corners) is stored next to each image
+as .json, so OCR-quality and corner-detection can be measured reproducibly.
+"""
+
+import argparse
+import json
+import textwrap
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+from PIL import ImageDraw
+from PIL import ImageFont
+
+paper_format_mm = (210, 297)
+
+sample_texts: dict[str, str] = {
+    "en": """Invoice 2021-0815
+    Date: 14.03.2021
+    Dear customer, thank you for your order. We hereby invoice the following services
+    according to our general terms and conditions. Please transfer the total amount
+    within fourteen days to the bank account stated below. Delivery of the goods took
+    place on the date of the invoice unless stated otherwise. For questions regarding
+    this invoice please contact our accounting department by phone or email.
+    Maintenance of heating system, replacement of pump and inspection of the boiler.
+    Total amount including value added tax: 1.234,56 EUR""",
+    "de": """Rechnung Nr. 4711
+    Datum: 02.11.2019
+    Sehr geehrte Damen und Herren, vielen Dank für Ihren Auftrag. Die Durchführung der
+    beschriebenen Dienstleistung erfolgt unter Beachtung der zum Zeitpunkt der
+    Auftragsdurchführung geltenden gesetzlichen Vorschriften. Bitte überweisen Sie den
+    Gesamtbetrag innerhalb von vierzehn Tagen auf das unten genannte Konto. Für Rückfragen
+    steht Ihnen unsere Buchhaltung gerne zur Verfügung. Hauptuntersuchung und
+    Sicherheitsprüfung des Fahrzeugs, Prüfung der Bremsanlage und Lenkung.
+    Gesamtbetrag inklusive Mehrwertsteuer: 98,70 EUR""",
+    "fr": """Facture numéro 2020-117
+    Date : 21.06.2020
+    Madame, Monsieur, nous vous remercions de votre commande. Nous vous facturons les
+    prestations suivantes conformément à nos conditions générales de vente. Veuillez
+    virer le montant total dans un délai de quatorze jours sur le compte bancaire
+    indiqué ci-dessous. Pour toute question concernant cette facture, veuillez
+    contacter notre service comptable par téléphone ou par courrier électronique.
+    Entretien du système de chauffage et remplacement de la pompe.
+    Montant total toutes taxes comprises : 456,00 EUR""",
+    "es": """Factura número 2022-031
+    Fecha: 05.09.2022
+    Estimado cliente, le agradecemos su pedido. Le facturamos los siguientes servicios
+    de acuerdo con nuestras condiciones generales. Por favor, transfiera el importe
+    total en un plazo de catorce días a la cuenta bancaria indicada a continuación.
+    Para cualquier pregunta sobre esta factura, póngase en contacto con nuestro
+    departamento de contabilidad por teléfono o por correo electrónico.
+    Mantenimiento del sistema de calefacción y sustitución de la bomba.
+    Importe total con impuesto sobre el valor añadido: 789,10 EUR""",
+}
+
+font_candidates = [
+    "DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "Arial.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+
+def load_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """Get a common truetype-font or fall back to the one shipped with pillow."""
+    for candidate in font_candidates:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def render_sheet(text: str, dpi: int = 150) -> tuple[np.ndarray, str]:
+    """Render text onto a white A4-sheet (grayscale).
+
+    :return: image and the text as it was rendered (line-breaks included)
+    """
+    width = round(paper_format_mm[0] / 25.4 * dpi)
+    height = round(paper_format_mm[1] / 25.4 * dpi)
+    margin = round(20 / 25.4 * dpi)
+    font_size = round(11 / 72 * dpi)  # 11 pt
+    font = load_font(font_size)
+
+    paragraphs = [" ".join(line.split()) for line in text.splitlines()]
+    chars_per_line = max(10, round((width - 2 * margin) / (0.55 * font_size)))
+    lines: list[str] = []
+    for paragraph in paragraphs:
+        lines.extend(textwrap.wrap(paragraph, chars_per_line) or [""])
+
+    sheet = Image.new("L", (width, height), color=245)
+    draw = ImageDraw.Draw(sheet)
+    line_height = round(1.5 * font_size)
+    for index, line in enumerate(lines):
+        draw.text((margin, margin + index * line_height), line, fill=20, font=font)
+    return np.asarray(sheet), "\n".join(lines)
+
+
+def warp_onto_background(
+    sheet: np.ndarray,
+    rng: np.random.Generator,
+    canvas_size: tuple[int, int] = (2400, 3000),
+    jitter: float = 0.06,
+) -> tuple[np.ndarray, list[tuple[float, float]]]:
+    """Place the sheet in perspective onto a dark, slightly textured background.
+
+    :return: photo and the sheet-corners (upper-left, lower-left, lower-right, upper-right)
+    """
+    canvas_width, canvas_height = canvas_size
+    sheet_height, sheet_width = sheet.shape
+    scale = 0.8 * min(canvas_width / sheet_width, canvas_height / sheet_height)
+    offset_x = (canvas_width - scale * sheet_width) / 2
+    offset_y = (canvas_height - scale * sheet_height) / 2
+    corners_ideal = np.float32(
+        [
+            (offset_x, offset_y),
+            (offset_x, offset_y + scale * sheet_height),
+            (offset_x + scale * sheet_width, offset_y + scale * sheet_height),
+            (offset_x + scale * sheet_width, offset_y),
+        ]
+    )
+    shift = rng.uniform(-jitter, jitter, size=(4, 2)) * np.float32([canvas_width, canvas_height])
+    corners = (corners_ideal + shift).astype(np.float32)
+    source = np.float32([(0, 0), (0, sheet_height), (sheet_width, sheet_height), (sheet_width, 0)])
+    transform = cv2.getPerspectiveTransform(source, corners)
+
+    background = rng.normal(40, 8, size=(canvas_height, canvas_width))
+    background = cv2.GaussianBlur(background, (0, 0), 9)
+    photo = np.clip(background, 0, 255).astype(np.uint8)
+    cv2.warpPerspective(
+        sheet,
+        transform,
+        (canvas_width, canvas_height),
+        dst=photo,
+        borderMode=cv2.BORDER_TRANSPARENT,
+    )
+    return photo, [(float(x), float(y)) for x, y in corners]
+
+
+def add_degradation(
+    photo: np.ndarray,
+    rng: np.random.Generator,
+    noise_sigma: float = 6.0,
+    light_min: float = 0.65,
+) -> np.ndarray:
+    """Apply a linear lighting gradient (random direction), blur and gaussian noise."""
+    height, width = photo.shape
+    angle = rng.uniform(0, 2 * np.pi)
+    y_grid, x_grid = np.mgrid[0:height, 0:width].astype(np.float32)
+    ramp = np.cos(angle) * x_grid / width + np.sin(angle) * y_grid / height
+    ramp = (ramp - ramp.min()) / max(ramp.max() - ramp.min(), 1e-6)
+    lighting = light_min + (1 - light_min) * ramp
+    result = cv2.GaussianBlur(photo.astype(np.float32), (3, 3), 0) * lighting
+    result += rng.normal(0, noise_sigma, size=photo.shape)
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+
+def generate_document(
+    path: Path,
+    lang: str,
+    rng: np.random.Generator,
+    dpi: int = 150,
+    canvas_size: tuple[int, int] = (2400, 3000),
+) -> dict:
+    """Create one photo (.jpg) with ground truth (.json) and return the ground truth."""
+    sheet, text = render_sheet(sample_texts[lang], dpi=dpi)
+    photo, corners = warp_onto_background(sheet, rng, canvas_size)
+    photo = add_degradation(photo, rng)
+    cv2.imwrite(path.as_posix(), photo, params=[int(cv2.IMWRITE_JPEG_QUALITY), 90])
+    truth = {"file": path.name, "lang": lang, "text": text, "corners": corners, "dpi": dpi}
+    with path.with_suffix(".json").open("w", encoding="utf-8") as file:
+        json.dump(truth, file, indent=2, ensure_ascii=False)
+    return truth
+
+
+def generate_corpus(path: Path, count: int = 12, seed: int = 42, dpi: int = 150) -> list[dict]:
+    """Create a reproducible set of photos, languages are used round-robin."""
+    path.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    langs = sorted(sample_texts)
+    return [
+        generate_document(path / f"synthetic_{index:04d}.jpg", langs[index % len(langs)], rng, dpi)
+        for index in range(count)
+    ]
+
+
+def load_ground_truth(path_image: Path) -> dict | None:
+    """Get content of the .json next to the image, if available."""
+    path_truth = path_image.with_suffix(".json")
+    if not path_truth.exists():
+        return None
+    with path_truth.open(encoding="utf-8") as file:
+        return json.load(file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic document-photos")
+    parser.add_argument("output", type=Path, help="directory for images & ground truth")
+    parser.add_argument("-n", "--count", type=int, default=12)
+    parser.add_argument("-s", "--seed", type=int, default=42)
+    parser.add_argument("--dpi", type=int, default=150)
+    args = parser.parse_args()
+    generate_corpus(args.output, args.count, args.seed, args.dpi)
@@ -7,12 +7,12 @@ from rake_nltk import Rake
 from photo2pdf.image_ocr import ocr_osd
 from photo2pdf.image_ocr import ocr_pdf
 from photo2pdf.image_ocr import ocr_text
+from photo2pdf.job_journal import JobJournal
 from photo2pdf.language_detection import detect_lang
 from photo2pdf.logger import log
 from photo2pdf.pdf_compressor import CompressPDF
 from photo2pdf.photo_preprocessing import SheetFilter
-from photo2pdf.string_cleaning import import_list
-from photo2pdf.string_cleaning import str_filter
+from photo2pdf.string_cleaning import KeywordMatcher
 
 # Config
 pta.pytesseract.tesseract_cmd = Path(r"C:\Program Files\Tesseract-OCR\tesseract.exe").as_posix()
@@ -53,10 +53,15 @@ if __name__ == "__main__":
     pdfc = CompressPDF(2, ghostscript_path, show_info=False)
     lang_id = LanguageIdentifier.from_modelstring(model, norm_probs=True)
 
+    # resume at stage-granularity: cropping & OCR survive a failed compression
+    journal = JobJournal(file_path_jpg_raw)
+    journal_states = journal.load()
+
+    # automaton is built once, every text is then scanned in a single pass
     if custom_keyword_path.exists():
-        custom_keywords = import_list(custom_keyword_path)
+        keyword_matcher = KeywordMatcher.from_file(custom_keyword_path)
     else:
-        custom_keywords = []
+        keyword_matcher = KeywordMatcher([])
 
     for file in file_items:
         # use the fast-lane if image exists
@@ -68,23 +73,30 @@ if __name__ == "__main__":
         log.info(f"processing {file.name}")
         timestamp_start = time.time()
 
-        sheet.open_picture(file)
-        response = sheet.correct_perspective()
-        if not response:
-            log.debug("\t-> had trouble correcting the image, will skip this one")
-            continue
-
-        sheet.crop()
-        sheet.enhance_details(darken_percent=50)  # TODO: should be named: turn B/W
-        sheet.save(file_path_jpg_crop / file.name)
+        stages = journal_states.get(file.name, {})
+        if "crop" in stages and (file_path_jpg_crop / file.name).exists():
+            sheet.open_picture(file_path_jpg_crop / file.name)
+        else:
+            sheet.open_picture(file)
+            response = sheet.correct_perspective()
+            if not response:
+                log.debug("\t-> had trouble correcting the image, will skip this one")
+                continue
+
+            sheet.crop()
+            sheet.enhance_details(darken_percent=50)  # TODO: should be named: turn B/W
+            sheet.save(file_path_jpg_crop / file.name)
+            journal.record(file, "crop")
         doc_size = sheet.get_size_mm()
 
-        response = ocr_pdf(
-            sheet.export_for_tesseract(), file_path_pdf_pta / file_name_pdf, languages_pta
-        )
-        if not response:
-            log.debug("\t-> OCR found no text in image, will skip pdf-generation")
-            continue
+        if "ocr_pdf" not in stages or not (file_path_pdf_pta / file_name_pdf).exists():
+            response = ocr_pdf(
+                sheet.export_for_tesseract(), file_path_pdf_pta / file_name_pdf, languages_pta
+            )
+            if not response:
+                log.debug("\t-> OCR found no text in image, will skip pdf-generation")
+                continue
+            journal.record(file, "ocr_pdf")
 
         pdfc.compress(
             file_path_pdf_pta / file_name_pdf, file_path_pdf_cmp / file_name_pdf, doc_size
@@ -94,7 +106,6 @@ if __name__ == "__main__":
         file_name_txt = file.with_suffix(".txt").name
         text_osd = ocr_osd(file_path_jpg_crop / file.name, languages_pta)
         text_ocr = ocr_text(file_path_jpg_crop / file.name, languages_pta)
-        text_filtered = str_filter(text_ocr)
 
         lang_id = detect_lang(text_ocr)
 
@@ -104,10 +115,7 @@ if __name__ == "__main__":
 
         date_stamp = extract_date(text_ocr, lang_id)
 
-        text_custom_keywords = []
-        for keyword in custom_keywords:
-            if text_filtered.find(keyword.lower()) >= 0:
-                text_custom_keywords.append(keyword)
+        text_custom_keywords = keyword_matcher.matches(text_ocr)
 
         log.debug(f" -> date={date_stamp}, lang={text_lang[0]}, keywords={text_custom_keywords}")
 
@@ -1,5 +1,6 @@
 from photo2pdf.image_ocr import ImageOCR
 from photo2pdf.image_ocr import OCRLanguages
 from photo2pdf.main_processing import ImageProcessor
+from photo2pdf.main_processing import PageResult
 
-__all__ = ["ImageOCR", "ImageProcessor", "OCRLanguages"]
+__all__ = ["ImageOCR", "ImageProcessor", "OCRLanguages", "PageResult"]
@@ -0,0 +1,128 @@
+"""Per-page tuning of the B/W-threshold (darken_percent) by cheap quality-scores.
+
+Instead of OCR-ing candidates, a few strips of the page are binarized and judged
+by their connected components: a good threshold yields many glyph-sized
+components with consistent stroke-width, while a too bright cut breaks strokes
+into fragments and a too dark cut adds speckles or merges glyphs into blobs.
+The range gets scanned coarsely, the best bracket is refined by golden-section search.
+"""
+
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+golden_ratio = (math.sqrt(5) - 1) / 2
+
+
+@dataclass
+class TuningResult:
+    """Chosen threshold of a page and what it took to find it."""
+
+    darken_percent: int
+    score: float
+    evaluations: int
+    duration_s: float
+
+
+def sample_strips(img: np.ndarray, count: int = 4, height_fraction: float = 0.03) -> np.ndarray:
+    """Horizontal strips from the inner part of the page (~12 % of the area), stacked."""
+    height, width = img.shape
+    strip_height = max(16, round(height * height_fraction))
+    border = width // 10
+    positions = np.linspace(0.15 * height, 0.85 * height - strip_height, count).astype(int)
+    return np.vstack([img[y : y + strip_height, border : width - border] for y in positions])
+
+
+def binarization_score(ink: np.ndarray, dpi: int) -> float:
+    """Rate a binarized sample (ink = 255), higher is better.
+
+    :param dpi: to translate physical glyph-sizes to pixels
+    """
+    px_per_mm = dpi / 25.4
+    speckle_area = max(2.0, (0.25 * px_per_mm) ** 2)
+    glyph_size = 8 * px_per_mm  # bounding-box, anything larger is a merged blob
+
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    speckles = areas < speckle_area
+    glyphs = (
+        ~speckles
+        & (stats[1:, cv2.CC_STAT_WIDTH] <= glyph_size)
+        & (stats[1:, cv2.CC_STAT_HEIGHT] <= glyph_size)
+    )
+    n_glyphs = int(glyphs.sum())
+    if n_glyphs < 1:
+        return -float(count - 1)
+
+    # mean distance to the background is proportional to the stroke-width of a component
+    distance = cv2.distanceTransform(ink, cv2.DIST_L2, 3)
+    stroke = np.bincount(labels.ravel(), weights=distance.ravel(), minlength=count)[1:] / areas
+    stroke = stroke[glyphs]
+    consistency = 1 / (1 + stroke.std() / max(stroke.mean(), 1e-6))
+    n_rejects = len(areas) - n_glyphs  # speckles & blobs
+    return (n_glyphs - n_rejects) * consistency
+
+
+def golden_section_max(
+    fn: Callable[[float], float], low: float, high: float, tolerance: float = 1.0
+) -> tuple[float, float]:
+    """Maximum of an unimodal function in [low, high], returns (position, value)."""
+    x_low = high - golden_ratio * (high - low)
+    x_high = low + golden_ratio * (high - low)
+    f_low = fn(x_low)
+    f_high = fn(x_high)
+    while high - low > tolerance:
+        if f_low >= f_high:
+            high, x_high, f_high = x_high, x_low, f_low
+            x_low = high - golden_ratio * (high - low)
+            f_low = fn(x_low)
+        else:
+            low, x_low, f_low = x_low, x_high, f_high
+            x_high = low + golden_ratio * (high - low)
+            f_high = fn(x_high)
+    return (x_low, f_low) if f_low >= f_high else (x_high, f_high)
+
+
+def tune_darken_percent(
+    img: np.ndarray,
+    peaks: tuple[int, int],
+    dpi: int,
+    *,
+    default: int = 50,
+    coarse_step: int = 10,
+) -> TuningResult:
+    """Find the best darken_percent for a grayscale page.
+
+    :param peaks: dark (ink) and light (paper) peak of the histogram, the cut
+                  is placed between them (see FindFeature.enhance_details)
+    :param default: returned if no candidate shows any text
+    """
+    timestamp = time.perf_counter()
+    sample = sample_strips(img)
+    ink = np.empty_like(sample)
+    scores: dict[int, float] = {}  # per cut, neighboring percents often share it
+
+    def score_percent(percent: float) -> float:
+        cut = round((peaks[1] - peaks[0]) * percent / 100 + peaks[0])
+        if cut not in scores:
+            cv2.threshold(sample, cut - 1, 255, cv2.THRESH_BINARY_INV, dst=ink)
+            scores[cut] = binarization_score(ink, dpi)
+        return scores[cut]
+
+    coarse = list(range(coarse_step // 2, 100, coarse_step))
+    best = max(coarse, key=score_percent)
+    percent, score = golden_section_max(
+        score_percent, max(best - coarse_step, 0), min(best + coarse_step, 100)
+    )
+    if score <= 0:
+        percent = default
+    return TuningResult(
+        darken_percent=round(percent),
+        score=float(score),
+        evaluations=len(scores),
+        duration_s=time.perf_counter() - timestamp,
+    )
@@ -4,11 +4,20 @@ from pathlib import Path
 
 import typer
 
+from .feature_training import train_thresholds
 from .image_ocr import OCRLanguages
 from .logger import increase_verbose_level
 from .logger import log
 from .main_processing import ImageProcessor
 from .main_processing import activate_exit_handler
+from .main_processing import get_images
+from .ocr_service import serve as serve_http
+from .packed_output import extract_packs
+from .template_bank import load_threshold_profile
+from .work_queue import WorkQueue
+from .work_queue import lease_default_s
+from .work_queue import queue_name
+from .work_queue import run_workers
 
 cli = typer.Typer(help="Creates searchable PDFs from scans or photos of documents")
 
@@ -19,6 +28,66 @@ verbose_opt_t = typer.Option(
     help="Sets logging-level to debug",
 )
 
+# options shared by process, enqueue & serve
+paper_opt_t = typer.Option(
+    None, help="Detect page and correct perspective to paper-format in mm, i.e. 210x297"
+)
+detector_opt_t = typer.Option(
+    "template", help="Page-detection by corner 'template' or 'contour' (faster, with fallback)"
+)
+template_scale_opt_t = typer.Option(
+    1.0, help="Corner-matching on a downscaled frame (1.0, 0.5, 0.25), see train --scale"
+)
+darken_opt_t = typer.Option(
+    "50", help="B/W-threshold with --paper, 0 to 100 or 'auto' to tune it per page"
+)
+compress_opt_t = typer.Option(
+    None, min=0, max=4, help="Recompress PDF with ghostscript (level 0 to 4)"
+)
+ocr_profile_opt_t = typer.Option(
+    "balanced", help="OCR speed vs accuracy: 'fast', 'balanced' or 'best' (final pass)"
+)
+probe_profile_opt_t = typer.Option(
+    None, help="OCR-profile of the language-probe (first pass), defaults to --ocr-profile"
+)
+
+report_opt_t = typer.Option(None, help="Save timings per stage as .json or .csv")
+profile_opt_t = typer.Option(None, help="Save cProfile-stats per worker to directory")
+keywords_opt_t = typer.Option(None, help="Textfile with custom keywords to look for (metadata)")
+metrics_opt_t = typer.Option(
+    None, help="Write live metrics (Prometheus text-format) to this file every few seconds"
+)
+enqueue_path_arg_t = typer.Argument(..., help="Directory or file to add to the queue")
+enqueue_queue_opt_t = typer.Option(
+    None, help=f"Queue-file on the share, defaults to {queue_name} in directory"
+)
+worker_queue_arg_t = typer.Argument(..., help="Queue-file, created by enqueue")
+train_path_arg_t = typer.Argument(..., help="Directory with sample photos (one sheet each)")
+train_scale_opt_t = typer.Option([1.0], help="Template-scale(s) to train, of 1.0, 0.5 and 0.25")
+extract_path_arg_t = typer.Argument(..., help="Pack (.zip) or directory with packs")
+extract_destination_opt_t = typer.Option(None, help="Defaults to directory of the packs")
+
+
+def parse_paper(paper: str | None) -> tuple[int, int] | None:
+    """Paper-format in mm, i.e. "210x297" -> (210, 297)."""
+    if paper is None:
+        return None
+    width, _, height = paper.lower().partition("x")
+    if not (width.isdecimal() and height.isdecimal() and int(width) > 0 and int(height) > 0):
+        msg = f"--paper must be width x height in mm, i.e. 210x297 (got '{paper}')"
+        raise typer.BadParameter(msg)
+    return int(width), int(height)
+
+
+def parse_darken(darken: str) -> int | None:
+    """Percent or None for automatic tuning."""
+    if darken.lower() == "auto":
+        return None
+    if not darken.isdecimal() or not 0 <= int(darken) <= 100:
+        msg = "--darken must be between 0 and 100 or 'auto'"
+        raise typer.BadParameter(msg)
+    return int(darken)
+
 
 @cli.callback()
 def cli_callback(*, verbose: bool = verbose_opt_t) -> None:
@@ -53,8 +122,42 @@ def process(
     save_text: bool = False,
     save_meta: bool = False,
     debug: bool = False,
+    paper: str | None = paper_opt_t,
+    detector: str = detector_opt_t,
+    template_scale: float = template_scale_opt_t,
+    darken: str = darken_opt_t,
+    compress: int | None = compress_opt_t,
+    report: Path | None = report_opt_t,
+    profile: Path | None = profile_opt_t,
+    timeout: float = typer.Option(600, help="Limit per OCR- & compression-call in seconds"),
+    retries: int = typer.Option(1, min=0, help="Additional attempts for failed files"),
+    keywords: Path | None = keywords_opt_t,
+    dedup: int | None = typer.Option(
+        None, min=0, max=256, help="Skip repeated shots within this Hamming-distance, i.e. 24"
+    ),
+    corpus_keywords: bool = typer.Option(
+        False,  # noqa: FBT003
+        help="Rank keywords by rarity across the directory (metadata, not with --pack)",
+    ),
+    backend: str = typer.Option(
+        "process", help="Run workers as 'process' (one per core) or 'thread' (one process)"
+    ),
+    pack: bool = typer.Option(
+        False,  # noqa: FBT003
+        help="Stream results into few zip-files instead of many small files (network-shares)",
+    ),
+    manifest: bool = typer.Option(
+        True,  # noqa: FBT003
+        help="Only process new or changed files, based on a manifest per directory",
+    ),
+    metrics: Path | None = metrics_opt_t,
+    metrics_port: int | None = typer.Option(
+        None, help="Serve live metrics on http://127.0.0.1:PORT/metrics"
+    ),
+    ocr_profile: str = ocr_profile_opt_t,
+    probe_profile: str | None = probe_profile_opt_t,
 ) -> None:
-    """OCR Images by either providing a directory, a file or omit to use CWD.
+    """OCR Images (or image-only PDFs) by either providing a directory, a file or omit to use CWD.
 
     in addition to searchable PDFs, this tool can also
     - save the text content as .txt,
@@ -64,14 +167,165 @@ def process(
     """
     if path is None:
         path = Path.cwd()
+    sheet_size_mm = parse_paper(paper)
     ip = ImageProcessor(
         path=path,
         save_text=save_text,
         save_pdf=True,
         save_meta=save_meta,
+        sheet_size_mm=sheet_size_mm,
+        page_detector=detector,
+        template_scale=template_scale,
+        darken_percent=parse_darken(darken),
+        compress_level=compress,
+        report_path=report,
+        profile_dir=profile,
+        timeout_s=timeout,
+        retries=retries,
+        dedup_distance=dedup,
+        keywords_path=keywords,
+        corpus_keywords=corpus_keywords,
+        backend=backend,
+        pack=pack,
+        use_manifest=manifest,
+        metrics_path=metrics,
+        metrics_port=metrics_port,
+        ocr_profile=ocr_profile,
+        probe_profile=probe_profile,
     )
     ip.process(multiprocess=not debug)
 
 
+@cli.command()
+def enqueue(
+    path: Path = enqueue_path_arg_t,
+    queue: Path | None = enqueue_queue_opt_t,
+    *,
+    save_text: bool = False,
+    save_meta: bool = False,
+    paper: str | None = paper_opt_t,
+    detector: str = detector_opt_t,
+    template_scale: float = template_scale_opt_t,
+    darken: str = darken_opt_t,
+    compress: int | None = compress_opt_t,
+    timeout: float = typer.Option(600, help="Limit per OCR- & compression-call in seconds"),
+    retry_failed: bool = typer.Option(
+        False,  # noqa: FBT003
+        help="Return failed items to the queue",
+    ),
+    ocr_profile: str = ocr_profile_opt_t,
+    probe_profile: str | None = probe_profile_opt_t,
+) -> None:
+    """Register images for workers (see worker), settings apply to the whole queue."""
+    if queue is None:
+        queue = (path if path.is_dir() else path.parent) / queue_name
+    sheet_size_mm = parse_paper(paper)
+    work_queue = WorkQueue(queue)
+    work_queue.set_settings(
+        {
+            "save_text": save_text,
+            "save_meta": save_meta,
+            "sheet_size_mm": sheet_size_mm,
+            "page_detector": detector,
+            "template_scale": template_scale,
+            # workers on other hosts use the same thresholds (and settings-fingerprint)
+            "threshold_profile": load_threshold_profile() if sheet_size_mm is not None else None,
+            "darken_percent": parse_darken(darken),
+            "compress_level": compress,
+            "timeout_s": timeout,
+            "ocr_profile": ocr_profile,
+            "probe_profile": probe_profile,
+        }
+    )
+    added = work_queue.enqueue(get_images(path), retry_failed=retry_failed)
+    log.info(f"Added {added} items, queue: {work_queue.stats()}")
+    work_queue.close()
+
+
+@cli.command()
+def worker(
+    queue: Path = worker_queue_arg_t,
+    jobs: int = typer.Option(1, min=1, help="Worker-processes on this machine"),
+    lease: float = typer.Option(lease_default_s, help="Seconds until a silent worker expires"),
+    batch: int = typer.Option(1, min=1, help="Items leased at once"),
+    wait: float | None = typer.Option(
+        None, help="Poll an empty queue in this interval (seconds) instead of exiting"
+    ),
+) -> None:
+    """Process queued images, run on as many machines as wanted."""
+    if not queue.exists():
+        log.error(f"Queue not found ({queue})")
+        raise typer.Exit(code=1)
+    run_workers(queue, jobs, lease_s=lease, batch=batch, wait_s=wait)
+    work_queue = WorkQueue(queue)
+    log.info(f"Queue: {work_queue.stats()}")
+    work_queue.close()
+
+
+@cli.command()
+def serve(
+    *,
+    host: str = typer.Option("127.0.0.1", help="Interface to bind, keep local if possible"),
+    port: int = typer.Option(8080, help="TCP-Port"),
+    workers: int | None = typer.Option(None, min=1, help="Worker-processes, defaults to cores"),
+    queue: int = typer.Option(16, min=0, help="Waiting requests, more get rejected (429)"),
+    batch: int = typer.Option(1, min=1, help="Max requests handed to a worker at once"),
+    batch_wait: float = typer.Option(0.01, help="Seconds to wait for a batch to fill up"),
+    paper: str | None = paper_opt_t,
+    detector: str = detector_opt_t,
+    template_scale: float = template_scale_opt_t,
+    darken: str = darken_opt_t,
+    compress: int | None = compress_opt_t,
+    timeout: float = typer.Option(600, help="Limit per request in seconds"),
+    ocr_profile: str = ocr_profile_opt_t,
+    probe_profile: str | None = probe_profile_opt_t,
+) -> None:
+    """Run HTTP-service: POST /ocr with an image, GET /status for load & latencies."""
+    sheet_size_mm = parse_paper(paper)
+    serve_http(
+        host,
+        port,
+        timeout_s=timeout,
+        workers=workers,
+        queue_size=queue,
+        batch_size=batch,
+        batch_wait_s=batch_wait,
+        settings={
+            "sheet_size_mm": sheet_size_mm,
+            "page_detector": detector,
+            "template_scale": template_scale,
+            "darken_percent": parse_darken(darken),
+            "compress_level": compress,
+            "timeout_s": timeout,
+            "ocr_profile": ocr_profile,
+            "probe_profile": probe_profile,
+        },
+    )
+
+
+@cli.command()
+def train(
+    path: Path = train_path_arg_t,
+    scale: list[float] = train_scale_opt_t,
+    jobs: int | None = typer.Option(None, min=1, help="Worker-processes, defaults to cores"),
+) -> None:
+    """Tune the page-detection thresholds (template) on sample photos, used by later runs."""
+    files = get_images(path)
+    if len(files) < 1:
+        log.error(f"Found no images in {path}")
+        raise typer.Exit(code=1)
+    train_thresholds(files, tuple(scale), jobs=jobs)
+
+
+@cli.command()
+def extract(
+    path: Path = extract_path_arg_t,
+    destination: Path | None = extract_destination_opt_t,
+) -> None:
+    """Extract packed results (see process --pack) to single files."""
+    count = extract_packs(path, destination)
+    log.info(f"Extracted {count} files")
+
+
 if __name__ == "__main__":
     cli()
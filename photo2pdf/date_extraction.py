@@ -1,5 +1,11 @@
+import re
+from dataclasses import dataclass
 from datetime import date
+from datetime import datetime
+from functools import lru_cache
 
+import dateparser
+from dateparser.languages.loader import default_loader
 from dateparser.search import search_dates
 
 # dateparser should only take full
@@ -12,8 +18,123 @@ dateparser_settings = {
 
 date_year_limits = [1971, date.today().year]  # lower and upper threshold
 
+# candidates are found with cheap regexes, only these short snippets get parsed
+_iso_date = re.compile(r"(?<!\d)(\d{4})-(\d{1,2})-(\d{1,2})(?!\d)")
+_numeric_date = re.compile(r"(?<!\d)(\d{1,2}) ?([./-]) ?(\d{1,2}) ?\2 ?(\d{4}|\d{2})(?!\d)(?!\.\d)")
+_month_fallback = r"[^\W\d_]{3,}"  # any word, when locale has no month-names
+_month_keys = ["january", "february", "march", "april", "may", "june", "july", "august"]
+_month_keys += ["september", "october", "november", "december"]
 
-def extract_date(text: str, lang_id: str) -> str | None:
+
+@dataclass
+class DateCandidate:
+    """Plausible date found in a text, with its first occurrence."""
+
+    date: datetime
+    text: str
+    position: int
+    count: int = 1
+
+
+@lru_cache(maxsize=32)
+def _locale_info(lang_id: str) -> dict | None:
+    """Locale-data of dateparser, None if the language is not supported."""
+    try:
+        return default_loader.get_locale(lang_id).info
+    except (KeyError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=32)
+def _month_patterns(lang_id: str) -> tuple[re.Pattern, re.Pattern]:
+    """Patterns for '14. März 2021' / '5 de mayo de 2022' and 'March 14, 2021'."""
+    info = _locale_info(lang_id) or {}
+    names = {name.lower() for month in _month_keys for name in info.get(month, [])}
+    if names:
+        months = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    else:
+        months = _month_fallback
+    day_first = re.compile(
+        rf"(?<!\w)\d{{1,2}}\.?\s*(?:de\s+)?(?:{months})\.?,?\s*(?:de\s+)?\d{{4}}(?!\d)",
+        re.IGNORECASE,
+    )
+    month_first = re.compile(
+        rf"(?<!\w)(?:{months})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}(?!\d)",
+        re.IGNORECASE,
+    )
+    return day_first, month_first
+
+
+@lru_cache(maxsize=4096)
+def _parse_snippet(snippet: str, lang_id: str) -> datetime | None:
+    languages = None if _locale_info(lang_id) is None else [lang_id]
+    return dateparser.parse(snippet, languages=languages, settings=dateparser_settings)
+
+
+def _to_datetime(year: int, month: int, day: int) -> datetime | None:
+    if year < 100:
+        year += 2000 if year + 2000 <= date_year_limits[1] else 1900
+    try:
+        return datetime(year, month, day)  # noqa: DTZ001
+    except ValueError:
+        return None
+
+
+def _find_candidates(text: str, lang_id: str) -> list[tuple[int, str, datetime | None]]:
+    """Get (position, snippet, parsed date) for all date-like substrings."""
+    found = []
+    for match in _iso_date.finditer(text):
+        year, month, day = (int(value) for value in match.groups())
+        found.append((match.start(), match.group(), _to_datetime(year, month, day)))
+    for match in _numeric_date.finditer(text):
+        day, separator, month, year = match.groups()
+        if separator == ".":
+            # dotted dates are day-first in all locales using them
+            found.append(
+                (match.start(), match.group(), _to_datetime(int(year), int(month), int(day)))
+            )
+        else:
+            found.append((match.start(), match.group(), _parse_snippet(match.group(), lang_id)))
+    for pattern in _month_patterns(lang_id):
+        found.extend(
+            (match.start(), match.group(), _parse_snippet(match.group(), lang_id))
+            for match in pattern.finditer(text)
+        )
+    return sorted(found, key=lambda item: item[0])
+
+
+def extract_dates(text: str, lang_id: str | None) -> list[DateCandidate]:
+    """Find plausible dates, ranked from newest to oldest.
+
+    Only short candidate-snippets (found by precompiled regexes) are handed to dateparser,
+    the costly full-text search is avoided.
+    """
+    if lang_id is None:
+        lang_id = "en"
+    candidates: dict[datetime, DateCandidate] = {}
+    for position, snippet, parsed in _find_candidates(text, lang_id):
+        if parsed is None:
+            continue
+        if not date_year_limits[0] <= parsed.year <= date_year_limits[1]:
+            continue
+        if parsed in candidates:
+            candidates[parsed].count += 1
+        else:
+            candidates[parsed] = DateCandidate(parsed, snippet, position)
+    # TODO: further limit / filter dates for plausibility - e.g. span of last 5 +- 5 years
+    return sorted(candidates.values(), key=lambda c: (c.date, -c.position), reverse=True)
+
+
+def extract_date(text: str, lang_id: str | None) -> str | None:
+    """Get newest plausible date as YYYY-MM-DD."""
+    candidates = extract_dates(text, lang_id)
+    if candidates:
+        return candidates[0].date.strftime("%Y-%m-%d")
+    return None
+
+
+def extract_date_full_search(text: str, lang_id: str) -> str | None:
+    """Former implementation, dateparser searches the whole text (slow on long texts)."""
     text_dates = search_dates(
         text,
         settings=dateparser_settings,
@@ -24,7 +145,6 @@ def extract_date(text: str, lang_id: str) -> str | None:
     # limit dates and sort from newest to oldest
     if text_dates:
         text_datetimes = [x[1] for x in text_dates]
-        # TODO: further limit / filter dates for plausibility - e.g. span of last 5 +- 5 years
         # TODO: trouble with switched month / day on timestamps with day < 13, e.g. 02.12.2020
         text_datetimes = [x for x in text_datetimes if x.year >= date_year_limits[0]]
         text_datetimes = [x for x in text_datetimes if x.year <= date_year_limits[1]]
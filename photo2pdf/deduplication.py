@@ -0,0 +1,133 @@
+"""Detect repeated shots of the same page before the (costly) OCR.
+
+Every image gets a perceptual difference-hash (dHash) computed on a tiny grayscale
+thumbnail. Images within a small Hamming-distance (of all others in the group) are
+grouped and only the best candidate of each group (sharpest, then largest) needs
+to be processed.
+Multi-page documents (TIFFs with several frames, PDFs) are never skipped,
+documents sharing a cover page are not duplicates.
+"""
+
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .logger import log
+
+hash_size = 16  # -> 256 bit hash, smaller sizes can't tell text-pages apart
+sharpness_size = 512  # px of longest side for sharpness estimation
+
+# number of set bits per byte-value
+_popcount_table = np.array([value.bit_count() for value in range(256)], dtype=np.uint8)
+
+
+@dataclass
+class Fingerprint:
+    """Perceptual hash & quality-indicators of an image."""
+
+    path: Path
+    dhash: bytes
+    sharpness: float
+    pixels: int
+
+
+def fingerprint(path: Path) -> Fingerprint | None:
+    """Compute dHash & sharpness (variance of laplacian) on a reduced image.
+
+    JPEGs get decoded in reduced size (draft-mode), so this is cheap
+    compared to a full decode.
+    :return: None for unreadable images & multi-page documents (left to the main processing)
+    """
+    if path.suffix.lower() == ".pdf":
+        return None
+    try:
+        with Image.open(path) as image:
+            if getattr(image, "n_frames", 1) > 1:
+                return None
+            pixels = image.width * image.height
+            image.draft("L", (sharpness_size, sharpness_size))
+            image_gray = image.convert("L")
+    except OSError as xpt:
+        log.debug(f"\t-> could not fingerprint {path.name}: {xpt!r}")
+        return None
+    image_gray.thumbnail((sharpness_size, sharpness_size))
+    sharpness = float(cv2.Laplacian(np.asarray(image_gray), cv2.CV_64F).var())
+
+    thumb = np.asarray(image_gray.resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR))
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    dhash = np.packbits(bits).tobytes()
+    return Fingerprint(path, dhash, sharpness, pixels)
+
+
+def hamming_distances(hashes: np.ndarray, index: int) -> np.ndarray:
+    """Distance of hash at index to all hashes (vectorized)."""
+    return _popcount_table[hashes ^ hashes[index]].sum(axis=1, dtype=np.uint32)
+
+
+def group_duplicates(prints: Sequence[Fingerprint], max_distance: int) -> list[list[Fingerprint]]:
+    """Group near-duplicates, best candidate is first in each group.
+
+    Complete linkage: all members of a group are within max_distance of each other,
+    a chain of similar shots (A~B~C) can't merge pages that differ (A, C).
+    Groups are seeded with the best remaining candidate, its representative.
+    """
+    hashes = np.frombuffer(b"".join(fp.dhash for fp in prints), dtype=np.uint8)
+    hashes = hashes.reshape(len(prints), hash_size**2 // 8)
+    # best candidates first
+    order = sorted(
+        range(len(prints)),
+        key=lambda index: (prints[index].sharpness, prints[index].pixels),
+        reverse=True,
+    )
+    rank = np.empty(len(prints), dtype=np.int64)
+    rank[order] = np.arange(len(prints))
+    grouped = np.zeros(len(prints), dtype=bool)
+    groups: list[list[Fingerprint]] = []
+    for index in order:
+        if grouped[index]:
+            continue
+        members = [index]
+        grouped[index] = True
+        candidates = np.flatnonzero((hamming_distances(hashes, index) <= max_distance) & ~grouped)
+        for candidate in candidates[np.argsort(rank[candidates])]:
+            distances = _popcount_table[hashes[members] ^ hashes[candidate]].sum(axis=1)
+            if np.all(distances <= max_distance):
+                members.append(int(candidate))
+                grouped[candidate] = True
+        groups.append([prints[member] for member in members])
+    return groups
+
+
+def deduplicate(
+    files: Sequence[Path],
+    max_distance: int,
+    map_fn: Callable[[Callable, Iterable], Iterable] = map,
+) -> tuple[list[Path], dict[Path, Path]]:
+    """Reduce files to the best candidate per group of near-duplicates.
+
+    :param max_distance: Hamming-distance (of 256 bit) that still counts as duplicate
+    :param map_fn: i.e. pool.imap to compute fingerprints in parallel
+    :return: files to process and a mapping of skipped duplicate -> processed file
+    """
+    prints = []
+    selection: list[Path] = []
+    for path, fp in zip(files, map_fn(fingerprint, files), strict=True):
+        if fp is None:
+            selection.append(path)
+        else:
+            prints.append(fp)
+    duplicates: dict[Path, Path] = {}
+    for group in group_duplicates(prints, max_distance):
+        selection.append(group[0].path)
+        for fp in group[1:]:
+            duplicates[fp.path] = group[0].path
+    if duplicates:
+        log.info(f"\t-> skipping {len(duplicates)} near-duplicate images")
+    order = {path: index for index, path in enumerate(files)}
+    return sorted(selection, key=order.__getitem__), duplicates
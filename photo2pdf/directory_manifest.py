@@ -0,0 +1,146 @@
+"""Per-directory manifest of processed inputs for fast (no-op) re-runs.
+
+The manifest records size, mtime and produced outputs of every input. A re-run
+lists the directory once (os.scandir) and only dispatches new or changed files,
+instead of probing every possible output per image. If the directory itself is
+unchanged (mtime) since a complete run, even the listing is skipped.
+"""
+
+import json
+import os
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+
+from .job_journal import atomic_write_text
+from .logger import log
+
+manifest_name = ".photo2pdf_manifest.json"
+
+
+@dataclass
+class FileState:
+    """Input-file as it was processed."""
+
+    size: int
+    mtime_ns: int
+    outputs: list[str] = field(default_factory=list)  # suffixes, i.e. ".pdf"
+    duplicate_of: str | None = None
+
+
+@dataclass
+class DirectoryListing:
+    """Result of a single os.scandir()."""
+
+    images: dict[str, os.stat_result]
+    names: set[str]
+
+
+def scan_directory(directory: Path, suffixes: list[str]) -> DirectoryListing:
+    """List directory once, stat only the images."""
+    images = {}
+    names = set()
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            names.add(entry.name)
+            if Path(entry.name).suffix.lower() in suffixes and entry.is_file():
+                images[entry.name] = entry.stat()
+    return DirectoryListing(images, names)
+
+
+class DirectoryManifest:
+    """Manifest of one directory, invalid if the settings changed."""
+
+    def __init__(self, directory: Path, settings_hash: str) -> None:
+        self.directory = directory
+        self.path = directory / manifest_name
+        self.settings_hash = settings_hash
+        self.files: dict[str, FileState] = {}
+        self.directory_mtime_ns: int | None = None
+        self.complete: bool = False
+        self.requested: list[str] = []  # output-suffixes of the recorded runs
+
+    @classmethod
+    def load(cls, directory: Path, settings_hash: str) -> "DirectoryManifest":
+        manifest = cls(directory, settings_hash)
+        try:
+            with manifest.path.open(encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return manifest
+        if data.get("settings") != settings_hash:
+            log.debug("\t-> settings changed, manifest is ignored")
+            return manifest
+        manifest.files = {name: FileState(**state) for name, state in data["files"].items()}
+        manifest.directory_mtime_ns = data.get("directory_mtime_ns")
+        manifest.complete = data.get("complete", False)
+        manifest.requested = data.get("requested", [])
+        return manifest
+
+    def unchanged(self, requested: list[str]) -> bool:
+        """Directory wasn't touched since a complete run -> nothing to do."""
+        if not self.complete or self.directory_mtime_ns is None:
+            return False
+        if not set(requested).issubset(self.requested):
+            return False
+        try:
+            return self.directory.stat().st_mtime_ns == self.directory_mtime_ns
+        except OSError:
+            return False
+
+    def is_current(self, name: str, stat: os.stat_result) -> bool:
+        """Input is known and was not modified since."""
+        state = self.files.get(name)
+        if state is None:
+            return False
+        return state.size == stat.st_size and state.mtime_ns == stat.st_mtime_ns
+
+    def is_done(self, name: str, requested: list[str], names: set[str] | None) -> bool:
+        """Input was processed with (at least) the requested outputs, and they still exist.
+
+        :param names: directory-listing, None if outputs are not stored as single files (packs)
+        """
+        state = self.files[name]
+        if state.duplicate_of is not None:
+            return True
+        if not set(requested).issubset(self.requested):
+            return False
+        if names is None:
+            return True
+        stem = Path(name).stem
+        return all(f"{stem}{suffix}" in names for suffix in state.outputs)
+
+    def update(
+        self,
+        name: str,
+        stat: os.stat_result,
+        outputs: list[str],
+        duplicate_of: str | None = None,
+    ) -> None:
+        self.files[name] = FileState(stat.st_size, stat.st_mtime_ns, outputs, duplicate_of)
+
+    def save(self, requested: list[str], *, complete: bool) -> None:
+        """Store manifest, including the directory-mtime after this write."""
+        self.requested = sorted(set(self.requested) | set(requested)) if complete else requested
+        self.complete = complete
+        self.directory_mtime_ns = None
+        atomic_write_text(self.path, self._serialize(), encoding="utf-8")
+        # renaming the manifest into place changed the directory-mtime,
+        # so store the final value with an in-place rewrite (doesn't touch the directory)
+        self.directory_mtime_ns = self.directory.stat().st_mtime_ns
+        with self.path.open("r+", encoding="utf-8") as file:
+            file.write(self._serialize())
+            file.truncate()
+
+    def _serialize(self) -> str:
+        return json.dumps(
+            {
+                "settings": self.settings_hash,
+                "directory_mtime_ns": self.directory_mtime_ns,
+                "complete": self.complete,
+                "requested": self.requested,
+                "files": {name: asdict(state) for name, state in self.files.items()},
+            },
+            ensure_ascii=False,
+        )
@@ -0,0 +1,38 @@
+"""Bounded concurrency for the external engines (tesseract, ghostscript).
+
+With the thread-backend many files are in flight in one process. The heavy
+lifting happens in child-processes, so the threads mostly wait - but the number
+of concurrently running engines has to stay within the machine's capacity.
+Without configured limits (process-backend) the slots are no-ops.
+"""
+
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+_slots: dict[str, threading.BoundedSemaphore] = {}
+
+
+def default_engine_limits() -> dict[str, int]:
+    """One tesseract per core, ghostscript is lighter & I/O-heavy."""
+    cores = os.cpu_count() or 1
+    return {"tesseract": cores, "ghostscript": max(cores // 2, 1)}
+
+
+def set_engine_limits(limits: dict[str, int] | None) -> None:
+    """Configure max concurrent child-processes per engine, None removes all limits."""
+    _slots.clear()
+    for engine, limit in (limits or {}).items():
+        _slots[engine] = threading.BoundedSemaphore(max(limit, 1))
+
+
+@contextmanager
+def engine_slot(engine: str) -> Iterator[None]:
+    """Wait for a free slot of the engine (if limited) and hold it while running."""
+    slot = _slots.get(engine)
+    if slot is None:
+        yield
+        return
+    with slot:
+        yield
@@ -0,0 +1,108 @@
+"""Tune the match-thresholds of the corner-features on a folder of sample photos.
+
+Every photo is expected to show one sheet, so each of the four rotated features
+should match exactly once. The best match per feature counts as hit, the runner-up
+as miss. Thresholds are placed between the weakest hits and the strongest misses
+and get stored as profile (see template_bank), later runs pick them up.
+"""
+
+from multiprocessing import Pool
+from pathlib import Path
+
+import cv2
+
+from .logger import log
+from .photo_preprocessing import SheetFilter
+from .stage_timing import percentile
+from .template_bank import load_threshold_profile
+from .template_bank import save_threshold_profile
+
+# low enough to also collect the misses
+probe_thresholds = (0.2, 0.2)
+
+# per worker-process, one filter per template-scale
+_filters: dict[float, SheetFilter] = {}
+
+
+def match_scores(task: tuple[Path, float]) -> list[tuple[tuple, tuple | None]] | None:
+    """Scores (positive, negative) of best & second-best match per rotation, None if unreadable."""
+    path, scale = task
+    if scale not in _filters:
+        _filters[scale] = SheetFilter((210, 297), template_scale=scale)
+    sheet = _filters[scale]
+    sheet.img = cv2.imread(path.as_posix(), 0)
+    if sheet.img is None:
+        return None
+    img = sheet.scaled_frame()
+    scores = []
+    for feature in sheet.features:
+        matches = feature.find_feature(img, probe_thresholds, buffers=sheet.buffers)
+        matches.sort(key=lambda match: match[6], reverse=True)
+        best = (matches[0][2], matches[0][5]) if matches else (0.0, 0.0)
+        second = (matches[1][2], matches[1][5]) if len(matches) > 1 else None
+        scores.append((best, second))
+    return scores
+
+
+def separating_threshold(hits: list[float], misses: list[float]) -> float:
+    """Midway between weak hits and strong misses (robust percentiles)."""
+    hit_low = percentile(hits, 5)
+    miss_high = percentile(misses, 95) if misses else 0.0
+    threshold = (hit_low + miss_high) / 2 if miss_high < hit_low else hit_low - 0.05
+    return round(min(max(threshold, 0.1), 0.99), 4)
+
+
+def train_thresholds(
+    files: list[Path],
+    scales: tuple[float, ...] = (1.0,),
+    *,
+    jobs: int | None = None,
+    path_profile: Path | None = None,
+) -> dict[str, dict]:
+    """Evaluate all photos (in parallel) and merge the tuned thresholds into the profile.
+
+    :param path_profile: defaults to the profile in the user-cache
+    :return: updated profile
+    """
+    tasks = [(file, scale) for scale in scales for file in files]
+    # rotation -> lists of hit- & miss-scores (positive & negative) per scale
+    collected = {scale: [([], [], [], []) for _ in range(4)] for scale in scales}
+    samples = dict.fromkeys(scales, 0)
+    with Pool(processes=jobs) as pool:
+        for (_, scale), scores in zip(tasks, pool.imap(match_scores, tasks), strict=True):
+            if scores is None:
+                continue
+            samples[scale] += 1
+            for rotation, (best, second) in enumerate(scores):
+                hits_pos, hits_neg, misses_pos, misses_neg = collected[scale][rotation]
+                hits_pos.append(best[0])
+                hits_neg.append(best[1])
+                if second is not None:
+                    misses_pos.append(second[0])
+                    misses_neg.append(second[1])
+        pool.close()
+        pool.join()
+
+    profile = load_threshold_profile(path_profile)
+    for scale in scales:
+        if samples[scale] < 1:
+            log.warning(f"No readable photos to train scale {scale}")
+            continue
+        thresholds = []
+        for rotation, (hits_pos, hits_neg, misses_pos, misses_neg) in enumerate(collected[scale]):
+            thresholds.append(
+                [
+                    separating_threshold(hits_pos, misses_pos),
+                    separating_threshold(hits_neg, misses_neg),
+                ]
+            )
+            log.debug(
+                f"\t-> scale {scale}, rotation {rotation}: "
+                f"hit pos/neg min {min(hits_pos):.3f}/{min(hits_neg):.3f}, "
+                f"miss pos/neg max {max(misses_pos, default=0):.3f}/"
+                f"{max(misses_neg, default=0):.3f} -> {thresholds[-1]}"
+            )
+        profile[str(scale)] = {"thresholds": thresholds, "samples": samples[scale]}
+    path_saved = save_threshold_profile(profile, path_profile)
+    log.info(f"\t-> saved thresholds of {len(files)} photos to {path_saved}")
+    return profile
@@ -1,13 +1,24 @@
+import io
+import os
 import platform
+import tempfile
+import weakref
 from pathlib import Path
+from typing import Self
 from warnings import deprecated
 
 import iso639
+import numpy as np
 import pytesseract as pta
 from PIL import Image
 from PIL.ImageFile import ImageFile
 
+from .engine_limits import engine_slot
+from .job_journal import atomic_write_bytes
+from .job_journal import atomic_write_text
 from .logger import log
+from .ocr_profiles import get_ocr_profile
+from .packed_page import PackedPage
 
 try:
     pta.get_languages()
@@ -21,6 +32,81 @@ except pta.TesseractNotFoundError as xpt:
         pta.pytesseract.tesseract_cmd = path_ta.as_posix()
 # TODO: put in general config, OR add script that adds checker (file exists on that os)
 
+# RAM-backed filesystem for the page handed to tesseract, if available
+shm_path = Path("/dev/shm")  # noqa: S108
+
+
+def engine_directory() -> str:
+    """Fast location for temporary engine-input, tmpfs on linux."""
+    if shm_path.is_dir() and os.access(shm_path, os.W_OK):
+        return shm_path.as_posix()
+    return tempfile.gettempdir()
+
+
+def compact_image(image: Image.Image) -> Image.Image:
+    """Reduce to the smallest lossless mode: 1 bit for B/W-pages, 8 bit for gray-pages.
+
+    16 bit gray gets scaled to 8 bit, tesseract binarizes 8 bit anyway.
+    """
+    if image.mode in {"1", "L"}:
+        gray = image
+    elif image.mode == "I" or image.mode.startswith("I;16"):
+        # convert() would clip these to 0 / 255
+        pixels = np.clip(np.asarray(image, dtype=np.int64), 0, None)
+        shift = max(int(pixels.max(initial=0)).bit_length(), 16) - 8
+        gray = Image.fromarray((pixels >> shift).astype(np.uint8))
+    elif "A" in image.getbands() or image.mode == "P":
+        # same as pytesseract: replace transparency with a white background
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        image = image.convert("RGBA")
+        background.paste(image, (0, 0), image.getchannel("A"))
+        return background
+    elif image.mode == "RGB":
+        pixels = np.asarray(image)
+        if not (
+            np.array_equal(pixels[..., 0], pixels[..., 1])
+            and np.array_equal(pixels[..., 1], pixels[..., 2])
+        ):
+            return image
+        gray = Image.fromarray(pixels[..., 0])
+    else:
+        return image.convert("RGB")
+    if gray.mode == "L":
+        histogram = gray.histogram()
+        if sum(histogram[1:255]) == 0:
+            return gray.convert("1", dither=Image.Dither.NONE)
+    return gray
+
+
+def encoded_suffix(data: bytes) -> str:
+    """File-suffix of an encoded image, i.e. ".jpeg" (raises for unknown formats)."""
+    with Image.open(io.BytesIO(data)) as image:
+        return f".{image.format.lower()}"
+
+
+def serialize_image(image: Image.Image | PackedPage | bytes) -> Path:
+    """Store image once as uncompressed PBM / PGM / PPM for all engine-calls.
+
+    Packed pages are written as they are (PBM), without unpacking. Encoded
+    images (file-content) are stored unchanged, JPEGs get embedded as-is.
+    """
+    if isinstance(image, bytes):
+        suffix = encoded_suffix(image)
+    elif isinstance(image, PackedPage):
+        suffix = ".pbm"
+    else:
+        image = compact_image(image)
+        suffix = {"1": ".pbm", "L": ".pgm"}.get(image.mode, ".ppm")
+    handle, name = tempfile.mkstemp(prefix="photo2pdf_", suffix=suffix, dir=engine_directory())
+    with os.fdopen(handle, "wb") as file:
+        if isinstance(image, bytes):
+            file.write(image)
+        elif isinstance(image, PackedPage):
+            image.write_pbm(file)
+        else:
+            image.save(file, format="PPM")
+    return Path(name)
+
 
 class OCRLanguages:
     def __init__(self, id1_default: str = "en") -> None:
@@ -85,22 +171,99 @@ class OCRLanguages:
 class ImageOCR:
     """OCR class to extract text from image."""
 
-    def __init__(self, image_path: Path, lang_id1_default: str = "en") -> None:
-        if not isinstance(image_path, Path):
+    def __init__(
+        self,
+        image_path: Path | None,
+        lang_id1_default: str = "en",
+        *,
+        image: Image.Image | PackedPage | bytes | None = None,
+        timeout: float = 0,
+        langs: str | None = None,
+        text: str | None = None,
+        dpi: int | None = None,
+        profile: str = "balanced",
+        probe_profile: str | None = None,
+    ) -> None:
+        """OCR the image on path or an already (pre-)processed version of it.
+
+        :param image_path: source of the image, also the base for output-paths,
+                           None for images that only exist in memory
+        :param image: optional replacement for the content of image_path,
+                      bytes are the content of an image-file (i.e. JPEG)
+        :param timeout: seconds per tesseract-call before the process gets killed
+                        and a RuntimeError is raised, 0 means no limit
+        :param langs: tesseract-languages, i.e. "deu+eng"
+        :param text: result of a previous OCR-run (i.e. resumed from journal), skips OCR
+        :param dpi: resolution of the image, if known (tesseract estimates it otherwise),
+                    defaults to the resolution of a packed page
+        :param profile: tesseract-settings (fast, balanced, best) of the final pass, PDF & OSD
+        :param probe_profile: settings of the first pass without known language, defaults to profile
+        """
+        if image_path is None:
+            if image is None:
+                raise ValueError("Provide an image path or an image")
+        elif not isinstance(image_path, Path):
             raise TypeError("Provide a Path object")
-        if not image_path.exists() or not image_path.is_file():
+        elif not image_path.exists() or not image_path.is_file():
             raise ValueError("Provide a valid image path")
         self.path = image_path
         self.lang_id1_default = lang_id1_default  # TODO: not used ATM
-        self.langs: str | None = None
-        self.img: ImageFile = Image.open(image_path)
-        # NOTE: just providing a path to tesseract saves RAM but is slower
-        self.text: str = self._ocr_text(self.img, langs=self.langs)
+        self.langs: str | None = langs
+        self.timeout = timeout
+        if dpi is None and isinstance(image, PackedPage):
+            dpi = image.dpi
+        self.config = "" if dpi is None else f"--dpi {dpi}"
+        self.profile = get_ocr_profile(profile)
+        self.probe_profile = get_ocr_profile(probe_profile or profile)
+        # unmodified files are read by tesseract directly (JPEGs get embedded into the PDF as-is),
+        # others are encoded once (no compression), every tesseract-call reads this file
+        self.img: Image.Image | PackedPage | bytes | None = image
+        self.path_engine: Path | None = image_path if image is None else None
+        self._finalizer: weakref.finalize | None = None
+        if text is None:
+            text = self._ocr_text(
+                self.engine_input(),
+                langs=self.langs,
+                timeout=self.timeout,
+                config=self.engine_config(probe=self.langs is None),
+            )
+        self.text: str = text
+
+    def engine_config(self, *, probe: bool = False, osd: bool = False) -> str:
+        """Options of a tesseract-call, from the profile of the stage."""
+        profile = self.probe_profile if probe else self.profile
+        return " ".join(filter(None, [profile.config(self.langs, osd=osd), self.config]))
+
+    def engine_input(self) -> str:
+        """Path of the serialized page, created on first use."""
+        if self.path_engine is None:
+            self.path_engine = serialize_image(self.img)
+            self._finalizer = weakref.finalize(self, self.path_engine.unlink, missing_ok=True)
+        return self.path_engine.as_posix()
+
+    def close(self) -> None:
+        """Remove the serialized page (also happens when the object is garbage-collected)."""
+        if self._finalizer is not None:
+            self._finalizer()
+            self.path_engine = None
+            self._finalizer = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_args: object) -> None:
+        self.close()
 
     @staticmethod
-    def _ocr_text(image: ImageFile, langs: str | None = None) -> str:
+    def _ocr_text(
+        image: ImageFile | Image.Image | str,
+        langs: str | None = None,
+        timeout: float = 0,
+        config: str = "",
+    ) -> str:
         try:
-            return pta.image_to_string(image, lang=langs)
+            with engine_slot("tesseract"):
+                return pta.image_to_string(image, lang=langs, timeout=timeout, config=config)
         except pta.TesseractError:
             return ""
 
@@ -112,11 +275,34 @@ class ImageOCR:
     def set_language(self, lang_id2: str) -> None:
         """Set language and rerun OCR."""
         self.langs = lang_id2
-        self.text = self._ocr_text(self.img, self.langs)
+        self.text = self._ocr_text(
+            self.engine_input(), self.langs, self.timeout, self.engine_config()
+        )
+
+    def get_pdf(self, *, text_only: bool = False) -> bytes | None:
+        """Create a searchable PDF in memory.
 
-    def save_pdf(self, path_output: Path | None = None) -> bool:
+        :param text_only: only the invisible text, to be laid over an existing page
+        :return: content of the PDF, None if extraction failed
+        """
+        try:
+            with engine_slot("tesseract"):
+                return pta.image_to_pdf_or_hocr(
+                    self.engine_input(),
+                    extension="pdf",
+                    lang=self.langs,
+                    timeout=self.timeout,
+                    config=f"{self.engine_config()} -c textonly_pdf=1"
+                    if text_only
+                    else self.engine_config(),
+                )
+        except pta.TesseractError:
+            return None
+
+    def save_pdf(self, path_output: Path | None = None, *, text_only: bool = False) -> bool:
         """Create a searchable PDF.
 
+        :param text_only: only the invisible text, to be laid over an existing page
         :return: True if extraction worked, False otherwise
         """
         if path_output is None:
@@ -124,12 +310,10 @@ class ImageOCR:
         if path_output.exists():
             log.debug(f"File exists, won't overwrite ({path_output})")
             return False
-        try:
-            pdf = pta.image_to_pdf_or_hocr(self.img, extension="pdf", lang=self.langs)
-        except pta.TesseractError:
+        pdf = self.get_pdf(text_only=text_only)
+        if pdf is None:
             return False
-        with path_output.open("w+b") as f:
-            f.write(pdf)
+        atomic_write_bytes(path_output, pdf)
         return True
 
     def save_content(self, path_output: Path | None = None) -> None:
@@ -138,8 +322,7 @@ class ImageOCR:
         if path_output.exists():
             log.debug(f"File exists, won't overwrite ({path_output})")
             return
-        with path_output.open("w", encoding="utf-8-sig") as txt:
-            txt.write(self.text)
+        atomic_write_text(path_output, self.text)
 
     @deprecated("not needed anymore")
     def load_content(self, path_input: Path | None = None) -> str:
@@ -155,6 +338,12 @@ class ImageOCR:
         :return: string with statistics
         """
         try:
-            return pta.image_to_osd(self.img, lang=self.langs)
+            with engine_slot("tesseract"):
+                return pta.image_to_osd(
+                    self.engine_input(),
+                    lang=self.langs,
+                    timeout=self.timeout,
+                    config=self.engine_config(osd=True),
+                )
         except pta.TesseractError:
             return None
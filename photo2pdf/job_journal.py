@@ -0,0 +1,143 @@
+"""Append-only journal of completed processing-stages & atomic file-output.
+
+Every directory that gets processed holds a journal (JSONL) with one record per
+finished stage of an input-file, including the location of intermediate artifacts.
+A restarted run can therefore continue where the last one stopped (per stage)
+instead of starting over with the whole file.
+
+Records are appended with a single os.write() on a file opened in append-mode,
+so several workers can write concurrently without locking.
+Records of finished files are useless for a resume, the coordinator of a batch
+drops them by compacting the journal while no worker writes into it.
+"""
+
+import json
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from .logger import log
+
+journal_name = ".photo2pdf_journal.jsonl"
+work_dir_name = ".photo2pdf_work"
+
+
+def temp_path_for(path: Path) -> Path:
+    """Hidden sibling of path, on the same filesystem (rename stays atomic)."""
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+@contextmanager
+def atomic_output(path: Path) -> Iterator[Path]:
+    """Provide a temporary path that only replaces path if the block succeeds."""
+    path_temp = temp_path_for(path)
+    try:
+        yield path_temp
+        path_temp.replace(path)
+    finally:
+        path_temp.unlink(missing_ok=True)
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write the whole file or nothing (readers never see a partial file)."""
+    with atomic_output(path) as path_temp, path_temp.open("wb") as file:
+        file.write(data)
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8-sig") -> None:
+    """Write the whole text-file or nothing, see atomic_write_bytes()."""
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+class JobJournal:
+    """Journal of one directory, only records with matching settings are considered."""
+
+    def __init__(self, directory: Path, settings_hash: str = "") -> None:
+        self.directory = directory
+        self.path = directory / journal_name
+        self.work_dir = directory / work_dir_name
+        self.settings_hash = settings_hash
+
+    def record(self, file: Path, stage: str, artifact: Path | None = None, **info: Any) -> None:
+        """Append the completion of a stage, artifact is relative to the work-dir."""
+        entry = {
+            "file": file.name,
+            "stage": stage,
+            "settings": self.settings_hash,
+            "artifact": None if artifact is None else artifact.name,
+            "time": round(time.time(), 3),
+        }
+        if info:
+            entry["info"] = info
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def load(self, *, compact: bool = False) -> dict[str, dict[str, dict]]:
+        """Get completed stages per file name (latest record wins), finished files are omitted.
+
+        :param compact: rewrite the journal without records of finished files & corrupt lines,
+                        only safe if no other process appends to it meanwhile
+        """
+        states: dict[str, dict[str, dict]] = {}
+        if not self.path.exists():
+            return states
+        # records that are still needed for a resume, per settings & file
+        lines: dict[tuple[str, str], list[str]] = {}
+        dropped = 0
+        with self.path.open(encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # crash during write can leave a truncated last line
+                    log.debug(f"\t-> skipping corrupt journal-line in {self.path}")
+                    dropped += 1
+                    continue
+                key = (entry.get("settings"), entry["file"])
+                current = entry.get("settings") == self.settings_hash
+                if entry["stage"] == "done":
+                    dropped += len(lines.pop(key, [])) + 1
+                    if current:
+                        states.pop(entry["file"], None)
+                    continue
+                lines.setdefault(key, []).append(line if line.endswith("\n") else f"{line}\n")
+                if current:
+                    states.setdefault(entry["file"], {})[entry["stage"]] = entry
+        if compact and dropped:
+            self._rewrite([line for records in lines.values() for line in records])
+            log.debug(f"\t-> compacted journal {self.path}, dropped {dropped} records")
+        return states
+
+    def _rewrite(self, lines: list[str]) -> None:
+        if lines:
+            atomic_write_text(self.path, "".join(lines), encoding="utf-8")
+        else:
+            self.path.unlink(missing_ok=True)
+
+    def artifact_path(self, file: Path, suffix: str) -> Path:
+        self.work_dir.mkdir(exist_ok=True)
+        return self.work_dir / f"{file.name}{suffix}"
+
+    def artifact(self, stages: dict[str, dict], stage: str) -> Path | None:
+        """Path of the artifact of a completed stage, if it still exists."""
+        entry = stages.get(stage)
+        if entry is None or entry.get("artifact") is None:
+            return None
+        path = self.work_dir / entry["artifact"]
+        return path if path.exists() else None
+
+    def cleanup(self, file: Path) -> None:
+        """Remove intermediate artifacts of a completed file."""
+        if not self.work_dir.exists():
+            return
+        prefix = f"{file.name}."
+        for artifact in self.work_dir.iterdir():
+            if artifact.name.startswith(prefix):
+                artifact.unlink(missing_ok=True)
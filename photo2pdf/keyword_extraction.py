@@ -1,16 +1,163 @@
+"""Keyword-extraction with RAKE, optionally weighted by the rarity of phrases in a corpus.
+
+Extractors (stopwords, tokenizers) are costly to set up, so there is one per
+language and process. Corpus-mode down-weights phrases that appear on most
+documents (letterheads, footers, ...) with an inverse document frequency (IDF).
+"""
+
+import math
+import threading
+from collections.abc import Iterable
+from collections.abc import Mapping
+from collections.abc import Sequence
+from functools import lru_cache
+
+import nltk
+import numpy as np
 from rake_nltk import Rake
 
 from .language_detection import langid2nltk
+from .logger import log
+
+nltk_resources = {"stopwords": "corpora/stopwords", "punkt_tab": "tokenizers/punkt_tab"}
+
+# a Rake-instance keeps state of the last text, so extraction is serialized per process
+_rake_lock = threading.Lock()
+
+
+def download_nltk_resources() -> bool:
+    """Fetch missing resources once, return False if still not available."""
+    for name, resource in nltk_resources.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            log.info(f"\t-> downloading nltk-resource '{name}'")
+            if not nltk.download(name, quiet=True):
+                return False
+    return True
+
+
+@lru_cache(maxsize=16)
+def get_extractor(lang_id: str | None) -> Rake | None:
+    """Get the cached extractor of this process, None if resources are missing."""
+    language = langid2nltk(lang_id)
+    for _ in range(2):
+        try:
+            return Rake(language=language, min_length=1, max_length=4)
+        except LookupError:
+            if not download_nltk_resources():
+                break
+    log.warning(f"\t-> nltk-resources for '{language}' are not available, skip keywords")
+    return None
+
+
+def extract_phrase_scores(txt: str, lang_id: str | None) -> list[tuple[float, str]] | None:
+    """Ranked (score, phrase) of one document, None if extraction is not possible."""
+    rake = get_extractor(lang_id)
+    if rake is None:
+        return None
+    with _rake_lock:
+        try:
+            rake.extract_keywords_from_text(txt)
+        except LookupError:
+            # sentence-tokenizer is loaded lazily, on first use
+            if not download_nltk_resources():
+                log.warning("\t-> nltk-tokenizer is not available, skip keywords")
+                return None
+            rake.extract_keywords_from_text(txt)
+        return list(rake.get_ranked_phrases_with_scores())
+
+
+def extract_keywords(txt: str, lang_id: str | None) -> list[str] | None:
+    """Ranked phrases of one document."""
+    phrases = extract_phrase_scores(txt, lang_id)
+    if phrases is None:
+        return None
+    return [phrase for _, phrase in phrases]
+
+
+def rank_by_corpus(
+    documents: Sequence[Mapping[str, float]],
+    *,
+    document_frequency: Mapping[str, int] | None = None,
+    corpus_size: int = 0,
+    limit: int | None = None,
+) -> list[list[str]]:
+    """Rerank phrase-scores of all documents at once, weighted by IDF.
+
+    :param documents: phrase -> RAKE-score per document
+    :param document_frequency: occurrences in documents outside of this batch (i.e. metadata)
+    :param corpus_size: number of documents outside of this batch
+    :param limit: max phrases per document
+    :return: ranked phrases per document
+    """
+    vocabulary: dict[str, int] = {}
+    rows = []
+    columns = []
+    scores = []
+    for row, phrases in enumerate(documents):
+        for phrase, score in phrases.items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(phrase, len(vocabulary)))
+            scores.append(score)
+    if not vocabulary:
+        return [[] for _ in documents]
+    rows_np = np.asarray(rows, dtype=np.int64)
+    columns_np = np.asarray(columns, dtype=np.int64)
+
+    frequency = np.bincount(columns_np, minlength=len(vocabulary))
+    if document_frequency:
+        frequency += np.asarray(
+            [document_frequency.get(phrase, 0) for phrase in vocabulary], dtype=np.int64
+        )
+    total = len(documents) + corpus_size
+    # smoothed IDF, phrases present in every document get weight 0 and rank last
+    idf = np.log1p(total) - np.log1p(frequency) if total > 1 else np.ones(len(vocabulary))
+    scores_np = np.asarray(scores, dtype=np.float64)
+    weighted = scores_np * idf[columns_np]
+
+    # sort by document, then by descending weight & score -> one pass for the whole batch
+    order = np.lexsort((-scores_np, -weighted, rows_np))
+    phrases_all = list(vocabulary)
+    splits = np.searchsorted(rows_np[order], np.arange(1, len(documents)))
+    return [
+        [phrases_all[column] for column in columns_np[chunk][:limit]]
+        for chunk in np.split(order, splits)
+    ]
+
 
+def extract_keywords_batch(
+    texts: Iterable[str],
+    lang_ids: Iterable[str | None],
+    *,
+    corpus: bool = True,
+    limit: int | None = None,
+) -> list[list[str] | None]:
+    """Extract keywords for several documents, optionally ranked by rarity in the batch."""
+    results = [
+        extract_phrase_scores(txt, lang_id) for txt, lang_id in zip(texts, lang_ids, strict=True)
+    ]
+    if not corpus:
+        return [None if r is None else [phrase for _, phrase in r][:limit] for r in results]
+    valid = [index for index, r in enumerate(results) if r is not None]
+    ranked = rank_by_corpus(
+        [phrase_scores(results[index]) for index in valid],
+        limit=limit,
+    )
+    output: list[list[str] | None] = [None] * len(results)
+    for index, phrases in zip(valid, ranked, strict=True):
+        output[index] = phrases
+    return output
 
-def extract_keywords(txt: str, lang_id: str) -> list[str] | None:
-    try:
-        rake = Rake(language=langid2nltk(lang_id), min_length=1, max_length=4)
-        rake.extract_keywords_from_text(txt)
-    except LookupError as e:
-        import nltk
 
-        nltk.download("stopwords")
-        nltk.download("punkt_tab")
-        raise RuntimeError("sideloaded nltk resources - please run again") from e
-    return rake.get_ranked_phrases()
+def phrase_scores(
+    ranked: Iterable[tuple[float, str]], limit: int | None = None
+) -> dict[str, float]:
+    """Convert ranked (score, phrase) to phrase -> score (repeated phrases keep their best)."""
+    scores: dict[str, float] = {}
+    for score, phrase in ranked:
+        if phrase not in scores:
+            if limit is not None and len(scores) >= limit:
+                break
+            scores[phrase] = round(score, 3) if math.isfinite(score) else 0.0
+    return scores
@@ -0,0 +1,294 @@
+"""Live metrics of a running batch in Prometheus text-format.
+
+Throughput over a sliding window, remaining files, running stages (counted by the
+workers in shared memory), memory of workers & engines and failures get written
+every few seconds to a file (i.e. for the textfile-collector of node-exporter)
+and/or served on localhost:port/metrics.
+
+Process-metrics are read from /proc (linux), elsewhere only the main process is reported.
+"""
+
+import collections
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Iterator
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from .job_journal import atomic_write_text
+from .logger import log
+from .stage_timing import LatencyHistogram
+from .stage_timing import attach_stage_gauge
+
+# stages that get counted while running (in-flight)
+tracked_stages = (
+    "total",
+    "frames",  # frame-range of a large multi-page file, instead of total
+    "decode",
+    "find_corners",
+    "binarize",
+    "ocr",
+    "ocr_language",
+    "pdf",
+    "ghostscript",
+    "meta",
+)
+engine_names = {"tesseract": "tesseract", "gs": "ghostscript", "gswin64c": "ghostscript"}
+window_s = 60.0
+interval_default_s = 5.0
+_page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_proc = Path("/proc")
+
+
+def process_tree(root: int) -> Iterator[tuple[int, str, int]]:
+    """Descendants of root as (pid, name, rss in bytes), empty without /proc."""
+    children: dict[int, list[tuple[int, str]]] = collections.defaultdict(list)
+    if not _proc.is_dir():
+        return
+    for entry in _proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text(encoding="ascii", errors="replace")
+        except OSError:
+            continue  # already gone
+        # name is in parentheses and may contain spaces
+        name = stat[stat.find("(") + 1 : stat.rfind(")")]
+        ppid = int(stat[stat.rfind(")") + 2 :].split()[1])
+        children[ppid].append((int(entry.name), name))
+    pending = [root]
+    while pending:
+        for pid, name in children.get(pending.pop(), []):
+            pending.append(pid)
+            try:
+                pages = int((_proc / str(pid) / "statm").read_text(encoding="ascii").split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            yield pid, name, pages * _page_size
+
+
+class MetricsExporter:
+    """Collects progress in the main process, a thread publishes it periodically."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        port: int | None = None,
+        interval_s: float = interval_default_s,
+    ) -> None:
+        """Configure outputs, nothing runs until start().
+
+        :param path: Prometheus text-file, replaced atomically on every update
+        :param port: serve on http://127.0.0.1:port/metrics
+        """
+        self.path = path
+        self.port = port
+        self.interval_s = interval_s
+        self.gauge = multiprocessing.Array("i", len(tracked_stages))
+        self.files_total = 0
+        self.done = 0
+        self.failed = 0
+        self.retried = 0
+        self.duration = LatencyHistogram()
+        self.started = time.time()
+        self._completions: collections.deque[float] = collections.deque()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._server: ThreadingHTTPServer | None = None
+        self._text = ""
+
+    @property
+    def worker_initializer(self) -> tuple:
+        """Pool-initializer & -arguments, so workers count their running stages."""
+        return attach_stage_gauge, (self.gauge, tracked_stages)
+
+    def start(self, files_total: int) -> None:
+        self.files_total = files_total
+        attach_stage_gauge(self.gauge, tracked_stages)  # for the sp- & thread-backend
+        if self.port is not None:
+            handler = type("Handler", (_MetricsHandler,), {"exporter": self})
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), handler)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            log.info(f"\t-> metrics on http://127.0.0.1:{self.port}/metrics")
+        self.publish()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.publish()  # final state
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        attach_stage_gauge(None, ())
+
+    def record(
+        self, duration_s: float | None, *, failed: bool = False, retry: bool = False
+    ) -> None:
+        """Account a finished file (or an attempt that gets retried)."""
+        with self._lock:
+            if retry:
+                self.retried += 1
+                return
+            if failed:
+                self.failed += 1
+            else:
+                self.done += 1
+            if duration_s is not None:
+                self.duration.observe(duration_s)
+            self._completions.append(time.monotonic())
+
+    def images_per_s(self) -> float:
+        now = time.monotonic()
+        while self._completions and self._completions[0] < now - window_s:
+            self._completions.popleft()
+        elapsed = min(window_s, time.time() - self.started)
+        return len(self._completions) / elapsed if elapsed > 0 else 0.0
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_s):
+            try:
+                self.publish()
+            except OSError as xpt:
+                log.warning(f"\t-> could not publish metrics: {xpt!r}")
+
+    def publish(self) -> None:
+        text = self.render()
+        with self._lock:
+            self._text = text
+        if self.path is not None:
+            atomic_write_text(self.path, text, encoding="utf-8")
+
+    def render(self) -> str:
+        """Render the current state in Prometheus text-format."""
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, doc: str, samples: list[tuple[str, Any]]) -> None:
+            lines.append(f"# HELP photo2pdf_{name} {doc}")
+            lines.append(f"# TYPE photo2pdf_{name} {kind}")
+            lines.extend(f"photo2pdf_{name}{labels} {value}" for labels, value in samples)
+
+        with self._lock:
+            in_flight = dict(zip(tracked_stages, self.gauge[:], strict=True))
+            finished = self.done + self.failed
+            rate = self.images_per_s()
+            histogram = self.duration.to_dict()
+            counters = (self.done, self.failed, self.retried)
+        metric("files_total", "gauge", "Files of this run", [("", self.files_total)])
+        metric(
+            "files_finished_total",
+            "counter",
+            "Finished files by result",
+            [('{result="done"}', counters[0]), ('{result="failed"}', counters[1])],
+        )
+        metric(
+            "retries_total", "counter", "Attempts that failed and got retried", [("", counters[2])]
+        )
+        metric(
+            "images_per_second",
+            "gauge",
+            f"Throughput over the last {window_s:.0f} s",
+            [("", round(rate, 4))],
+        )
+        # a running frame-range counts as started file (the file itself runs later)
+        started = in_flight["total"] + in_flight["frames"]
+        metric(
+            "queue_depth",
+            "gauge",
+            "Files not started yet",
+            [("", max(self.files_total - finished - started, 0))],
+        )
+        metric(
+            "stage_in_flight",
+            "gauge",
+            "Running stages over all workers",
+            [
+                (f'{{stage="{stage}"}}', count)
+                for stage, count in in_flight.items()
+                if stage != "total"
+            ]
+            + [('{stage="file"}', in_flight["total"])],
+        )
+        metric("file_duration_seconds", "histogram", "Processing time per file", [])
+        lines.extend(
+            f'photo2pdf_file_duration_seconds_bucket{{le="{bound}"}} {count}'
+            for bound, count in histogram["buckets"].items()
+        )
+        lines.append(f"photo2pdf_file_duration_seconds_sum {histogram['sum']}")
+        lines.append(f"photo2pdf_file_duration_seconds_count {histogram['count']}")
+
+        workers: list[tuple[str, int]] = []
+        engines: dict[str, list[int]] = collections.defaultdict(list)
+        for pid, name, rss in process_tree(os.getpid()):
+            engine = engine_names.get(name)
+            if engine is None:
+                workers.append((f'{{pid="{pid}"}}', rss))
+            else:
+                engines[engine].append(rss)
+        rss_self = _rss_self()
+        metric(
+            "main_rss_bytes",
+            "gauge",
+            "Resident memory of the main process",
+            [] if rss_self is None else [("", rss_self)],
+        )
+        metric("worker_rss_bytes", "gauge", "Resident memory per worker-process", workers)
+        labels_engine = {engine: f'{{engine="{engine}"}}' for engine in set(engine_names.values())}
+        metric(
+            "engine_processes",
+            "gauge",
+            "Running engine child-processes",
+            [(labels, len(engines[engine])) for engine, labels in sorted(labels_engine.items())],
+        )
+        metric(
+            "engine_rss_bytes",
+            "gauge",
+            "Resident memory of all engine child-processes",
+            [(labels, sum(engines[engine])) for engine, labels in sorted(labels_engine.items())],
+        )
+        metric(
+            "start_time_seconds",
+            "gauge",
+            "Start of the run (unix-time)",
+            [("", round(self.started, 3))],
+        )
+        return "\n".join(lines) + "\n"
+
+    def text(self) -> str:
+        with self._lock:
+            return self._text
+
+
+def _rss_self() -> int | None:
+    try:
+        pages = int((_proc / "self" / "statm").read_text(encoding="ascii").split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * _page_size
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    exporter: MetricsExporter
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        log.debug(f"\t-> metrics {format % args}")
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = self.exporter.text().encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
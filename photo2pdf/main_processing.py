@@ -1,25 +1,135 @@
+import hashlib
+import io
+import json
+import os
+import shutil
 import signal
 import sys
+import tempfile
+import threading
 import time
+from collections import Counter
+from collections import deque
 from collections.abc import Callable
 from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import wait
+from dataclasses import dataclass
+from functools import partial
 from multiprocessing import Pool
+from multiprocessing.pool import AsyncResult
 from pathlib import Path
 from types import FrameType
 
+import numpy as np
+from PIL import Image
+from PIL import ImageOps
 from tqdm import tqdm
 
 from .date_extraction import extract_date
+from .deduplication import deduplicate
+from .directory_manifest import DirectoryListing
+from .directory_manifest import DirectoryManifest
+from .directory_manifest import scan_directory
+from .engine_limits import default_engine_limits
+from .engine_limits import set_engine_limits
 from .image_ocr import ImageOCR
 from .image_ocr import OCRLanguages
-from .keyword_extraction import extract_keywords
+from .image_ocr import engine_directory
+from .job_journal import JobJournal
+from .job_journal import atomic_output
+from .job_journal import atomic_write_text
+from .job_journal import temp_path_for
+from .keyword_extraction import extract_phrase_scores
+from .keyword_extraction import phrase_scores
+from .keyword_extraction import rank_by_corpus
 from .language_detection import detect_lang
 from .language_detection import is_iso639_1
+from .live_metrics import MetricsExporter
 from .logger import increase_verbose_level
 from .logger import log
+from .multi_page import frame_count
+from .multi_page import frame_ranges
+from .multi_page import frame_stage
+from .multi_page import frames_per_task
+from .multi_page import iter_frames
+from .multi_page import page_separator
+from .ocr_profiles import ocr_profiles
+from .packed_output import PackWriter
+from .packed_output import load_pack_index
+from .packed_page import PackedPage
+from .packed_page import SharedPage
+from .pdf_compressor import CompressPDF
+from .pdf_input import concatenate_pages
+from .pdf_input import has_pypdf
+from .pdf_input import is_pdf
+from .pdf_input import iter_pages
+from .pdf_input import overlay_text_layers
+from .pdf_input import pdf_output_suffix
+from .photo_preprocessing import SheetFilter
+from .photo_preprocessing import page_detectors
+from .scheduling import CostModel
+from .scheduling import load_cost_history
+from .stage_timing import StageTimer
+from .stage_timing import dump_profile
+from .stage_timing import peak_rss_mib
+from .stage_timing import percentile
+from .stage_timing import profile_call
+from .stage_timing import reset_peak_rss
+from .string_cleaning import get_keyword_matcher
+from .template_bank import bank_scales
+from .template_bank import load_threshold_profile
 
-image_suffixes = [".jpg", ".jpeg", ".bmp", ".png", ".tif"]
+image_suffixes = [".jpg", ".jpeg", ".bmp", ".png", ".tif", ".tiff"]
+input_suffixes = [*image_suffixes, ".pdf"]
+backends = ["process", "thread"]
+output_suffixes = [".pdf", ".txt", ".yaml"]
+keyword_store_limit = 100  # phrase-scores kept in metadata for corpus-ranking
+
+# one instance per worker (process or thread), the reference-features are costly to load
+_sheet_filters = threading.local()
+
+
+def get_sheet_filter(
+    sheet_size_mm: tuple[int, int],
+    detector: str = "template",
+    template_scale: float = 1.0,
+    threshold_profile: dict[str, dict] | None = None,
+) -> SheetFilter:
+    """Get the cached SheetFilter of this worker, it holds the state of the current image."""
+    filters: dict[tuple, SheetFilter] = _sheet_filters.__dict__
+    thresholds = None if threshold_profile is None else threshold_profile.get(str(template_scale))
+    key = (*sheet_size_mm, detector, template_scale, json.dumps(thresholds))
+    if key not in filters:
+        filters[key] = SheetFilter(
+            sheet_size_mm,
+            detector=detector,
+            template_scale=template_scale,
+            threshold_profile=threshold_profile,
+        )
+    return filters[key]
+
+
+def imap_unordered(
+    executor: ThreadPoolExecutor, fn: Callable, items: Iterable, limit: int
+) -> Iterator:
+    """Counterpart of Pool.imap_unordered() for executors, yields in completion-order.
+
+    Only limit items are in flight, so futures & results of long batches don't pile up.
+    """
+    pending: set[Future] = set()
+    for item in items:
+        if len(pending) >= limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
+        pending.add(executor.submit(fn, item))
+    for future in as_completed(pending):
+        yield future.result()
 
 
 def exit_gracefully(_signum: int, _frame: FrameType | None) -> None:
@@ -36,12 +146,108 @@ def activate_exit_handler(custom: Callable | None = None) -> None:
         signal.signal(signal.SIGALRM, custom)
 
 
+def meta_to_yaml(meta: dict) -> str:
+    """Flat dict to YAML, values are JSON-encoded (valid YAML, no extra dependency)."""
+    return "".join(
+        f"{key}: {json.dumps(value, ensure_ascii=False)}\n" for key, value in meta.items()
+    )
+
+
+def yaml_to_meta(text: str) -> dict:
+    """Inverse of meta_to_yaml()."""
+    meta = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(": ")
+        if key:
+            meta[key] = json.loads(value)
+    return meta
+
+
+@dataclass
+class PageResult:
+    """Outcome of processing one in-memory image, outputs as requested from the processor."""
+
+    pdf: bytes | None = None
+    text: str | None = None
+    meta: dict | None = None
+    durations: dict[str, list[float]] | None = None
+    error: str | None = None
+
+
+def gray_pixels(image: bytes | np.ndarray | Image.Image) -> np.ndarray:
+    """8 bit grayscale pixels of an in-memory image, for the page-detection."""
+    if isinstance(image, np.ndarray) and image.ndim == 2 and image.dtype == np.uint8:
+        return image
+    if isinstance(image, bytes):
+        with Image.open(io.BytesIO(image)) as picture:
+            # orientation like a file read by opencv
+            return np.asarray(ImageOps.exif_transpose(picture).convert("L"))
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    return np.asarray(image.convert("L"))
+
+
+# processor of a worker in the pool of ImageProcessor.iter_images()
+_page_processor: "ImageProcessor | None" = None
+
+
+def _init_page_worker(processor: "ImageProcessor") -> None:
+    """Keep the processor in the new worker-process and load the models before the first page."""
+    global _page_processor  # noqa: PLW0603
+    _page_processor = processor
+    if processor.sheet_size_mm is not None:
+        processor.get_sheet_filter()
+    detect_lang("warm up the language model")
+    extract_date("01.02.2020", "de")
+
+
+def _process_page(image: "bytes | np.ndarray | Image.Image | SharedPage") -> PageResult:
+    if isinstance(image, SharedPage):
+        image = image.load()
+    return _page_processor.process_image(image)
+
+
+@dataclass
+class FileResult:
+    """Outcome of processing one file, handed back from the workers."""
+
+    path: Path
+    durations: dict[str, list[float]] | None = None
+    error: str | None = None
+    attempts: int = 1
+    peak_rss_mib: float | None = None  # of the worker while processing this file
+
+
+def select_inputs(names: Iterable[str]) -> list[str]:
+    """Images & PDFs, without the PDFs that are outputs (of an image or a searchable copy)."""
+    names = list(names)
+    stems_image = {Path(name).stem for name in names if Path(name).suffix.lower() in image_suffixes}
+    return [
+        name
+        for name in names
+        if Path(name).suffix.lower() in image_suffixes
+        or (
+            is_pdf(Path(name))
+            and not name.lower().endswith(pdf_output_suffix)
+            and Path(name).stem not in stems_image
+        )
+    ]
+
+
+def output_suffix(path: Path, suffix: str) -> str:
+    """PDF-inputs are kept, their searchable copy is stored as <name>.ocr.pdf."""
+    if suffix == ".pdf" and is_pdf(path):
+        return pdf_output_suffix
+    return suffix
+
+
 def get_images(path: Path, *, recurse: bool = False) -> list[Path]:
     files: list[Path] = []
-    if path.is_file() and path.suffix.lower() in image_suffixes:
-        files = [path]
+    if path.is_file() and path.suffix.lower() in input_suffixes:
+        files = [path] if select_inputs([path.name]) else []
     elif path.is_dir():
-        files = [x for x in path.iterdir() if x.is_file() and x.suffix.lower() in image_suffixes]
+        names = [x.name for x in path.iterdir() if x.is_file()]
+        files = [path / name for name in select_inputs(names)]
     if recurse:
         raise NotImplementedError
     return files
@@ -50,14 +256,76 @@ def get_images(path: Path, *, recurse: bool = False) -> list[Path]:
 class ImageProcessor:
     def __init__(
         self,
-        path: Path,
+        path: Path | None = None,
         *,
         save_text: bool = True,
         save_pdf: bool = True,
         save_meta: bool = True,
         lang_id1_default: str = "en",
+        sheet_size_mm: tuple[int, int] | None = None,
+        page_detector: str = "template",
+        template_scale: float = 1.0,
+        threshold_profile: dict[str, dict] | None = None,
+        darken_percent: int | None = 50,
+        compress_level: int | None = None,
+        report_path: Path | None = None,
+        profile_dir: Path | None = None,
+        timeout_s: float = 600,
+        retries: int = 1,
+        failure_path: Path | None = None,
+        dedup_distance: int | None = None,
+        keywords_path: Path | None = None,
+        corpus_keywords: bool = False,
+        backend: str = "process",
+        engine_limits: dict[str, int] | None = None,
+        pack: bool = False,
+        use_manifest: bool = True,
+        metrics_path: Path | None = None,
+        metrics_port: int | None = None,
+        ocr_profile: str = "balanced",
+        probe_profile: str | None = None,
     ) -> None:
-        if not path.exists():
+        """Configure the pipeline.
+
+        :param path: file or directory to process, None to only process images in memory
+        :param sheet_size_mm: enables page-detection, perspective-correction,
+                              cropping and B/W-conversion (paper-format, i.e. (210, 297))
+        :param page_detector: "template" (corner-matching) or "contour" (faster,
+                              falls back to template if it finds no page)
+        :param template_scale: corner-matching on a downscaled frame (1, 0.5 or 0.25),
+                               uses the thresholds trained for this scale (photo2pdf train)
+        :param threshold_profile: trained thresholds of the page-detection, defaults to the
+                                  profile in the user-cache (loaded once, part of the settings)
+        :param darken_percent: threshold for B/W-conversion, 0 to 100,
+                               None tunes it per page (recorded in metadata)
+        :param compress_level: enables recompression of the PDF with ghostscript, 0 to 4
+        :param report_path: store timings per stage as .json or .csv
+        :param profile_dir: store cProfile-stats per worker in this directory
+                            (the thread-backend is profiled as one process)
+        :param timeout_s: limit per tesseract- & ghostscript-call, runaway processes get killed
+        :param retries: additional attempts for files that failed
+        :param failure_path: manifest (.json) of failed files,
+                             defaults to "photo2pdf_failures.json" in processed directory
+        :param dedup_distance: enables skipping of repeated shots of the same page,
+                               max Hamming-distance of perceptual hashes (of 256 bit), i.e. 24
+        :param keywords_path: textfile with custom keywords (one per line) to look for in metadata
+        :param corpus_keywords: rank keywords by rarity across all metadata of the directory,
+                                boilerplate present on every page drops back
+                                (not with pack, packed metadata can't be rewritten)
+        :param backend: "process" forks a worker per core,
+                        "thread" drives tesseract & ghostscript from threads of one process
+        :param engine_limits: max concurrent child-processes per engine for the thread-backend,
+                              i.e. {"tesseract": 8, "ghostscript": 4}, defaults to core-count
+        :param pack: stream outputs into a few zip-containers (processed directory) instead of
+                     single files, outputs get staged locally (saves round-trips on network-shares)
+        :param use_manifest: record processed inputs per directory, re-runs only dispatch new
+                             or changed files (outputs of changed files get replaced)
+        :param metrics_path: write live metrics (Prometheus text-format) every few seconds
+        :param metrics_port: serve live metrics on http://127.0.0.1:port/metrics
+        :param ocr_profile: tesseract-settings "fast", "balanced" or "best" for the final OCR-pass
+        :param probe_profile: settings of the first pass (language-probe), defaults to ocr_profile
+        """
+        if path is not None and not path.exists():
             raise FileNotFoundError("Path must exist to be processed! -> provide file or directory")
         if not is_iso639_1(lang_id1_default):
             raise ValueError("Default Language must conform to ISO 639-1 / 2 letter language codes")
@@ -66,66 +334,768 @@ class ImageProcessor:
         self.save_pdf = save_pdf
         self.save_meta = save_meta
         self.lang_default = lang_id1_default
+        self.sheet_size_mm = sheet_size_mm
+        if page_detector not in page_detectors:
+            msg = f"Page-detector must be one of {page_detectors}"
+            raise ValueError(msg)
+        self.page_detector = page_detector
+        if template_scale not in bank_scales:
+            msg = f"Template-scale must be one of {bank_scales}"
+            raise ValueError(msg)
+        self.template_scale = template_scale
+        if threshold_profile is None and sheet_size_mm is not None:
+            threshold_profile = load_threshold_profile()
+        self.threshold_profile = threshold_profile
+        for profile in (ocr_profile, probe_profile or ocr_profile):
+            if profile not in ocr_profiles:
+                msg = f"OCR-profile must be one of {list(ocr_profiles)}"
+                raise ValueError(msg)
+        self.ocr_profile = ocr_profile
+        self.probe_profile = probe_profile or ocr_profile
+        self.darken_percent = darken_percent
+        self.compress_level = compress_level
+        self.report_path = report_path
+        self.profile_dir = profile_dir
+        self.timeout_s = timeout_s
+        self.retries = max(retries, 0)
+        if failure_path is None and path is not None:
+            failure_path = (path if path.is_dir() else path.parent) / "photo2pdf_failures.json"
+        self.failure_path = failure_path
+        self.failures: list[FileResult] = []
+        self.dedup_distance = dedup_distance
+        self.duplicates: dict[Path, Path] = {}
+        self.peak_rss: list[float] = []  # MiB per processed file
+        if keywords_path is not None and not keywords_path.exists():
+            msg = f"Keyword-file not found ({keywords_path})"
+            raise FileNotFoundError(msg)
+        self.keywords_path = keywords_path
+        self.corpus_keywords = corpus_keywords
+        if backend not in backends:
+            msg = f"Backend must be one of {backends}"
+            raise ValueError(msg)
+        self.backend = backend
+        self.engine_limits = engine_limits or default_engine_limits()
+        if pack and corpus_keywords:
+            msg = "Corpus-keywords rewrite the metadata afterwards, this is not possible with pack"
+            raise ValueError(msg)
+        self.pack = pack
+        self.staging_dir: Path | None = None
+        self.packer: PackWriter | None = None
+        self.use_manifest = use_manifest
+        self.metrics_path = metrics_path
+        self.metrics_port = metrics_port
+        self.metrics: MetricsExporter | None = None
+        self.costs = CostModel()
+        if self.profile_dir is not None:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.timer = StageTimer()
         # TODO: default not used ATM, possible impl:
         #       use this to limit OCR (intersection with installed Langs)
         #       despite detected langs
         self.ocr_langs = OCRLanguages()
 
-    def process_file(self, path: Path) -> None:
-        path_pdf = path.with_suffix(".pdf")
-        path_text = path.with_suffix(".txt")
-        path_meta = path.with_suffix(".yaml")
+    def process_file(
+        self, path: Path, stages: dict[str, dict] | None = None, frames: range | None = None
+    ) -> dict[str, list[float]] | None:
+        """Process a single image.
+
+        :param stages: completed stages of a previous run (from journal), get skipped
+        :param frames: only process these frames of a multi-page file (into the journal),
+                       the outputs get created when the whole file is processed
+        :return: durations per stage (None if there was nothing to do)
+        """
+        path_pdf = self.output_path(path, ".pdf")
+        path_text = self.output_path(path, ".txt")
+        path_meta = self.output_path(path, ".yaml")
 
         need_pdf = self.save_pdf and not path_pdf.exists()
         need_text = self.save_text and not path_text.exists()
         need_meta = self.save_meta and not path_meta.exists()
 
         if not (need_pdf or need_text or need_meta):
-            return
+            return None
+
+        journal = JobJournal(path.parent, self.settings_hash)
+        timer = StageTimer()
+        if frames is not None:
+            log.debug(f"processing {path.name}, frames {frames.start} to {frames.stop - 1}")
+            with timer.measure("frames"):
+                self._process_frames(path, frames, timer, journal, stages or {})
+            return timer.durations
 
         log.debug(f"processing {path.name}")
-        ocr = ImageOCR(path)
+        multi_page = frame_count(path) > 1 or is_pdf(path)
+        process_stages = self._process_multi_page if multi_page else self._process_stages
+        with timer.measure("total"):
+            process_stages(
+                path,
+                timer,
+                journal,
+                stages or {},
+                need_pdf=need_pdf,
+                need_text=need_text,
+                need_meta=need_meta,
+            )
+        journal.record(path, "done")
+        journal.cleanup(path)
+        return timer.durations
+
+    def _process_stages(
+        self,
+        path: Path,
+        timer: StageTimer,
+        journal: JobJournal,
+        stages: dict[str, dict],
+        *,
+        need_pdf: bool,
+        need_text: bool,
+        need_meta: bool,
+    ) -> None:
+        image, preprocess = self._preprocess(path, timer, journal, stages)
+        ocr, lang_id1 = self._ocr(path, image, timer, journal, stages)
+        with ocr:
+            self._save_outputs(
+                path,
+                ocr,
+                lang_id1,
+                preprocess,
+                timer=timer,
+                journal=journal,
+                stages=stages,
+                need_pdf=need_pdf,
+                need_text=need_text,
+                need_meta=need_meta,
+            )
+
+    def _save_outputs(
+        self,
+        path: Path,
+        ocr: ImageOCR,
+        lang_id1: str | None,
+        preprocess: dict,
+        *,
+        timer: StageTimer,
+        journal: JobJournal,
+        stages: dict[str, dict],
+        need_pdf: bool,
+        need_text: bool,
+        need_meta: bool,
+    ) -> None:
         content = ocr.get_content()
-        lang_id1 = detect_lang(content)
-        if self.ocr_langs.query(lang_id1) is not None:
-            ocr.set_language(self.ocr_langs.langid1_to_tesseract(lang_id1))
-            # TODO: add lang_ids config and default lang
-            content = ocr.get_content()
 
         if need_pdf:
-            ocr.save_pdf(path_pdf)
+            size_mm = preprocess.get("size_mm")
+            size_mm = None if size_mm is None else tuple(size_mm)
+            self._save_pdf(path, ocr, size_mm, timer=timer, journal=journal, stages=stages)
 
         if content is None:
             log.debug("\t-> OCR found no text in image, will skip saving content & metadata")
             return
 
         if need_text:
-            ocr.save_content(path_text)
+            with timer.measure("text"):
+                ocr.save_content(self.output_path(path, ".txt"))
+
+        if need_meta:
+            with timer.measure("osd"):
+                osd = ocr.get_osd()
+            self._save_meta(path, content, lang_id1, preprocess, timer, osd=osd)
+
+    def _preprocess(
+        self, path: Path, timer: StageTimer, journal: JobJournal, stages: dict[str, dict]
+    ) -> tuple[PackedPage | None, dict]:
+        """Run optional page-detection & B/W-conversion, the result is kept as artifact.
+
+        :return: image and info, i.e. the detected paper-size ("size_mm")
+        """
+        if self.sheet_size_mm is None:
+            return None, {}
+        path_artifact = journal.artifact(stages, "preprocess")
+        if path_artifact is not None:
+            info = stages["preprocess"].get("info", {})
+            if path_artifact.suffix == ".pbm":
+                return PackedPage.read_pbm(path_artifact, info.get("dpi")), info
+            # checkpoint of an older version
+            with Image.open(path_artifact) as image:
+                return PackedPage.from_binary(np.asarray(image.convert("L"))), info
+
+        sheet = self.get_sheet_filter()
+        sheet.timer = timer
+        sheet.open_picture(path)
+        image, info = self._enhance_sheet(sheet)
 
-        if not need_meta:
+        with timer.measure("checkpoint"):
+            path_artifact = journal.artifact_path(path, ".pbm")
+            with atomic_output(path_artifact) as path_temp, path_temp.open("wb") as file:
+                image.write_pbm(file)
+        journal.record(path, "preprocess", path_artifact, **info)
+        return image, info
+
+    def _enhance_sheet(self, sheet: SheetFilter) -> tuple[PackedPage, dict]:
+        """Page-detection & B/W-conversion of the loaded picture, returns packed page & info."""
+        info = {"size_mm": None}
+        if sheet.correct_perspective():
+            sheet.crop()
+            info["size_mm"] = sheet.get_size_mm()
+            info["dpi"] = sheet.get_dpi()
+        else:
+            log.debug("\t-> had trouble correcting the image, will use it uncorrected")
+        darken_percent = self.darken_percent
+        if darken_percent is None:
+            tuning = sheet.tune_darken_percent()
+            darken_percent = tuning.darken_percent
+            info["binarization"] = {
+                "darken_percent": darken_percent,
+                "tuning_s": round(tuning.duration_s, 4),
+                "candidates": tuning.evaluations,
+            }
+        sheet.enhance_details(darken_percent)
+        return sheet.export_packed(info.get("dpi")), info
+
+    def _ocr(
+        self,
+        path: Path,
+        image: PackedPage | None,
+        timer: StageTimer,
+        journal: JobJournal,
+        stages: dict[str, dict],
+    ) -> tuple[ImageOCR, str | None]:
+        """OCR with language-detection & rerun in detected language, text is kept as artifact."""
+        path_artifact = journal.artifact(stages, "ocr")
+        if path_artifact is not None:
+            info = stages["ocr"].get("info", {})
+            ocr = ImageOCR(
+                path,
+                image=image,
+                timeout=self.timeout_s,
+                langs=info.get("langs"),
+                text=path_artifact.read_text(encoding="utf-8"),
+                profile=self.ocr_profile,
+            )
+            return ocr, info.get("lang_id1")
+
+        ocr, lang_id1 = self._recognize(path, image, timer)
+        path_artifact = journal.artifact_path(path, ".ocr.txt")
+        atomic_write_text(path_artifact, ocr.get_content(), encoding="utf-8")
+        journal.record(path, "ocr", path_artifact, lang_id1=lang_id1, langs=ocr.langs)
+        return ocr, lang_id1
+
+    def _recognize(
+        self,
+        path: Path | None,
+        image: Image.Image | PackedPage | bytes | None,
+        timer: StageTimer,
+        dpi: int | None = None,
+    ) -> tuple[ImageOCR, str | None]:
+        with timer.measure("ocr"):
+            ocr = ImageOCR(
+                path,
+                image=image,
+                timeout=self.timeout_s,
+                dpi=dpi,
+                profile=self.ocr_profile,
+                probe_profile=self.probe_profile,
+            )
+        with timer.measure("language_detection"):
+            lang_id1 = detect_lang(ocr.get_content())
+        if self.ocr_langs.query(lang_id1) is not None:
+            with timer.measure("ocr_language"):
+                ocr.set_language(self.ocr_langs.langid1_to_tesseract(lang_id1))
+            # TODO: add lang_ids config and default lang
+        return ocr, lang_id1
+
+    def _save_pdf(
+        self,
+        path: Path,
+        ocr: ImageOCR,
+        size_mm: tuple[int, int] | None,
+        *,
+        timer: StageTimer,
+        journal: JobJournal,
+        stages: dict[str, dict],
+    ) -> None:
+        """Searchable PDF, optionally recompressed (uncompressed PDF is kept as artifact)."""
+        path_pdf = self.output_path(path, ".pdf")
+        if self.compress_level is None:
+            with timer.measure("pdf"):
+                ocr.save_pdf(path_pdf)
             return
 
-        # get metadata, TODO: safe in yaml
-        keywords = extract_keywords(content, lang_id1)
-        if keywords is not None and len(keywords) > 0:
+        path_raw = journal.artifact(stages, "pdf_raw")
+        if path_raw is None:
+            path_raw = journal.artifact_path(path, ".raw.pdf")
+            path_raw.unlink(missing_ok=True)
+            with timer.measure("pdf"):
+                if not ocr.save_pdf(path_raw):
+                    return
+            journal.record(path, "pdf_raw", path_raw)
+
+        pdfc = CompressPDF(self.compress_level, timer=timer, timeout=self.timeout_s)
+        path_temp = temp_path_for(path_pdf)
+        if pdfc.compress(path_raw, path_temp, size_mm):
+            path_temp.replace(path_pdf)
+        else:
+            log.debug("\t-> compression failed, will keep uncompressed PDF")
+            path_temp.unlink(missing_ok=True)
+            shutil.move(path_raw, path_pdf)  # staging-dir may be on another filesystem
+
+    def _save_meta(
+        self,
+        path: Path,
+        content: str,
+        lang_id1: str | None,
+        preprocess: dict,
+        timer: StageTimer,
+        *,
+        osd: str | None,
+    ) -> None:
+        meta = self._build_meta(path.name, content, lang_id1, preprocess, timer, osd=osd)
+        with timer.measure("meta"):
+            atomic_write_text(self.output_path(path, ".yaml"), meta_to_yaml(meta), encoding="utf-8")
+
+    def _build_meta(
+        self,
+        name: str | None,
+        content: str,
+        lang_id1: str | None,
+        preprocess: dict,
+        timer: StageTimer,
+        *,
+        osd: str | None,
+    ) -> dict:
+        with timer.measure("keywords"):
+            phrases = extract_phrase_scores(content, lang_id1) or []
+            keywords = [phrase for _, phrase in phrases]
+        if len(keywords) > 0:
             log.debug(f"\t-> found keywords: {keywords}")
-        date_str = extract_date(content, lang_id1)
+        with timer.measure("date"):
+            date_str = extract_date(content, lang_id1)
         if date_str is not None:
             log.debug(f"\t-> extracting date: {date_str}")
-        osd = ocr.get_osd()
         if osd:
             log.debug(f"\t-> osd: {osd}")
         # TODO: optimize detection by rotation, BW, inversion?
+        custom_keywords = []
+        if self.keywords_path is not None:
+            with timer.measure("custom_keywords"):
+                custom_keywords = get_keyword_matcher(self.keywords_path).matches(content)
+        meta = {
+            "file": name,
+            "language": lang_id1,
+            "date": date_str,
+            "keywords": keywords,
+            "custom_keywords": custom_keywords,
+            "osd": osd,
+        }
+        if "binarization" in preprocess:
+            meta["binarization"] = preprocess["binarization"]
+        if "pages" in preprocess:
+            meta["pages"] = preprocess["pages"]
+        if self.corpus_keywords:
+            meta["keyword_scores"] = phrase_scores(phrases, limit=keyword_store_limit)
+        return meta
+
+    def _process_multi_page(
+        self,
+        path: Path,
+        timer: StageTimer,
+        journal: JobJournal,
+        stages: dict[str, dict],
+        *,
+        need_pdf: bool,
+        need_text: bool,
+        need_meta: bool,
+    ) -> None:
+        """Process all (remaining) frames, then merge their pages & texts into the outputs."""
+        count = frame_count(path)
+        infos = self._process_frames(path, range(count), timer, journal, stages)
+        artifacts = [self._frame_artifacts(journal, path, index) for index in range(count)]
+        content = page_separator.join(
+            path_text.read_text(encoding="utf-8") for _, path_text in artifacts
+        )
+
+        if need_pdf and is_pdf(path):
+            # text-layers over the original pages, pages that had text stay as they are
+            layers = {
+                index: path_page
+                for index, (path_page, _) in enumerate(artifacts)
+                if not infos[index].get("has_text")
+            }
+            path_pdf = self.output_path(path, ".pdf")
+            with timer.measure("pdf_merge"), atomic_output(path_pdf) as path_temp:
+                overlay_text_layers(path, layers, path_temp)
+        elif need_pdf:
+            paths_page = [path_page for path_page, _ in artifacts]
+            path_pdf = self.output_path(path, ".pdf")
+            with timer.measure("pdf_merge"), atomic_output(path_pdf) as path_temp:
+                if self.compress_level is None and has_pypdf():
+                    concatenate_pages(paths_page, path_temp)
+                else:
+                    if self.compress_level is None:
+                        log.debug("\t-> pypdf not installed, ghostscript merges the pages")
+                    pdfc = CompressPDF(
+                        self.compress_level or 0, timer=timer, timeout=self.timeout_s
+                    )
+                    if not pdfc.merge(paths_page, path_temp):
+                        msg = f"could not merge {count} pages of {path.name}"
+                        raise RuntimeError(msg)
+
+        if need_text:
+            with timer.measure("text"):
+                atomic_write_text(self.output_path(path, ".txt"), content)
+
+        if need_meta:
+            langs = Counter(info["lang_id1"] for info in infos if info.get("lang_id1"))
+            lang_id1 = langs.most_common(1)[0][0] if langs else None
+            preprocess = {"pages": count}
+            self._save_meta(path, content, lang_id1, preprocess, timer, osd=infos[0].get("osd"))
+
+    def _process_frames(
+        self,
+        path: Path,
+        frames: range,
+        timer: StageTimer,
+        journal: JobJournal,
+        stages: dict[str, dict],
+    ) -> list[dict]:
+        """OCR frame by frame, each leaves its text (& a one-page PDF) in the journal.
+
+        Frames completed by a previous run (or another worker) get skipped.
+        Pages of PDFs get a text-only PDF (to overlay), without preprocessing,
+        pages that already have text keep it.
+        :return: info per frame, i.e. the detected language
+        """
+        infos: dict[int, dict] = {}
+        todo = []
+        for index in frames:
+            entry = stages.get(frame_stage(index), {})
+            info = entry.get("info", {})
+            path_pdf, path_text = self._frame_artifacts(journal, path, index)
+            has_pdf = path_pdf.exists() or not self.save_pdf or info.get("has_text", False)
+            if entry and path_text.exists() and has_pdf:
+                infos[index] = info
+            else:
+                todo.append(index)
+
+        if is_pdf(path):
+            pages = iter_pages(path, todo, timeout=self.timeout_s)
+        else:
+            pages = ((index, "", frame, None) for index, frame in iter_frames(path, todo))
+        for index, text, frame, dpi in pages:
+            path_pdf, path_text = self._frame_artifacts(journal, path, index)
+            if frame is None:
+                atomic_write_text(path_text, text, encoding="utf-8")
+                infos[index] = {"has_text": True}
+                journal.record(path, frame_stage(index), None, **infos[index])
+                continue
+            image = frame
+            info = {}
+            if self.sheet_size_mm is not None and not is_pdf(path):
+                sheet = self.get_sheet_filter()
+                sheet.timer = timer
+                with timer.measure("decode"):
+                    sheet.set_picture(np.asarray(frame.convert("L")))
+                image, info = self._enhance_sheet(sheet)
+            ocr, info["lang_id1"] = self._recognize(path, image, timer, dpi=dpi)
+            with ocr:
+                if self.save_pdf:
+                    path_pdf.unlink(missing_ok=True)  # leftover of an interrupted run
+                    with timer.measure("pdf"):
+                        if not ocr.save_pdf(path_pdf, text_only=is_pdf(path)):
+                            msg = f"tesseract produced no PDF for frame {index} of {path.name}"
+                            raise RuntimeError(msg)
+                atomic_write_text(path_text, ocr.get_content(), encoding="utf-8")
+                if index == 0 and self.save_meta:
+                    with timer.measure("osd"):
+                        info["osd"] = ocr.get_osd()
+            journal.record(path, frame_stage(index), path_pdf, **info)
+            infos[index] = info
+        return [infos[index] for index in frames]
+
+    @staticmethod
+    def _frame_artifacts(journal: JobJournal, path: Path, index: int) -> tuple[Path, Path]:
+        """One-page PDF & text of a frame."""
+        stage = frame_stage(index)
+        return (
+            journal.artifact_path(path, f".{stage}.pdf"),
+            journal.artifact_path(path, f".{stage}.txt"),
+        )
+
+    def get_sheet_filter(self) -> SheetFilter:
+        """Get the cached SheetFilter of this worker, configured like the processor."""
+        return get_sheet_filter(
+            self.sheet_size_mm, self.page_detector, self.template_scale, self.threshold_profile
+        )
+
+    def output_path(self, path: Path, suffix: str) -> Path:
+        """Location of an output, in the local staging-directory when packing."""
+        path_output = path.with_suffix(output_suffix(path, suffix))
+        if self.staging_dir is None:
+            return path_output
+        return self.staging_dir / path_output.name
+
+    def __getstate__(self) -> dict:
+        """Workers get a copy of the processor, without pack-writer, metrics & costs of main."""
+        state = self.__dict__.copy()
+        state["packer"] = None
+        state["metrics"] = None
+        state["costs"] = None
+        return state
+
+    @property
+    def settings_hash(self) -> str:
+        """Fingerprint of all settings that change the produced output."""
+        # trained thresholds of the page-detection (photo2pdf train), only of the used
+        # scale -> retraining another scale keeps journals & manifests valid
+        profile = (self.threshold_profile or {}).get(str(self.template_scale))
+        settings = [
+            self.sheet_size_mm,
+            self.darken_percent,
+            self.compress_level,
+            self.page_detector,
+            None if profile is None else profile["thresholds"],
+        ]
+        if self.template_scale != 1.0:
+            settings.append(self.template_scale)
+        if self.ocr_profile != "balanced" or self.probe_profile != "balanced":
+            # default profiles keep the fingerprint of former versions
+            settings.append([self.ocr_profile, self.probe_profile])
+        return hashlib.sha1(json.dumps(settings).encode()).hexdigest()[:12]  # noqa: S324
+
+    def _tasks(
+        self, files: Sequence[Path], *, compact: bool = True
+    ) -> list[tuple[Path, dict[str, dict], None]]:
+        """Attach completed stages from the journal(s) to the files (all frames).
+
+        :param compact: drop finished files from the journal(s), only while no worker runs
+        """
+        journals: dict[Path, dict[str, dict[str, dict]]] = {}
+        tasks = []
+        for file in files:
+            if file.parent not in journals:
+                journals[file.parent] = JobJournal(file.parent, self.settings_hash).load(
+                    compact=compact
+                )
+            tasks.append((file, journals[file.parent].get(file.name, {}), None))
+        return tasks
+
+    def _process_file_timed(self, task: tuple[Path, dict[str, dict], range | None]) -> FileResult:
+        """Entry-point for workers, optionally profiled.
+
+        Exceptions are caught and reported back, so a single corrupt file
+        can't abort the whole batch.
+        """
+        path, stages, frames = task
+        if self.backend != "thread":
+            # threads share the process, their peaks can't be separated
+            reset_peak_rss()
+        try:
+            if self.profile_dir is None or self.backend == "thread":
+                # threads get profiled together, see _process_threads()
+                durations = self.process_file(path, stages, frames)
+            else:
+                durations = profile_call(self.profile_dir, self.process_file, path, stages, frames)
+        except Exception as xpt:  # noqa: BLE001
+            log.warning(f"\t-> failed to process {path.name}: {xpt!r}")
+            return FileResult(path, error=f"{type(xpt).__name__}: {xpt}")
+        return FileResult(path, durations, peak_rss_mib=peak_rss_mib())
+
+    def process_image(
+        self, image: bytes | np.ndarray | Image.Image | PackedPage, *, name: str | None = None
+    ) -> PageResult:
+        """Process an image in memory, only the engines get (temporary) files.
+
+        Exceptions are caught and reported back in the result.
+
+        :param image: content of an image-file (bytes), pixels (uint8, gray or RGB),
+                      a PIL-image or an already binarized page (skips the preprocessing)
+        :param name: recorded as "file" in the metadata
+        :return: PDF, text & metadata, as requested by save_pdf, save_text & save_meta
+        """
+        timer = StageTimer()
+        try:
+            with timer.measure("total"):
+                result = self._process_image(image, name, timer)
+        except Exception as xpt:  # noqa: BLE001
+            log.warning(f"\t-> failed to process {name or 'image'}: {xpt!r}")
+            return PageResult(error=f"{type(xpt).__name__}: {xpt}")
+        result.durations = timer.durations
+        return result
+
+    def _process_image(
+        self,
+        image: bytes | np.ndarray | Image.Image | PackedPage,
+        name: str | None,
+        timer: StageTimer,
+    ) -> PageResult:
+        preprocess = {}
+        if self.sheet_size_mm is not None and not isinstance(image, PackedPage):
+            sheet = self.get_sheet_filter()
+            sheet.timer = timer
+            with timer.measure("decode"):
+                sheet.set_picture(gray_pixels(image))
+            image, preprocess = self._enhance_sheet(sheet)
+        elif isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        ocr, lang_id1 = self._recognize(None, image, timer)
+        result = PageResult()
+        with ocr:
+            content = ocr.get_content()
+            if self.save_pdf:
+                size_mm = preprocess.get("size_mm")
+                size_mm = None if size_mm is None else tuple(size_mm)
+                result.pdf = self._pdf_data(ocr, size_mm, timer)
+            if self.save_text:
+                result.text = content
+            if self.save_meta:
+                with timer.measure("osd"):
+                    osd = ocr.get_osd()
+                result.meta = self._build_meta(name, content, lang_id1, preprocess, timer, osd=osd)
+        return result
+
+    def _pdf_data(
+        self, ocr: ImageOCR, size_mm: tuple[int, int] | None, timer: StageTimer
+    ) -> bytes | None:
+        """Searchable PDF in memory, optionally recompressed (ghostscript needs files)."""
+        with timer.measure("pdf"):
+            pdf = ocr.get_pdf()
+        if pdf is None or self.compress_level is None:
+            return pdf
+        pdfc = CompressPDF(self.compress_level, timer=timer, timeout=self.timeout_s)
+        with tempfile.TemporaryDirectory(prefix="photo2pdf_", dir=engine_directory()) as tmp:
+            path_raw = Path(tmp) / "raw.pdf"
+            path_compressed = Path(tmp) / "compressed.pdf"
+            path_raw.write_bytes(pdf)
+            if pdfc.compress(path_raw, path_compressed, size_mm):
+                return path_compressed.read_bytes()
+        log.debug("\t-> compression failed, will keep uncompressed PDF")
+        return pdf
+
+    def iter_images(
+        self,
+        images: Iterable[bytes | np.ndarray | Image.Image | PackedPage],
+        *,
+        workers: int | None = None,
+        prefetch: int = 2,
+    ) -> Iterator[PageResult]:
+        """Stream in-memory images through a warm worker-pool, results come in input-order.
+
+        The workers load models & page-detection once for the whole stream. Only
+        prefetch images per worker are in flight, so long streams don't pile up in
+        memory. Binarized pages are handed over in shared memory.
+
+        :param workers: worker-processes, defaults to core-count
+        :param prefetch: images queued per worker
+        """
+        with Pool(processes=workers, initializer=_init_page_worker, initargs=(self,)) as pool:
+            limit = pool._processes * max(prefetch, 1)  # noqa: SLF001
+            pending: deque[tuple[AsyncResult, SharedPage | None]] = deque()
+            try:
+                for image in images:
+                    if len(pending) >= limit:
+                        yield self._collect_page(*pending.popleft())
+                    shared = image.share() if isinstance(image, PackedPage) else None
+                    task = image if shared is None else shared
+                    pending.append((pool.apply_async(_process_page, (task,)), shared))
+                while pending:
+                    yield self._collect_page(*pending.popleft())
+            finally:
+                # stream got abandoned, the pool gets terminated
+                for _, shared in pending:
+                    if shared is not None:
+                        shared.unlink()
+
+    @staticmethod
+    def _collect_page(pending: AsyncResult, shared: SharedPage | None) -> PageResult:
+        try:
+            return pending.get()
+        finally:
+            if shared is not None:
+                shared.unlink()
+
+    def process_one(self, path: Path) -> FileResult:
+        """Process a single file with resume from journal & failure-isolation (queue-workers)."""
+        # workers on other hosts may append to the same journal -> no compaction
+        return self._process_file_timed(self._tasks([path], compact=False)[0])
+
+    def _run_with_retries(
+        self,
+        run: Callable[[Sequence[tuple[Path, dict]]], Iterable[FileResult]],
+        files: Sequence[Path],
+    ) -> None:
+        """Collect results in completion-order and resubmit failed files (bounded)."""
+        self._process_frame_ranges(run, files)
+        progress_bar = tqdm(total=len(files), desc="OCR Images", unit="n", leave=False)
+        for attempt in range(1, self.retries + 2):
+            failed: list[Path] = []
+            with self.timer.measure("scheduling"):
+                files = self.costs.order(files)
+            for result in run(self._tasks(files)):
+                self.timer.merge(result.durations)
+                if result.durations is not None and "total" in result.durations:
+                    self.costs.observe(result.path, result.durations["total"][0])
+                if result.durations is not None and result.peak_rss_mib is not None:
+                    log.debug(
+                        f"\t-> {result.path.name} peaked at {result.peak_rss_mib:.0f} MiB RSS"
+                    )
+                    self.peak_rss.append(result.peak_rss_mib)
+                if self.metrics is not None:
+                    self._record_metrics(result, retry=attempt <= self.retries)
+                if result.error is not None and attempt <= self.retries:
+                    failed.append(result.path)
+                    continue
+                if result.error is not None:
+                    result.attempts = attempt
+                    self.failures.append(result)
+                elif self.packer is not None:
+                    self._pack_outputs(result.path)
+                progress_bar.update(n=1)
+            if not failed:
+                break
+            log.info(f"\t-> retrying {len(failed)} failed files")
+            files = failed
+        progress_bar.close()
 
-    def _process_sp(self, files: Iterable[Path]) -> None:
+    def _process_frame_ranges(
+        self,
+        run: Callable[[Sequence[tuple[Path, dict, range]]], Iterable[FileResult]],
+        files: Sequence[Path],
+    ) -> None:
+        """Spread the frames of large multi-page files over the workers, ahead of all files.
+
+        Finished frames end up in the journal, these files then only get merged.
+        Failed ranges are not retried here, their frames get redone with the file.
+        """
+        tasks = []
+        for path, stages, _ in self._tasks(files):
+            count = frame_count(path)
+            if count > frames_per_task:
+                tasks.extend((path, stages, frames) for frames in frame_ranges(count))
+        if not tasks:
+            return
+        log.info(f"\t-> spreading {len(tasks)} frame-ranges of multi-page files over the workers")
+        for result in run(tasks):
+            self.timer.merge(result.durations)
+
+    def _record_metrics(self, result: FileResult, *, retry: bool) -> None:
+        if result.error is not None:
+            self.metrics.record(None, failed=not retry, retry=retry)
+            return
+        durations = result.durations or {}
+        self.metrics.record(durations["total"][0] if "total" in durations else None)
+
+    def _process_sp(self, files: Sequence[Path]) -> None:
         """Single process Images (slower, more verbose, saves RAM)."""
         increase_verbose_level(3)
-        for file in tqdm(files, desc="OCR Images", unit="n", leave=False):
-            self.process_file(file)
+        files = self._deduplicate(files, map)
+        self._run_with_retries(partial(map, self._process_file_timed), files)
 
     def _process_mp(self, files: Sequence[Path]) -> None:
         """Multiprocess Images in a worker-pool (auto-adjusting to CPU)."""
-        with Pool() as pool:
+        initializer, initargs = (None, ())
+        if self.metrics is not None:
+            initializer, initargs = self.metrics.worker_initializer
+        with Pool(initializer=initializer, initargs=initargs) as pool:
             log.info(f"Multiprocessing with {pool._processes} workers")
 
             def exit_pool(_signum: int, _frame: FrameType | None) -> None:
@@ -134,26 +1104,249 @@ class ImageProcessor:
                 sys.exit(0)
 
             activate_exit_handler(exit_pool)
-            progress_bar = tqdm(
-                total=len(files),
-                desc="OCR Images",
-                unit="n",
-                leave=False,
+            files = self._deduplicate(files, pool.imap)
+            # unordered: a slow page does not hold back the results of the others
+            self._run_with_retries(partial(pool.imap_unordered, self._process_file_timed), files)
+            # workers exit regularly (instead of getting terminated), so they dump their profiles
+            pool.close()
+            pool.join()
+
+    def _process_threads(self, files: Sequence[Path]) -> None:
+        """Process Images in threads of this process, only the engines run in parallel.
+
+        Decoding, OCR, compression and writing of different files overlap,
+        while Python-state (models, caches) exists only once.
+        """
+        set_engine_limits(self.engine_limits)
+        # more threads than engine-slots, so python-stages can run while engines are busy
+        workers = 2 * max(self.engine_limits.values())
+        log.info(f"Multithreading with {workers} workers, engine-limits {self.engine_limits}")
+        # tesseract would otherwise start a thread per core for each of its processes
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+        def run() -> None:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                files_ = self._deduplicate(files, executor.map)
+                self._run_with_retries(
+                    partial(imap_unordered, executor, self._process_file_timed, limit=2 * workers),
+                    files_,
+                )
+
+        try:
+            if self.profile_dir is None:
+                run()
+            else:
+                # only one profiler can be active per process (3.12+), it covers all threads
+                profile_call(self.profile_dir, run)
+        finally:
+            set_engine_limits(None)
+
+    def _deduplicate(self, files: Sequence[Path], map_fn: Callable) -> Sequence[Path]:
+        if self.dedup_distance is None:
+            return files
+        with self.timer.measure("deduplication"):
+            files, self.duplicates = deduplicate(files, self.dedup_distance, map_fn)
+        return files
+
+    def rank_keywords_by_corpus(self, directories: Iterable[Path]) -> None:
+        """Rerank keywords of all metadata-files in one batch, weighted by IDF."""
+        paths = [
+            path for directory in set(directories) for path in sorted(directory.glob("*.yaml"))
+        ]
+        metas = [yaml_to_meta(path.read_text(encoding="utf-8")) for path in paths]
+        store = [
+            (path, meta)
+            for path, meta in zip(paths, metas, strict=True)
+            if "keyword_scores" in meta
+        ]
+        if not store:
+            return
+        with self.timer.measure("corpus_keywords"):
+            ranked = rank_by_corpus([meta["keyword_scores"] for _, meta in store])
+            for (path, meta), keywords in zip(store, ranked, strict=True):
+                meta["keywords"] = keywords
+                atomic_write_text(path, meta_to_yaml(meta), encoding="utf-8")
+        log.info(f"\t-> ranked keywords of {len(store)} documents by corpus")
+
+    @property
+    def requested_suffixes(self) -> list[str]:
+        """Suffixes of the enabled outputs."""
+        enabled = [self.save_pdf, self.save_text, self.save_meta]
+        return [suffix for suffix, on in zip(output_suffixes, enabled, strict=True) if on]
+
+    def _select_files(
+        self, manifest: DirectoryManifest | None
+    ) -> tuple[list[Path], set[Path], DirectoryListing | None]:
+        """Get inputs to dispatch, the changed subset of them and the directory-listing.
+
+        Stale outputs & artifacts of changed inputs are removed, so they get redone.
+        """
+        if manifest is None:
+            return get_images(self.path), set(), None
+        listing = scan_directory(self.path, input_suffixes)
+        inputs = select_inputs(listing.images)
+        listing.images = {name: listing.images[name] for name in inputs}
+        names = None if self.pack else listing.names
+        files = []
+        changed = set()
+        for name, stat in sorted(listing.images.items()):
+            path = self.path / name
+            if name not in manifest.files:
+                files.append(path)
+            elif not manifest.is_current(name, stat):
+                log.debug(f"\t-> {name} changed since last run")
+                for suffix in manifest.files[name].outputs:
+                    path.with_suffix(suffix).unlink(missing_ok=True)
+                JobJournal(self.path).cleanup(path)
+                files.append(path)
+                changed.add(path)
+            elif not manifest.is_done(name, self.requested_suffixes, names):
+                files.append(path)
+        skipped = len(listing.images) - len(files)
+        if skipped:
+            log.info(f"\t-> {skipped} files are unchanged since last run (manifest)")
+        return files, changed, listing
+
+    def _update_manifest(
+        self, manifest: DirectoryManifest, listing: DirectoryListing, files: Sequence[Path]
+    ) -> None:
+        """Record processed inputs with their outputs, vanished inputs get dropped."""
+        if self.pack:
+            names = set(load_pack_index(self.path))
+        else:
+            names = scan_directory(self.path, image_suffixes).names
+        failed = {result.path for result in self.failures}
+        for path in files:
+            if path in failed:
+                manifest.files.pop(path.name, None)
+            elif path in self.duplicates:
+                best = self.duplicates[path].name
+                manifest.update(path.name, listing.images[path.name], [], duplicate_of=best)
+            else:
+                suffixes = [output_suffix(path, suffix) for suffix in output_suffixes]
+                outputs = [s for s in suffixes if path.with_suffix(s).name in names]
+                manifest.update(path.name, listing.images[path.name], outputs)
+        for name in set(manifest.files) - set(listing.images):
+            del manifest.files[name]
+        manifest.save(self.requested_suffixes, complete=not failed)
+
+    def _start_packing(self, files: Sequence[Path], changed: set[Path]) -> list[Path]:
+        """Open pack-writer and skip files that are already packed (unless changed)."""
+        directory = self.path if self.path.is_dir() else self.path.parent
+        packed = load_pack_index(directory)
+        suffixes = self.requested_suffixes
+        todo = [
+            file
+            for file in files
+            if file in changed
+            or any(
+                file.with_suffix(output_suffix(file, suffix)).name not in packed
+                for suffix in suffixes
             )
+        ]
+        if len(todo) < len(files):
+            log.info(f"\t-> {len(files) - len(todo)} files are already packed")
+        self.staging_dir = Path(tempfile.mkdtemp(prefix="photo2pdf_out_", dir=engine_directory()))
+        self.packer = PackWriter(directory)
+        return todo
 
-            for _ in pool.imap(self.process_file, files):
-                progress_bar.update(n=1)
+    def _pack_outputs(self, path: Path) -> None:
+        with self.timer.measure("pack"):
+            for suffix in output_suffixes:
+                path_output = self.output_path(path, suffix)
+                if path_output.exists():
+                    self.packer.add_file(path_output)
+
+    def _finish_packing(self) -> None:
+        if self.packer is not None:
+            self.packer.close()
+            for path_pack in self.packer.packs:
+                log.info(f"\t-> results are packed into {path_pack.name}")
+        if self.staging_dir is not None:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+        self.packer = None
+        self.staging_dir = None
+
+    def save_failures(self) -> None:
+        """Store manifest of files that could not be processed, a clean run removes it."""
+        if not self.failures:
+            # stale manifest of a former run would report fixed files
+            self.failure_path.unlink(missing_ok=True)
+            return
+        manifest = [
+            {"file": result.path.as_posix(), "error": result.error, "attempts": result.attempts}
+            for result in self.failures
+        ]
+        atomic_write_text(self.failure_path, json.dumps(manifest, indent=2), encoding="utf-8")
+        log.warning(f"\t-> {len(self.failures)} files failed, see {self.failure_path}")
 
     def process(self, *, multiprocess: bool = True) -> None:
         """Main processing routine."""
+        if self.path is None:
+            msg = "Processor got no path, use process_image() for images in memory"
+            raise ValueError(msg)
         activate_exit_handler()
 
         timestamp_start = time.time()
-        files = get_images(self.path)
+        manifest = None
+        if self.use_manifest and self.path.is_dir():
+            manifest = DirectoryManifest.load(self.path, self.settings_hash)
+            if manifest.unchanged(self.requested_suffixes):
+                log.info("\t-> directory is unchanged since last run, nothing to do")
+                return
+        files, changed, listing = self._select_files(manifest)
+        self.failures = []
+        self.duplicates = {}
+        self.peak_rss = []
+        # longest-first dispatch, weighted by durations of the last run (if reported)
+        self.costs = CostModel(load_cost_history(self.report_path))
 
-        if multiprocess:
-            self._process_mp(files)
-        else:
-            self._process_sp(files)
+        files_todo = self._start_packing(files, changed) if self.pack else files
+        if self.metrics_path is not None or self.metrics_port is not None:
+            self.metrics = MetricsExporter(self.metrics_path, port=self.metrics_port)
+            self.metrics.start(len(files_todo))
+        try:
+            if multiprocess and self.backend == "thread":
+                self._process_threads(files_todo)
+            elif multiprocess:
+                self._process_mp(files_todo)
+            else:
+                self._process_sp(files_todo)
+        finally:
+            self._finish_packing()
+            if self.metrics is not None:
+                self.metrics.stop()
+                self.metrics = None
+            if self.profile_dir is not None:
+                # main process got profiled in single-process & thread-mode
+                dump_profile()
+        if self.save_meta and self.corpus_keywords:
+            self.rank_keywords_by_corpus(file.parent for file in files)
         # TODO: join multi-pdf
-        log.info(f"\t-> processing took {round(time.time() - timestamp_start, 2)} s")
+        duration = time.time() - timestamp_start
+        log.info(f"\t-> processing took {round(duration, 2)} s")
+        self.timer.log_summary()
+        self.save_failures()
+        if self.report_path is not None:
+            self.timer.save_report(
+                self.report_path,
+                extra={
+                    "files": len(files),
+                    "failures": len(self.failures),
+                    "duplicates": {
+                        dup.as_posix(): best.with_suffix(output_suffix(best, ".pdf")).as_posix()
+                        for dup, best in self.duplicates.items()
+                    },
+                    "duration": duration,
+                    "multiprocess": multiprocess,
+                    "backend": self.backend,
+                    "peak_rss_mib": {
+                        "p50": percentile(self.peak_rss, 50),
+                        "max": max(self.peak_rss, default=0.0),
+                    },
+                    "cost_history": self.costs.merged_history(),
+                },
+            )
+        if manifest is not None and listing is not None:
+            # last write into the directory, its mtime gets recorded
+            self._update_manifest(manifest, listing, files)
@@ -0,0 +1,52 @@
+"""Multi-page inputs (TIFFs of document-scanners & PDFs), processed frame by frame.
+
+Only the current frame is decoded, OCR'd and released before the next one, so
+memory is bounded by one page regardless of the page-count. Every frame leaves
+a one-page PDF & its text in the work-dir of the journal, the document gets
+merged from them at the end. Frames of large documents can therefore be spread
+over several workers (in ranges) and a restarted run continues with the missing ones.
+"""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+from PIL import Image
+
+from .pdf_input import is_pdf
+from .pdf_input import page_count
+
+multi_page_suffixes = [".tif", ".tiff"]
+frames_per_task = 4  # documents with more frames get split into ranges of this size
+page_separator = "\f"  # form-feed, like pdftotext
+
+
+def frame_count(path: Path) -> int:
+    """Count the frames from the header (1 for other formats or unreadable files)."""
+    if is_pdf(path):
+        return page_count(path)
+    if path.suffix.lower() not in multi_page_suffixes:
+        return 1
+    try:
+        with Image.open(path) as img:
+            return getattr(img, "n_frames", 1)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return 1
+
+
+def iter_frames(path: Path, frames: range) -> Iterator[tuple[int, Image.Image]]:
+    """Decode one frame after the other, a yielded frame is only valid until the next."""
+    with Image.open(path) as img:
+        for index in frames:
+            img.seek(index)  # drops the decoded data of the last frame
+            img.load()
+            yield index, img
+
+
+def frame_stage(index: int) -> str:
+    """Journal-stage of a finished frame."""
+    return f"frame{index:04d}"
+
+
+def frame_ranges(count: int, size: int = frames_per_task) -> list[range]:
+    """Split the frames into consecutive ranges, one task each."""
+    return [range(start, min(start + size, count)) for start in range(0, count, size)]
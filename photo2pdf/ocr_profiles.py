@@ -0,0 +1,109 @@
+"""Named tesseract-settings that trade speed against accuracy, selectable per pipeline-stage.
+
+fast:      tessdata_fast models, LSTM only, page as a single block of text
+           (single-column letters), no extra pass for inverted text
+balanced:  installed models with automatic page-segmentation (tesseract-defaults)
+best:      tessdata_best models, LSTM only, automatic page-segmentation
+
+The stages are the language-probe (first OCR-pass, without known language) and
+the final pass (OCR in detected language, PDF & OSD). A typical combination is a
+fast probe with a best final pass.
+
+The model-directories are taken from PHOTO2PDF_TESSDATA_FAST / PHOTO2PDF_TESSDATA_BEST
+or are looked up next to the installed tessdata (i.e. /usr/share/tesseract-ocr/5/).
+A profile falls back to the installed models if its directory misses a language.
+"""
+
+import os
+import re
+import subprocess
+from dataclasses import dataclass
+from dataclasses import field
+from functools import cache
+from pathlib import Path
+
+import pytesseract as pta
+
+from .logger import log
+
+ocr_stages = ["probe", "final"]
+
+
+@dataclass(frozen=True)
+class OCRProfile:
+    """Engine-settings of tesseract."""
+
+    name: str
+    models: str | None = None  # suffix of the tessdata-directory, i.e. "fast" -> tessdata_fast
+    oem: int | None = None  # 1: LSTM only
+    psm: int | None = None  # 3: automatic page-segmentation, 6: single block of text
+    variables: dict[str, str] = field(default_factory=dict)
+
+    def config(self, langs: str | None = None, *, osd: bool = False) -> str:
+        """Command-line options for pytesseract.
+
+        :param langs: tesseract-languages of the call, i.e. "deu+eng" (None means eng)
+        :param osd: for orientation & script detection, it brings its own engine & segmentation
+        """
+        options = []
+        langs = langs or "eng"
+        tessdata = tessdata_directory(self.models, f"{langs}+osd" if osd else langs)
+        if tessdata is not None:
+            options.append(f'--tessdata-dir "{tessdata}"')
+        if not osd and self.oem is not None:
+            options.append(f"--oem {self.oem}")
+        if not osd and self.psm is not None:
+            options.append(f"--psm {self.psm}")
+        options.extend(f"-c {key}={value}" for key, value in self.variables.items())
+        return " ".join(options)
+
+
+ocr_profiles: dict[str, OCRProfile] = {
+    "fast": OCRProfile("fast", models="fast", oem=1, psm=6, variables={"tessedit_do_invert": "0"}),
+    "balanced": OCRProfile("balanced"),
+    "best": OCRProfile("best", models="best", oem=1, psm=3),
+}
+
+
+def get_ocr_profile(name: str) -> OCRProfile:
+    """Look up a profile by name, raises for unknown names."""
+    if name not in ocr_profiles:
+        msg = f"OCR-profile must be one of {list(ocr_profiles)}"
+        raise ValueError(msg)
+    return ocr_profiles[name]
+
+
+@cache
+def installed_tessdata() -> Path | None:
+    """Model-directory of the installed tesseract, as reported by it."""
+    try:
+        result = subprocess.run(  # noqa: S603
+            [pta.pytesseract.tesseract_cmd, "--list-langs"],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'"(.+?)"', result.stdout + result.stderr)
+    return None if match is None else Path(match[1])
+
+
+@cache
+def tessdata_directory(models: str | None, langs: str) -> Path | None:
+    """Directory with the models for all languages, None to use the installed models."""
+    if models is None:
+        return None
+    path = os.environ.get(f"PHOTO2PDF_TESSDATA_{models.upper()}")
+    if path is None:
+        installed = installed_tessdata()
+        if installed is None:
+            return None
+        path = installed.parent / f"tessdata_{models}"
+    path = Path(path)
+    missing = [lang for lang in langs.split("+") if not (path / f"{lang}.traineddata").exists()]
+    if missing:
+        log.debug(f"\t-> tessdata_{models} has no models for {missing}, will use installed ones")
+        return None
+    return path
@@ -0,0 +1,320 @@
+"""Local HTTP-service: POST an image, get a searchable PDF, text & metadata.
+
+Workers are started once and keep tesseract-languages, language-model and
+date-parser loaded, so a request only pays for the actual processing. Uploads
+are processed in memory, only the engines get temporary files.
+Admission is bounded (busy workers + queue): excess requests get 429 right away
+instead of piling up. Optionally several queued requests are handed to a worker
+as one batch (less IPC-overhead for small pages).
+
+API (localhost only by default):
+    POST /ocr?text=1&meta=1&format=json   body: image (Content-Type: image/jpeg, ...)
+         -> JSON {"pdf": base64, "text": str, "meta": dict, "durations": dict}
+         format=pdf returns the PDF directly
+    GET  /status -> JSON with load, request-counters and latency-histograms
+"""
+
+import base64
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import InvalidStateError
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from multiprocessing import Pool
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+from .date_extraction import extract_date
+from .language_detection import detect_lang
+from .logger import log
+from .main_processing import ImageProcessor
+from .stage_timing import LatencyHistogram
+
+content_suffixes = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/tiff": ".tif",
+    "image/bmp": ".bmp",
+}
+body_size_max = 64 << 20  # bytes
+
+# per worker-process, one configured processor per combination of requested outputs
+_processors: dict[tuple[bool, bool], ImageProcessor] = {}
+_settings: dict = {}
+
+
+def _warm_up(settings: dict) -> None:
+    """Load all models in a new worker-process, before the first request arrives."""
+    _settings.update(settings)
+    _get_processor(save_text=True, save_meta=True)
+    detect_lang("warm up the language model")
+    extract_date("01.02.2020", "de")
+
+
+def _get_processor(*, save_text: bool, save_meta: bool) -> ImageProcessor:
+    key = (save_text, save_meta)
+    if key not in _processors:
+        _processors[key] = ImageProcessor(
+            save_text=save_text,
+            save_meta=save_meta,
+            use_manifest=False,
+            **_settings,
+        )
+    return _processors[key]
+
+
+def process_upload(job: tuple[bytes, str, bool, bool]) -> dict:
+    """Run the pipeline on one uploaded image (inside a worker-process)."""
+    data, suffix, save_text, save_meta = job
+    processor = _get_processor(save_text=save_text, save_meta=save_meta)
+    result = processor.process_image(data, name=f"upload{suffix}")
+    if result.error is not None:
+        return {"error": result.error}
+    return {
+        "pdf": result.pdf,
+        "text": result.text,
+        "meta": result.meta,
+        "durations": result.durations,
+    }
+
+
+def process_batch(jobs: list[tuple[bytes, str, bool, bool]]) -> list[dict]:
+    """Run the pipeline on a micro-batch of uploads (inside a worker-process)."""
+    return [process_upload(job) for job in jobs]
+
+
+def _resolve(future: Future, result: dict | None = None, xpt: BaseException | None = None) -> None:
+    """Set the outcome of a request once, a late answer (after its timeout) is dropped."""
+    try:
+        if xpt is None:
+            future.set_result(result)
+        else:
+            future.set_exception(xpt)
+    except InvalidStateError:
+        log.debug("\t-> dropped late answer of a worker")
+
+
+class OCRService:
+    """Warm worker-pool with bounded admission and micro-batching."""
+
+    def __init__(
+        self,
+        *,
+        workers: int | None = None,
+        queue_size: int = 16,
+        batch_size: int = 1,
+        batch_wait_s: float = 0.01,
+        timeout_s: float = 600,
+        settings: dict | None = None,
+    ) -> None:
+        """Start the workers.
+
+        :param queue_size: requests waiting for a worker, more get rejected (429)
+        :param batch_size: max requests handed to a worker at once
+        :param batch_wait_s: how long to wait for a batch to fill up
+        :param timeout_s: requests without answer (i.e. of a crashed worker) fail afterwards
+        :param settings: keyword-arguments for ImageProcessor, i.e. sheet_size_mm
+        """
+        self.pool = Pool(processes=workers, initializer=_warm_up, initargs=(settings or {},))
+        self.workers: int = self.pool._processes  # noqa: SLF001
+        self.capacity = self.workers * batch_size + queue_size
+        self.batch_size = batch_size
+        self.batch_wait_s = batch_wait_s
+        self.timeout_s = timeout_s
+        self._admission = threading.BoundedSemaphore(self.capacity)
+        self._pending: queue.Queue[tuple[tuple, Future]] = queue.Queue()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.responses: dict[int, int] = {}
+        self.latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+        self.started = time.time()
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, job: tuple[bytes, str, bool, bool]) -> Future | None:
+        """Queue a job, None if the service is at capacity."""
+        if not self._admission.acquire(blocking=False):
+            return None
+        future: Future = Future()
+        future.add_done_callback(lambda _: self._admission.release())
+        with self._lock:
+            self.in_flight += 1
+        self._pending.put(((job, time.perf_counter()), future))
+        return future
+
+    def _dispatch(self) -> None:
+        """Collect micro-batches and hand them to the pool (without blocking)."""
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.perf_counter() + self.batch_wait_s
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, batch: list[tuple[tuple, Future]]) -> None:
+        futures = [future for _, future in batch]
+        with self._lock:
+            for (_, queued), _ in batch:
+                self.queue_wait.observe(time.perf_counter() - queued)
+
+        def expired() -> None:
+            xpt = TimeoutError("worker did not answer")
+            for future in futures:
+                _resolve(future, xpt=xpt)
+
+        # a dying worker never answers (no callback), without the watchdog the futures
+        # and their admission-slots would leak until the service rejects everything
+        watchdog = threading.Timer(self.timeout_s, expired)
+        watchdog.daemon = True
+        watchdog.start()
+
+        def done(results: list[dict]) -> None:
+            watchdog.cancel()
+            for future, result in zip(futures, results, strict=True):
+                _resolve(future, result)
+
+        def failed(xpt: BaseException) -> None:
+            watchdog.cancel()
+            for future in futures:
+                _resolve(future, xpt=xpt)
+
+        self.pool.apply_async(
+            process_batch,
+            ([job for (job, _), _ in batch],),
+            callback=done,
+            error_callback=failed,
+        )
+
+    def record(self, status: int, duration: float | None) -> None:
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+            if duration is not None:
+                self.in_flight -= 1
+                self.latency.observe(duration)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "batch_size": self.batch_size,
+                "in_flight": self.in_flight,
+                "responses": {str(code): count for code, count in self.responses.items()},
+                "latency_s": self.latency.to_dict(),
+                "queue_wait_s": self.queue_wait.to_dict(),
+            }
+
+    def close(self) -> None:
+        self.pool.terminate()
+        self.pool.join()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: OCRService
+    timeout_s: float
+
+    def _send_json(self, status: int, content: dict) -> None:
+        body = json.dumps(content, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        log.debug(f"\t-> {self.address_string()} {format % args}")
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path == "/status":
+            self._send_json(HTTPStatus.OK, self.service.status())
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "unknown endpoint"})
+
+    def do_POST(self) -> None:
+        timestamp = time.perf_counter()
+        url = urlparse(self.path)
+        if url.path != "/ocr":
+            self._reply(HTTPStatus.NOT_FOUND, {"error": "unknown endpoint"})
+            return
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        suffix = content_suffixes.get(content_type)
+        if suffix is None:
+            msg = f"Content-Type must be one of {list(content_suffixes)}"
+            self._reply(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, {"error": msg})
+            return
+        header = self.headers.get("Content-Length", "")
+        length = int(header) if header.isdecimal() else 0
+        if length < 1:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": "empty body"})
+            return
+        if length > body_size_max:
+            self._reply(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"})
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        save_text = query.get("text", "1") == "1"
+        save_meta = query.get("meta", "0") == "1"
+        data = self.rfile.read(length)
+
+        future = self.service.submit((data, suffix, save_text, save_meta))
+        if future is None:
+            self._reply(HTTPStatus.TOO_MANY_REQUESTS, {"error": "busy, retry later"})
+            return
+        try:
+            result = future.result(timeout=self.timeout_s)
+        except TimeoutError:
+            self._reply(HTTPStatus.GATEWAY_TIMEOUT, {"error": "timeout"}, timestamp)
+            return
+        except Exception as xpt:  # noqa: BLE001
+            self._reply(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(xpt)}, timestamp)
+            return
+        if result.get("error") is not None:
+            self._reply(HTTPStatus.UNPROCESSABLE_ENTITY, result, timestamp)
+        elif query.get("format") == "pdf" and result["pdf"] is not None:
+            self.service.record(HTTPStatus.OK, time.perf_counter() - timestamp)
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(result["pdf"])))
+            self.end_headers()
+            self.wfile.write(result["pdf"])
+        else:
+            if result["pdf"] is not None:
+                result["pdf"] = base64.b64encode(result["pdf"]).decode("ascii")
+            self._reply(HTTPStatus.OK, result, timestamp)
+
+    def _reply(self, status: int, content: dict, timestamp: float | None = None) -> None:
+        """Send JSON and account it, timestamp is given for admitted requests."""
+        self.service.record(status, None if timestamp is None else time.perf_counter() - timestamp)
+        self._send_json(status, content)
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    *,
+    timeout_s: float = 600,
+    **kwargs: object,
+) -> None:
+    """Run the service until interrupted, kwargs are passed to OCRService."""
+    service = OCRService(timeout_s=timeout_s, **kwargs)
+    handler = type("Handler", (_Handler,), {"service": service, "timeout_s": timeout_s})
+    server = ThreadingHTTPServer((host, port), handler)
+    log.info(f"Serving on http://{host}:{port} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
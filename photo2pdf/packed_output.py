@@ -0,0 +1,157 @@
+"""Stream results of a batch into a few zip-containers instead of many small files.
+
+On network-shares every small file costs several metadata round-trips. Packs
+are written strictly sequentially in large chunks (zip with stored entries and
+data-descriptors, so nothing is patched afterward). A sidecar index holds the
+position of every entry for random access without parsing the zip.
+Packs can be extracted to the usual per-file layout later on.
+"""
+
+import json
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import Self
+
+from .job_journal import atomic_output
+from .job_journal import atomic_write_text
+from .logger import log
+
+pack_prefix = "photo2pdf_"
+index_suffix = ".index.json"
+pack_size_max = 1 << 30  # bytes, start a new part afterward
+buffer_size = 8 << 20  # bytes, written in one call
+
+
+class _SequentialFile:
+    """Append-only buffered file without seek/tell, zipfile won't go back to patch headers."""
+
+    def __init__(self, path: Path, chunk_size: int = buffer_size) -> None:
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._buffer = bytearray()
+        self._chunk_size = chunk_size
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        with memoryview(self._buffer) as view:
+            written = 0
+            while written < len(view):
+                written += os.write(self._fd, view[written:])
+        self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        os.close(self._fd)
+
+
+class PackWriter:
+    """Add outputs to zip-parts in a directory, indexes get written on close."""
+
+    def __init__(self, directory: Path, *, size_max: int = pack_size_max) -> None:
+        self.directory = directory
+        self.size_max = size_max
+        self.name = f"{pack_prefix}{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.packs: list[Path] = []
+        self._part = 0
+        self._zip: zipfile.ZipFile | None = None
+        self._stream: _SequentialFile | None = None
+        self._index: dict[str, list[int]] = {}
+        self._size = 0
+
+    def _open_part(self) -> None:
+        self._part += 1
+        path = self.directory / f"{self.name}_{self._part:03d}.zip"
+        self.packs.append(path)
+        self._stream = _SequentialFile(path.with_name(f".{path.name}.part"))
+        self._zip = zipfile.ZipFile(self._stream, "w", compression=zipfile.ZIP_STORED)
+        self._index = {}
+        self._size = 0
+
+    def _close_part(self) -> None:
+        if self._zip is None or self._stream is None:
+            return
+        self._zip.close()
+        self._stream.close()
+        path = self.packs[-1]
+        path.with_name(f".{path.name}.part").replace(path)
+        atomic_write_text(
+            path.with_name(path.name + index_suffix), json.dumps(self._index), encoding="utf-8"
+        )
+        log.debug(f"\t-> packed {len(self._index)} files into {path.name}")
+        self._zip = None
+        self._stream = None
+
+    def add(self, name: str, data: bytes) -> None:
+        """Store data as entry name (relative path, i.e. 'scan_001.pdf')."""
+        if self._zip is None or (self._size + len(data) > self.size_max and self._index):
+            self._close_part()
+            self._open_part()
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        self._zip.writestr(info, data)
+        # local header: 30 bytes + filename (no extra-field for stored entries below 4 GiB)
+        offset = info.header_offset + 30 + len(info.filename.encode("utf-8"))
+        self._index[name] = [offset, len(data), info.CRC]
+        self._size += len(data)
+
+    def add_file(self, path: Path, name: str | None = None) -> None:
+        """Move a (local) file into the pack."""
+        self.add(path.name if name is None else name, path.read_bytes())
+        path.unlink()
+
+    def close(self) -> None:
+        self._close_part()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_args: object) -> None:
+        self.close()
+
+
+def load_pack_index(directory: Path) -> dict[str, tuple[Path, int, int]]:
+    """Get entry-name -> (pack, offset, size) of all packs in directory, newest wins."""
+    entries: dict[str, tuple[Path, int, int]] = {}
+    for path_index in sorted(directory.glob(f"{pack_prefix}*.zip{index_suffix}")):
+        path_pack = path_index.with_name(path_index.name.removesuffix(index_suffix))
+        with path_index.open(encoding="utf-8") as file:
+            index = json.load(file)
+        for name, (offset, size, _crc) in index.items():
+            entries[name] = (path_pack, offset, size)
+    return entries
+
+
+def read_packed(entry: tuple[Path, int, int]) -> bytes:
+    """Random access to one entry of a pack (see load_pack_index())."""
+    path_pack, offset, size = entry
+    with path_pack.open("rb") as file:
+        file.seek(offset)
+        return file.read(size)
+
+
+def extract_packs(path: Path, destination: Path | None = None) -> int:
+    """Restore the per-file layout from a pack or all packs of a directory.
+
+    :param destination: defaults to the directory of the pack(s), existing files are kept
+    :return: number of extracted files
+    """
+    packs = [path] if path.is_file() else sorted(path.glob(f"{pack_prefix}*.zip"))
+    count = 0
+    for path_pack in packs:
+        target = path_pack.parent if destination is None else destination
+        target.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(path_pack) as archive:
+            for info in archive.infolist():
+                path_out = target / Path(info.filename).name
+                if path_out.exists():
+                    log.debug(f"File exists, won't overwrite ({path_out})")
+                    continue
+                with atomic_output(path_out) as path_temp:
+                    path_temp.write_bytes(archive.read(info))
+                count += 1
+    return count
@@ -0,0 +1,107 @@
+"""Compact B/W-pages, rows of 1-bit pixels (np.packbits) - 8x smaller than uint8.
+
+After binarization a page only holds black & white. It stays packed for the
+handoff to tesseract (PBM uses the same layout, nothing gets unpacked), as
+checkpoint in the journal and for the transfer between processes, where only
+a handle to shared memory gets pickled. Pixels are unpacked only on request.
+"""
+
+import re
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+from PIL import Image
+
+_pbm_header = re.compile(rb"P4\s+(\d+)\s+(\d+)\s")
+
+
+@dataclass
+class PackedPage:
+    """B/W-page with 8 pixels per byte, a set bit is ink (black), rows are byte-aligned."""
+
+    bits: np.ndarray  # uint8 of shape (height, ceil(width / 8))
+    width: int
+    dpi: int | None = None
+
+    @classmethod
+    def from_binary(cls, img: np.ndarray, dpi: int | None = None) -> "PackedPage":
+        """Pack a B/W-image (ink 0, paper 255)."""
+        return cls(np.packbits(img < 128, axis=1), img.shape[1], dpi)
+
+    @property
+    def height(self) -> int:
+        return self.bits.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def unpack(self) -> np.ndarray:
+        """Pixels as uint8, ink 0 and paper 255."""
+        img = np.unpackbits(self.bits, axis=1, count=self.width)
+        img ^= 1
+        img *= 255
+        return img
+
+    def to_image(self) -> Image.Image:
+        """PIL-image of mode '1', made from the packed rows directly."""
+        image = Image.frombytes("1", (self.width, self.height), self.bits.tobytes(), "raw", "1;I")
+        if self.dpi is not None:
+            image.info["dpi"] = (self.dpi, self.dpi)
+        return image
+
+    def write_pbm(self, file: BinaryIO) -> None:
+        """Binary PBM (P4), its rows have the same layout as the packed bits."""
+        file.write(f"P4\n{self.width} {self.height}\n".encode("ascii"))
+        file.write(np.ascontiguousarray(self.bits).data)
+
+    @classmethod
+    def read_pbm(cls, path: Path, dpi: int | None = None) -> "PackedPage":
+        data = path.read_bytes()
+        header = _pbm_header.match(data)
+        if header is None:
+            msg = f"{path.name} is no binary PBM"
+            raise ValueError(msg)
+        width, height = int(header[1]), int(header[2])
+        bits = np.frombuffer(data, dtype=np.uint8, offset=header.end())
+        return cls(bits.reshape(height, -1), width, dpi)
+
+    def share(self) -> "SharedPage":
+        """Copy into shared memory, the returned handle is cheap to pickle.
+
+        The creator has to unlink() the handle, once the receiver is done.
+        """
+        memory = SharedMemory(create=True, size=max(self.nbytes, 1))
+        np.ndarray(self.bits.shape, dtype=np.uint8, buffer=memory.buf)[:] = self.bits
+        page = SharedPage(memory.name, self.height, self.width, self.dpi)
+        memory.close()
+        return page
+
+
+@dataclass
+class SharedPage:
+    """Handle of a packed page in shared memory, only name & geometry cross the process-pipe."""
+
+    name: str
+    height: int
+    width: int
+    dpi: int | None = None
+
+    def load(self) -> PackedPage:
+        """Copy of the page (the receiving side), the shared block stays with its creator."""
+        # only the creator tracks the block, otherwise exiting workers would remove it
+        memory = SharedMemory(name=self.name, track=False)
+        try:
+            shape = (self.height, (self.width + 7) // 8)
+            bits = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf).copy()
+        finally:
+            memory.close()
+        return PackedPage(bits, self.width, self.dpi)
+
+    def unlink(self) -> None:
+        memory = SharedMemory(name=self.name)
+        memory.close()
+        memory.unlink()
@@ -28,7 +28,9 @@ import subprocess
 import sys
 from pathlib import Path
 
+from .engine_limits import engine_slot
 from .logger import log
+from .stage_timing import StageTimer
 
 
 class CompressPDF:
@@ -38,8 +40,12 @@ class CompressPDF:
         ghostscript_path: Path | None = None,
         *,
         show_info: bool = False,
+        timer: StageTimer | None = None,
+        timeout: float | None = None,
     ) -> None:
         self.compress_level = compress_level
+        self.timeout = timeout  # seconds, ghostscript gets killed afterwards
+        self.timer = StageTimer() if timer is None else timer
 
         if ghostscript_path is None:
             self.gs_path = "gs"
@@ -50,6 +56,48 @@ class CompressPDF:
 
         self.show_compress_info = show_info
 
+    def _options(self, page_size_mm: tuple | None = None) -> list[str]:
+        pre_opt = [
+            self.gs_path,
+            "-sDEVICE=pdfwrite",
+            f"-dPDFSETTINGS={self.quality[self.compress_level]}",
+            "-dCompatibilityLevel=1.7",
+            "-dNOPAUSE",
+            "-dQUIET",
+            "-dBATCH",
+        ]
+
+        # Proper PDF Controls and Features: https://www.ghostscript.com/doc/current/VectorDevices.htm
+        # -dColorConversionStrategy=/Gray -dProcessColorModel=/DeviceGray
+        # -dPrinted=false -> Preserve hyperlinks
+        # TODO: switch to do black/white
+        if page_size_mm is not None:
+            pre_opt += [
+                f"-dDEVICEWIDTHPOINTS={round(page_size_mm[0] * 72 / 25.4)}",
+                f"-dDEVICEHEIGHTPOINTS={round(page_size_mm[1] * 72 / 25.4)}",
+                "-dPDFFitPage",
+            ]
+        return pre_opt
+
+    def merge(self, file_paths_in: list[Path], file_path_out: Path) -> bool:
+        """Concatenate PDFs (i.e. pages of a multi-page TIFF), compressed on the way.
+
+        Ghostscript reads one input after the other, memory does not grow with the pages.
+        """
+        try:
+            with engine_slot("ghostscript"), self.timer.measure("ghostscript"):
+                returncode = subprocess.call(  # noqa: S603
+                    [*self._options(), f"-sOutputFile={file_path_out}", *file_paths_in],
+                    timeout=self.timeout,
+                )
+        except (OSError, subprocess.SubprocessError) as error:
+            log.warning(f"Ghostscript could not merge PDFs: {error!r}")
+            return False
+        if returncode != 0:
+            log.warning(f"Ghostscript failed with exit-code {returncode}")
+            return False
+        return True
+
     def compress(self, file_path_in: Path, file_path_out: Path, page_size_mm: tuple | None = None):
         """
         Function to compress PDF via Ghostscript command line interface
@@ -67,28 +115,16 @@ class CompressPDF:
             if file_path_in.suffix.lower() != ".pdf":
                 raise Exception("Error: input file is not a PDF")
 
-            pre_opt = [
-                self.gs_path,
-                "-sDEVICE=pdfwrite",
-                f"-dPDFSETTINGS={self.quality[self.compress_level]}",
-                "-dCompatibilityLevel=1.7",
-                "-dNOPAUSE",
-                "-dQUIET",
-                "-dBATCH",
-            ]
+            pre_opt = self._options(page_size_mm)
 
-            # Proper PDF Controls and Features: https://www.ghostscript.com/doc/current/VectorDevices.htm
-            # -dColorConversionStrategy=/Gray -dProcessColorModel=/DeviceGray
-            # -dPrinted=false -> Preserve hyperlinks
-            # TODO: switch to do black/white
-            if page_size_mm is not None:
-                pre_opt += [
-                    f"-dDEVICEWIDTHPOINTS={round(page_size_mm[0] * 72 / 25.4)}",
-                    f"-dDEVICEHEIGHTPOINTS={round(page_size_mm[1] * 72 / 25.4)}",
-                    "-dPDFFitPage",
-                ]
-
-            subprocess.call(pre_opt + [f"-sOutputFile={file_path_out}", file_path_in])
+            with engine_slot("ghostscript"), self.timer.measure("ghostscript"):
+                returncode = subprocess.call(
+                    pre_opt + [f"-sOutputFile={file_path_out}", file_path_in],
+                    timeout=self.timeout,
+                )
+            if returncode != 0:
+                log.warning(f"Ghostscript failed with exit-code {returncode}")
+                return False
 
             if self.show_compress_info:
                 initial_size = file_path_in.stat().st_size
@@ -0,0 +1,162 @@
+"""PDF-inputs (i.e. image-only scans of office-copiers) get an invisible text-layer.
+
+The page-image is taken directly from the PDF if the page consists of a single
+image, other pages get rasterized by ghostscript. Tesseract only renders the
+text (textonly_pdf), which is laid over the original page, so the image-streams
+are copied without re-encoding. Pages that already contain text are skipped.
+The searchable copy is stored next to the input as <name>.ocr.pdf.
+
+Needs the optional dependency pypdf (pip install pypdf).
+"""
+
+import os
+import subprocess
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+from PIL import Image
+
+from .engine_limits import engine_slot
+
+try:
+    import pypdf
+except ImportError:  # optional
+    pypdf = None
+
+pdf_output_suffix = ".ocr.pdf"
+raster_dpi = 300
+aspect_tolerance = 0.02  # relative, for an embedded image to count as full page
+
+
+def is_pdf(path: Path) -> bool:
+    """Check the suffix, PDFs are processed page by page."""
+    return path.suffix.lower() == ".pdf"
+
+
+def has_pypdf() -> bool:
+    """Check if the optional dependency pypdf is installed."""
+    return pypdf is not None
+
+
+def require_pypdf() -> None:
+    """Raise with an install-hint if pypdf is missing."""
+    if pypdf is None:
+        msg = "PDF-inputs need the optional dependency pypdf (pip install pypdf)"
+        raise RuntimeError(msg)
+
+
+def page_count(path: Path) -> int:
+    """Pages of the PDF, 1 if it can't be read (the error shows up when processing it)."""
+    if pypdf is None:
+        return 1
+    try:
+        return len(pypdf.PdfReader(path).pages)
+    except (OSError, pypdf.errors.PyPdfError):
+        return 1
+
+
+def embedded_image(page: "pypdf.PageObject") -> tuple[Image.Image, int] | None:
+    """Only image of a page that fills it & its dpi, None if the page has to be rasterized."""
+    try:
+        if len(page.images) != 1:
+            return None
+        image = page.images[0].image
+    except (NotImplementedError, ValueError, OSError, pypdf.errors.PyPdfError):
+        return None  # i.e. JBIG2 can't be decoded by pypdf
+    if image is None:
+        return None
+    width_pt, height_pt = float(page.mediabox.width), float(page.mediabox.height)
+    if abs(image.width / image.height / (width_pt / height_pt) - 1) > aspect_tolerance:
+        return None
+    return image, round(image.width / width_pt * 72)
+
+
+def rasterize_page(
+    path: Path, index: int, dpi: int = raster_dpi, timeout: float | None = None
+) -> Image.Image:
+    """Render one page with ghostscript (8 bit gray)."""
+    handle, name = tempfile.mkstemp(prefix="photo2pdf_", suffix=".png")
+    os.close(handle)
+    path_png = Path(name)
+    try:
+        with engine_slot("ghostscript"):
+            subprocess.run(  # noqa: S603
+                [  # noqa: S607
+                    "gs",
+                    "-q",
+                    "-dNOPAUSE",
+                    "-dBATCH",
+                    "-dSAFER",
+                    "-sDEVICE=pnggray",
+                    f"-r{dpi}",
+                    f"-dFirstPage={index + 1}",
+                    f"-dLastPage={index + 1}",
+                    f"-sOutputFile={path_png}",
+                    path.as_posix(),
+                ],
+                check=True,
+                timeout=timeout,
+            )
+        with Image.open(path_png) as image:
+            image.load()
+            return image
+    except (OSError, subprocess.SubprocessError) as xpt:
+        msg = f"ghostscript could not rasterize page {index} of {path.name}"
+        raise RuntimeError(msg) from xpt
+    finally:
+        path_png.unlink(missing_ok=True)
+
+
+def iter_pages(
+    path: Path, pages: list[int], timeout: float | None = None
+) -> Iterator[tuple[int, str, Image.Image | None, int]]:
+    """Existing text, or image & dpi of the pages, one after the other.
+
+    Pages with text come without image, all others with an empty text.
+    """
+    require_pypdf()
+    reader = pypdf.PdfReader(path)
+    for index in pages:
+        page = reader.pages[index]
+        text = page.extract_text() or ""
+        if text.strip():
+            yield index, text, None, 0
+            continue
+        found = embedded_image(page)
+        if found is None:
+            image = rasterize_page(path, index, timeout=timeout)
+            # ghostscript renders the page as displayed, the text-layer lives in page-space
+            found = image.rotate(page.rotation, expand=True), raster_dpi
+        yield index, "", *found
+
+
+def concatenate_pages(paths_input: list[Path], path_output: Path) -> None:
+    """Join PDFs (i.e. pages of a multi-page TIFF) losslessly, image-streams are copied."""
+    require_pypdf()
+    writer = pypdf.PdfWriter()
+    for path_input in paths_input:
+        writer.append(path_input)
+    with path_output.open("wb") as file:
+        writer.write(file)
+
+
+def overlay_text_layers(path_input: Path, layers: dict[int, Path], path_output: Path) -> None:
+    """Lay the text-only pages over the original pages, image-streams stay untouched."""
+    require_pypdf()
+    writer = pypdf.PdfWriter(clone_from=path_input)
+    for index, path_layer in layers.items():
+        page = writer.pages[index]
+        layer = pypdf.PdfReader(path_layer).pages[0]
+        box = page.mediabox
+        transformation = (
+            pypdf.Transformation()
+            .scale(
+                float(box.width) / float(layer.mediabox.width),
+                float(box.height) / float(layer.mediabox.height),
+            )
+            .translate(float(box.left), float(box.bottom))
+        )
+        page.merge_transformed_page(layer, transformation, over=True)
+    with path_output.open("wb") as file:
+        writer.write(file)
@@ -8,24 +8,70 @@ import cv2
 import numpy as np
 from matplotlib import pyplot as plt
 
+from .binarization_tuning import TuningResult
+from .binarization_tuning import tune_darken_percent
 from .logger import log
+from .packed_page import PackedPage
+from .stage_timing import StageTimer
+from .template_bank import TemplateBank
+from .template_bank import bank_scales
+from .template_bank import load_template_bank
+from .template_bank import load_threshold_profile
+
+
+class FrameBuffers:
+    """Reusable full-frame arrays by name, reallocated only if a frame needs more room.
+
+    Photos of one batch mostly share their size, so after the first image
+    the preprocessing runs without allocating new frames.
+    """
+
+    def __init__(self) -> None:
+        self._arrays: dict[str, np.ndarray] = {}
+
+    def get(self, name: str, shape: tuple[int, ...], dtype: type = np.uint8) -> np.ndarray:
+        """Get a contiguous array of shape, its content is undefined (like np.empty)."""
+        size = math.prod(shape)
+        array = self._arrays.get(name)
+        if array is None or array.dtype != dtype or array.size < size:
+            array = np.empty(size, dtype)
+            self._arrays[name] = array
+        return array[:size].reshape(shape)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self._arrays.values())
 
 
 class FindFeature:
-    def __init__(self, path_reference_feature: Path, ccw_90deg_rotation_steps: int = 0) -> None:
+    def __init__(
+        self,
+        path_reference_feature: Path,
+        ccw_90deg_rotation_steps: int = 0,
+        *,
+        bank: TemplateBank | None = None,
+        scale: float = 1.0,
+    ) -> None:
         """
         :param path_reference_feature: supply feature, complete or relative path, with .jpg file ending
         :param ccw_90deg_rotation_steps: if the expected test-picture is rotated you can state that here
+        :param bank: take the precomputed variants of the feature instead of reading the file
+        :param scale: pyramid-scale of the feature in the bank
         """
         if not path_reference_feature.exists():
             sys.exit(f"Error: input  file '{path_reference_feature}' does not exist")
 
         self.img_static_objects: np.ndarray = None
 
-        img_01 = cv2.imread(path_reference_feature.as_posix(), 0)
-        self.img_ref_raw: np.ndarray = np.rot90(img_01, ccw_90deg_rotation_steps)
-        self.img_ref_positive: np.ndarray = self.enhance_details(self.img_ref_raw.copy())
-        self.img_ref_negative: np.ndarray = ~self.img_ref_positive.copy()
+        if bank is None:
+            img_01 = cv2.imread(path_reference_feature.as_posix(), 0)
+            self.img_ref_raw: np.ndarray = np.rot90(img_01, ccw_90deg_rotation_steps)
+            self.img_ref_positive: np.ndarray = self.enhance_details(self.img_ref_raw.copy())
+            self.img_ref_negative: np.ndarray = ~self.img_ref_positive.copy()
+        else:
+            self.img_ref_raw = bank.get(ccw_90deg_rotation_steps, "raw", scale)
+            self.img_ref_positive = bank.get(ccw_90deg_rotation_steps, "positive", scale)
+            self.img_ref_negative = bank.get(ccw_90deg_rotation_steps, "negative", scale)
 
         self.img_ref_width: int = self.img_ref_raw.shape[::-1][0]
         self.img_ref_height: int = self.img_ref_raw.shape[::-1][1]
@@ -99,7 +145,14 @@ class FindFeature:
         smooth = (cumsum[window_size:] - cumsum[:-window_size]) / float(window_size)
         return smooth
 
-    def enhance_details(self, img_input: np.ndarray, darken_percent: int = 60) -> np.ndarray:
+    @staticmethod
+    def enhance_details(
+        img_input: np.ndarray,
+        darken_percent: int = 60,
+        *,
+        dst: np.ndarray | None = None,
+        invert: bool = False,
+    ) -> np.ndarray:
         """
         Exchangeable function that tries to highlight the feature by filtering
         this approach expects an image that biggest surface consists of background
@@ -108,24 +161,31 @@ class FindFeature:
            - current hist-value is smaller 10% of peak-value (tuning value)
         :param darken_percent: 0 to 100,
         :param img_input: ...
+        :param dst: write result into this array (may be img_input itself)
+        :param invert: background white instead of black, saves an extra pass
         :return: enhanced image
         """
         if darken_percent < 0 or darken_percent > 100:
             sys.exit("FindFeature.enhance_detail() -> cut_point must be between 0 and 100")
-        smooth_span = 2
-        histogram = cv2.calcHist([img_input], [0], None, [256], [0, 256])
-        histogram = self.smooth_vector(histogram, smooth_span)
-        light_peak_position = np.argmax(histogram[:127])
-        dark_peak_position = np.argmax(histogram[128:]) + 128
+        light_peak_position, dark_peak_position = FindFeature.histogram_peaks(img_input)
 
         cut_position = round(
             (dark_peak_position - light_peak_position) * darken_percent / 100 + light_peak_position
         )
 
-        image_mask = np.zeros_like(img_input)
-        image_mask[img_input < cut_position] = 255
+        # darker than cut -> 255 (or 0 if inverted), integer-pixels: "< cut" equals "<= cut - 1"
+        method = cv2.THRESH_BINARY if invert else cv2.THRESH_BINARY_INV
+        _, image_mask = cv2.threshold(img_input, cut_position - 1, 255, method, dst=dst)
         return image_mask
 
+    @staticmethod
+    def histogram_peaks(img_input: np.ndarray) -> tuple[int, int]:
+        """Find the peaks of the dark (below 127) and the bright half of the smoothed histogram."""
+        smooth_span = 2
+        histogram = cv2.calcHist([img_input], [0], None, [256], [0, 256])
+        histogram = FindFeature.smooth_vector(histogram, smooth_span)
+        return int(np.argmax(histogram[:127])), int(np.argmax(histogram[128:]) + 128)
+
     def debug_details(self, img_input: np.ndarray) -> None:
         """
         Analyze histrogram of current processing pipeline
@@ -175,6 +235,8 @@ class FindFeature:
         thresholds: tuple[float, float] = None,
         enable_recursion: bool = False,
         recursion_depth: int = 0,
+        *,
+        buffers: FrameBuffers | None = None,
     ) -> list[tuple[int, int, float, int, int, float, float]]:
         """
         Get a list of features on the provided picture
@@ -182,18 +244,29 @@ class FindFeature:
         :param img_test_raw:
         :param thresholds: values for positive and negative feature detection
         :param recursion_depth: this fn can call itself, so this value gets incremented
+        :param buffers: reuse intermediate frames (i.e. of the SheetFilter)
         :return: meta data of features
         """
-        img_test_positive = self.enhance_details(img_test_raw)
-        img_test_negative = ~img_test_positive.copy()
+        if buffers is None:
+            buffers = FrameBuffers()
+        shape = img_test_raw.shape
+        img_test_positive = self.enhance_details(img_test_raw, dst=buffers.get("positive", shape))
+        img_test_negative = cv2.bitwise_not(img_test_positive, dst=buffers.get("negative", shape))
 
         # TODO: copyMakeBorder to even find feature (half) out of frame
 
+        shape_match = (shape[0] - self.img_ref_height + 1, shape[1] - self.img_ref_width + 1)
         img_match_positive = cv2.matchTemplate(
-            img_test_positive, self.img_ref_positive, self.method
+            img_test_positive,
+            self.img_ref_positive,
+            self.method,
+            result=buffers.get("match_positive", shape_match, np.float32),
         )
         img_match_negative = cv2.matchTemplate(
-            img_test_negative, self.img_ref_negative, self.method
+            img_test_negative,
+            self.img_ref_negative,
+            self.method,
+            result=buffers.get("match_negative", shape_match, np.float32),
         )
 
         if thresholds is None:
@@ -237,6 +310,7 @@ class FindFeature:
                 (thresholds[0] - 0.1, thresholds[1] - 0.1),
                 enable_recursion,
                 recursion_depth + 1,
+                buffers=buffers,
             )
         return list_match
 
@@ -327,7 +401,12 @@ class FindFeature:
         miss_scores = []
 
         for file_in_dir in directories_main:
-            feature_list = self.find_feature(file_in_dir)  # TODO: open picture first? or in there?
+            img_test = cv2.imread(file_in_dir.as_posix(), 0)
+            if img_test is None:
+                log.debug(f"Skipping '{file_in_dir.name}', not an image")
+                continue
+            feature_list = self.find_feature(img_test)
+            feature_list.sort(key=lambda feature: feature[6], reverse=True)
             if (len(feature_list) >= 1) and (expected_features > 0):
                 for match in range(min(len(feature_list), expected_features)):
                     match_scores.append(feature_list[match][6])
@@ -377,6 +456,9 @@ class FindFeature:
         )
 
 
+page_detectors = ["template", "contour"]
+
+
 class SheetFilter:
     """
     This Class does the following:
@@ -388,14 +470,45 @@ class SheetFilter:
     - feature / Edge must be centered
     """
 
-    def __init__(self, sheet_size: tuple, edge_crop_percent: float = 2) -> None:
+    def __init__(
+        self,
+        sheet_size: tuple,
+        edge_crop_percent: float = 2,
+        detector: str = "template",
+        template_scale: float = 1.0,
+        threshold_profile: dict[str, dict] | None = None,
+    ) -> None:
+        """Load the corner-features in four rotations and their trained thresholds.
+
+        :param detector: "template" matches a corner-feature in four rotations (full frame),
+                         "contour" looks for the largest quadrilateral in a downscaled frame
+                         and falls back to template matching if that fails
+        :param template_scale: match on a downscaled frame, one of the bank-scales (1, 0.5, 0.25)
+        :param threshold_profile: trained thresholds per scale, defaults to the profile in the cache
+        """
+        if template_scale not in bank_scales:
+            msg = f"Template-scale must be one of {bank_scales}"
+            raise ValueError(msg)
+        if detector not in page_detectors:
+            msg = f"Page-detector must be one of {page_detectors}"
+            raise ValueError(msg)
+        self.detector = detector
+        # long edge of the downscaled frame for contour-detection
+        self.detection_size = 800
         self.feature_path = Path(__file__).parent / "feature_paper_edge.png"
+        self.template_scale = template_scale
+        bank = load_template_bank(self.feature_path, FindFeature.enhance_details)
         self.features: list[FindFeature] = [
-            FindFeature(self.feature_path, 0),
-            FindFeature(self.feature_path, 1),
-            FindFeature(self.feature_path, 2),
-            FindFeature(self.feature_path, 3),
+            FindFeature(self.feature_path, rotation, bank=bank, scale=template_scale)
+            for rotation in range(4)
         ]
+        # thresholds trained on sample-photos (photo2pdf train)
+        if threshold_profile is None:
+            threshold_profile = load_threshold_profile()
+        profile = threshold_profile.get(str(template_scale))
+        if profile is not None:
+            for feature, thresholds in zip(self.features, profile["thresholds"], strict=True):
+                feature.threshold_positive, feature.threshold_negative = thresholds
         self.img = None
         self.img_width = 0
         self.img_height = 0
@@ -404,12 +517,32 @@ class SheetFilter:
             sys.exit("Error: the feature must be square (for now)")
         self.feature_offset = self.features[0].img_ref_height / 2
         self.edge_crop = edge_crop_percent / 100
+        # exchangeable, i.e. to collect the timings of one file in the pipeline
+        self.timer = StageTimer()
+        # intermediate frames live as long as the filter (one per worker)
+        self.buffers = FrameBuffers()
 
     def open_picture(self, file_path: Path) -> None:
         if not file_path.exists():
             sys.exit(f"Error: input  file '{file_path}' does not exist")
 
-        self.img = cv2.imread(file_path.as_posix(), 0)
+        with self.timer.measure("decode"):
+            # freshly decoded -> owned by the filter, no copy needed
+            self._use_picture(cv2.imread(file_path.as_posix(), 0))
+
+    def set_picture(self, img: np.ndarray) -> None:
+        """Use an already decoded grayscale image, i.e. a frame of a multi-page file.
+
+        The image gets copied into a buffer, because the filter modifies its frames
+        in place and must neither write into the array of the caller nor fail on a
+        read-only one.
+        """
+        frame = self.buffers.get("frame", img.shape)
+        np.copyto(frame, img)
+        self._use_picture(frame)
+
+    def _use_picture(self, img: np.ndarray) -> None:
+        self.img = img
         self.img_width, self.img_height = self.img.shape[::-1]
 
     def train_feature_threshold(self) -> None:
@@ -418,19 +551,87 @@ class SheetFilter:
                 self.img, expected_features=1
             )  # TODO: optimize this. only load file once
 
-    def correct_perspective(self) -> bool:
+    def find_corners(self) -> list[tuple[float, float]] | None:
+        """Get sheet-corners (upper-left, lower-left, lower-right, upper-right), None if failed."""
+        corners = None
+        if self.detector == "contour":
+            corners = self.find_corners_contour()
+            if corners is None:
+                log.debug("\t-> found no page-contour, will fall back to template matching")
+        if corners is None:
+            corners = self.find_corners_template()
+        return corners
+
+    def scaled_frame(self) -> np.ndarray:
+        """Get the current image in template-scale (a buffer if downscaled)."""
+        if self.template_scale == 1.0:
+            return self.img
+        height, width = self.img.shape
+        size = (round(width * self.template_scale), round(height * self.template_scale))
+        return cv2.resize(
+            self.img,
+            size,
+            dst=self.buffers.get("scaled", size[::-1]),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    def find_corners_template(self) -> list[tuple[float, float]] | None:
         corners: list[tuple[float, float]] = []
+        img = self.scaled_frame()
         for feature in self.features:
-            matches = feature.find_feature(self.img, enable_recursion=True)
+            matches = feature.find_feature(img, enable_recursion=True, buffers=self.buffers)
             # TODO: correct to report feature-center
-            # TODO: optimize this. only load file once
             best_match = feature.get_best_feature(matches)
-            if best_match:
-                corners.append(
-                    (best_match[0] + self.feature_offset, best_match[1] + self.feature_offset)
+            if not best_match:
+                return None
+            corners.append(
+                (
+                    (best_match[0] + self.feature_offset) / self.template_scale,
+                    (best_match[1] + self.feature_offset) / self.template_scale,
                 )
-            else:
-                return False
+            )
+        return corners
+
+    def find_corners_contour(self) -> list[tuple[float, float]] | None:
+        """Find the corners of a bright sheet on darker background, None if failed.
+
+        Otsu-threshold a downscaled frame, approximate the largest contour by a
+        quadrilateral and refine its corners on the full frame with sub-pixel precision.
+        """
+        scale = min(1.0, self.detection_size / max(self.img.shape))
+        img_small = cv2.resize(self.img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        img_small = cv2.GaussianBlur(img_small, (5, 5), 0)
+        _, img_mask = cv2.threshold(img_small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(img_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if len(contours) < 1:
+            return None
+        contour = cv2.convexHull(max(contours, key=cv2.contourArea))
+        if cv2.contourArea(contour) < 0.2 * img_mask.size:
+            return None
+        polygon = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, closed=True), closed=True)
+        if len(polygon) != 4:
+            return None
+
+        points = polygon.reshape(4, 2).astype(np.float32) / scale
+        # upper-left has the smallest x+y, lower-left the largest y-x, ...
+        sums = points.sum(axis=1)
+        diffs = points[:, 1] - points[:, 0]
+        order = [np.argmin(sums), np.argmax(diffs), np.argmax(sums), np.argmin(diffs)]
+        if len(set(order)) != 4:
+            return None
+        points = np.ascontiguousarray(points[order]).reshape(-1, 1, 2)
+
+        # search-window has to cover the error of the downscaled detection (a few pixels there)
+        window = max(3, math.ceil(4 / scale))
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.05)
+        cv2.cornerSubPix(self.img, points, (window, window), (-1, -1), criteria)
+        return [(float(x), float(y)) for x, y in points.reshape(4, 2)]
+
+    def correct_perspective(self) -> bool:
+        with self.timer.measure("find_corners"):
+            corners = self.find_corners()
+        if corners is None:
+            return False
         # origin (0,0) is upper-left corner, x is horizontal, y is vertical
         length_edge_left = corners[1][1] - corners[0][1]
         length_edge_down = corners[2][0] - corners[1][0]
@@ -465,7 +666,13 @@ class SheetFilter:
         pts1 = np.float32(corners)
         pts2 = np.float32(ratio_coord)
         M = cv2.getPerspectiveTransform(pts1, pts2)
-        self.img = cv2.warpPerspective(self.img, M, (point_right, point_down))
+        with self.timer.measure("warp"):
+            self.img = cv2.warpPerspective(
+                self.img,
+                M,
+                (point_right, point_down),
+                dst=self.buffers.get("warp", (point_down, point_right)),
+            )
         self.img_height = point_down
         self.img_width = point_right
         return True
@@ -481,8 +688,20 @@ class SheetFilter:
         self.img_width, self.img_height = self.img.shape[::-1]
 
     def enhance_details(self, darken_percent: int):
-        self.img = self.features[0].enhance_details(self.img, darken_percent)
-        self.img = ~self.img  # inverse, because enhancement defines background as black
+        with self.timer.measure("binarize"):
+            # inverse, because enhancement defines background as black
+            self.features[0].enhance_details(self.img, darken_percent, dst=self.img, invert=True)
+
+    def tune_darken_percent(self, default: int = 50) -> TuningResult:
+        """Choose darken_percent for the current image (before enhance_details)."""
+        with self.timer.measure("binarize_tuning"):
+            peaks = self.features[0].histogram_peaks(self.img)
+            result = tune_darken_percent(self.img, peaks, self.get_dpi(), default=default)
+        log.debug(
+            f"\t-> tuned darken_percent to {result.darken_percent} "
+            f"({result.evaluations} candidates in {result.duration_s:.3f} s)"
+        )
+        return result
 
     def demo_enhance_details(self) -> None:
         img_copy = copy.deepcopy(self.img)
@@ -508,8 +727,12 @@ class SheetFilter:
         return self.sheet_size[1], self.sheet_size[0]
 
     def export_for_tesseract(self) -> np.ndarray:
-        img_rgb = cv2.cvtColor(self.img, cv2.COLOR_BGR2RGB)
-        return img_rgb
+        """Get the grayscale result, a view into the buffers -> valid until the next image."""
+        return self.img
+
+    def export_packed(self, dpi: int | None = None) -> PackedPage:
+        """Pack the B/W-result (after enhance_details) to 1 bit per pixel, outside the buffers."""
+        return PackedPage.from_binary(self.img, dpi)
 
         # self.feat11.save_reference("test_feature.jpg")
         # self.feat00.save_find_feature_demo(file_path, "test_featurefind00.jpg")
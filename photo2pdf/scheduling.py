@@ -0,0 +1,104 @@
+"""Dispatch the files of a batch longest-first, to shorten the makespan.
+
+Workers take the next file from the shared task-queue as soon as they are idle
+(chunksize 1), so the load balances itself. What remains is the order: a huge
+photo dispatched last keeps one worker busy while all others idle. Sorting by
+estimated cost (longest-processing-time-first) leaves only short files for the end.
+
+The cost is estimated from the pixel-count (read from the header, without
+decoding) and the file-size as fallback, weighted per file-type by the seconds
+per megapixel of former runs (cost-history in the json-report) where available.
+"""
+
+import json
+from collections.abc import Sequence
+from pathlib import Path
+
+from PIL import Image
+
+from .logger import log
+
+seconds_per_mpx_default = 1.0
+mb_per_mpx_fallback = 0.5  # rough size of a jpg-photo, for files without readable header
+history_min_files = 3  # per file-type, before its rate gets used
+history_decay = 0.5  # weight of former runs when merging with the current one
+
+
+def image_megapixels(path: Path) -> float | None:
+    """Pixels of all frames in millions, None if the header can't be read."""
+    try:
+        with Image.open(path) as img:
+            # PIL only parses the header here, frames get counted by their directories
+            frames = getattr(img, "n_frames", 1)
+            return img.width * img.height * frames / 1e6
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def load_cost_history(path_report: Path | None) -> dict[str, dict[str, float]]:
+    """Cost-history of a former json-report, empty if not available."""
+    if path_report is None or path_report.suffix.lower() != ".json":
+        return {}
+    try:
+        with path_report.open(encoding="utf-8") as file:
+            return json.load(file).get("cost_history", {})
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return {}
+
+
+class CostModel:
+    """Estimated processing-time per file, learns from observed durations."""
+
+    def __init__(self, history: dict[str, dict[str, float]] | None = None) -> None:
+        """:param history: per suffix {"files": n, "seconds": total, "megapixels": total}"""
+        self.history = history or {}
+        self.observed: dict[str, dict[str, float]] = {}
+        self._megapixels: dict[Path, float] = {}
+
+    def megapixels(self, path: Path) -> float:
+        """From header (cached), estimated by file-size as fallback."""
+        if path not in self._megapixels:
+            value = image_megapixels(path)
+            if value is None:
+                try:
+                    value = path.stat().st_size / 1e6 / mb_per_mpx_fallback
+                except OSError:
+                    value = 0.0
+            self._megapixels[path] = value
+        return self._megapixels[path]
+
+    def seconds_per_mpx(self, suffix: str) -> float:
+        entry = self.history.get(suffix.lower())
+        if entry is None or entry["files"] < history_min_files or entry["megapixels"] <= 0:
+            return seconds_per_mpx_default
+        return entry["seconds"] / entry["megapixels"]
+
+    def estimate(self, path: Path) -> float:
+        return self.megapixels(path) * self.seconds_per_mpx(path.suffix)
+
+    def order(self, files: Sequence[Path]) -> list[Path]:
+        """Most costly first, equal costs keep their order."""
+        ordered = sorted(files, key=self.estimate, reverse=True)
+        if ordered:
+            log.debug(
+                f"\t-> scheduled {len(ordered)} files longest-first, estimated "
+                f"{self.estimate(ordered[0]):.2f} s to {self.estimate(ordered[-1]):.2f} s"
+            )
+        return ordered
+
+    def observe(self, path: Path, duration_s: float) -> None:
+        entry = self.observed.setdefault(
+            path.suffix.lower(), {"files": 0, "seconds": 0.0, "megapixels": 0.0}
+        )
+        entry["files"] += 1
+        entry["seconds"] += duration_s
+        entry["megapixels"] += self.megapixels(path)
+
+    def merged_history(self) -> dict[str, dict[str, float]]:
+        """Former history plus this run (former decayed), to be stored in the report."""
+        merged = {suffix: dict(entry) for suffix, entry in self.history.items()}
+        for suffix, entry in self.observed.items():
+            previous = merged.setdefault(suffix, dict.fromkeys(entry, 0.0))
+            for key, value in entry.items():
+                previous[key] = round(previous[key] * history_decay + value, 4)
+        return merged
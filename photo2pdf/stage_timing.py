@@ -0,0 +1,219 @@
+"""Per-stage timing and profiling of the processing pipeline.
+
+A StageTimer is created per file, filled by the pipeline-stages
+(preprocessing, OCR, metadata, compression) and handed back to the main process,
+where all timers get merged into one report (JSON or CSV).
+"""
+
+import cProfile
+import csv
+import io
+import json
+import math
+import os
+import sys
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Any
+
+from .job_journal import atomic_write_text
+from .logger import log
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Linear interpolated percentile (0 to 100) of a list of values."""
+    if len(values) < 1:
+        return 0.0
+    values = sorted(values)
+    rank = (len(values) - 1) * percent / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+# stages that are counted while running (live-metrics), shared with the workers
+_stage_gauge: Any = None
+_stage_index: dict[str, int] = {}
+
+
+def attach_stage_gauge(gauge: Any, stages: tuple[str, ...]) -> None:
+    """Count running stages in gauge (multiprocessing.Array of ints, one per stage).
+
+    Meant as Pool-initializer, so workers share the counters of the main process.
+    """
+    global _stage_gauge  # noqa: PLW0603
+    _stage_gauge = gauge
+    _stage_index.clear()
+    _stage_index.update({stage: index for index, stage in enumerate(stages)})
+
+
+def _count_stage(stage: str, delta: int) -> None:
+    index = _stage_index.get(stage)
+    if index is None or _stage_gauge is None:
+        return
+    with _stage_gauge.get_lock():
+        _stage_gauge[index] += delta
+
+
+def reset_peak_rss() -> None:
+    """Restart the peak-RSS of this process (linux only, elsewhere the peak is cumulative)."""
+    try:
+        with Path("/proc/self/clear_refs").open("w", encoding="ascii") as file:
+            file.write("5")
+    except OSError:
+        return
+
+
+def peak_rss_mib() -> float | None:
+    """Peak resident memory of this process since start or the last reset."""
+    try:
+        with Path("/proc/self/status").open(encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+class StageTimer:
+    """Collects durations per named stage, picklable & mergeable across workers."""
+
+    def __init__(self) -> None:
+        self.durations: dict[str, list[float]] = {}
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        _count_stage(stage, 1)
+        timestamp = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - timestamp)
+            _count_stage(stage, -1)
+
+    def add(self, stage: str, duration: float) -> None:
+        self.durations.setdefault(stage, []).append(duration)
+
+    def merge(self, other: "StageTimer | dict[str, list[float]] | None") -> None:
+        if other is None:
+            return
+        durations = other.durations if isinstance(other, StageTimer) else other
+        for stage, values in durations.items():
+            self.durations.setdefault(stage, []).extend(values)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Statistics per stage in seconds, sorted by total time spent."""
+        result = {
+            stage: {
+                "count": len(values),
+                "total": sum(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+            }
+            for stage, values in self.durations.items()
+            if len(values) > 0
+        }
+        return dict(sorted(result.items(), key=lambda item: item[1]["total"], reverse=True))
+
+    def save_report(self, path: Path, extra: dict[str, Any] | None = None) -> None:
+        """Store summary as .json (with optional extra-content) or .csv."""
+        summary = self.summary()
+        if path.suffix.lower() == ".csv":
+            content = io.StringIO()
+            writer = csv.writer(content)
+            writer.writerow(["stage", "count", "total", "mean", "p50", "p95", "max"])
+            for stage, stats in summary.items():
+                writer.writerow([stage] + [round(value, 6) for value in stats.values()])
+            atomic_write_text(path, content.getvalue(), encoding="utf-8")
+        else:
+            report = {"stages": summary}
+            if extra:
+                report.update(extra)
+            atomic_write_text(path, json.dumps(report, indent=2), encoding="utf-8")
+        log.info(f"\t-> saved timing-report to {path}")
+
+    def log_summary(self) -> None:
+        for stage, stats in self.summary().items():
+            log.debug(
+                f"\t{stage:<20} n={stats['count']:<5} total={stats['total']:8.2f} s, "
+                f"p50={stats['p50']:6.3f} s, p95={stats['p95']:6.3f} s, max={stats['max']:6.3f} s"
+            )
+
+
+class LatencyHistogram:
+    """Cumulative latency-buckets (upper bounds in seconds), cheap enough for every request."""
+
+    buckets_default = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, buckets: tuple[float, ...] = buckets_default) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, duration: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if duration <= bound), -1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += duration
+
+    def to_dict(self) -> dict[str, Any]:
+        cumulated = 0
+        buckets = {}
+        for bound, count in zip([*self.buckets, math.inf], self.counts, strict=True):
+            cumulated += count
+            buckets["+Inf" if math.isinf(bound) else str(bound)] = cumulated
+        return {"count": self.count, "sum": round(self.total, 4), "buckets": buckets}
+
+
+# profiler & output of each process, a forked worker inherits the entry of its parent
+_profiles: dict[int, tuple[cProfile.Profile, Path]] = {}
+
+
+def profile_call(profile_dir: Path, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run fn under cProfile, the stats of this process get cumulated.
+
+    They are dumped once, when the process exits (or by dump_profile()). Each
+    worker-process writes its own file (worker_<pid>.prof), which can be
+    inspected with pstats or converted to a flamegraph (i.e. with flameprof or snakeviz).
+    """
+    path = profile_dir / f"worker_{os.getpid()}.prof"
+    profile = _profiles.get(os.getpid())
+    if profile is None:
+        # pool-workers skip atexit-handlers, but run the finalizers of multiprocessing
+        Finalize(None, dump_profile, exitpriority=0)
+    elif profile[1] != path:
+        dump_profile()  # another directory, i.e. the next batch
+    if profile is None or profile[1] != path:
+        profile = (cProfile.Profile(), path)
+        _profiles[os.getpid()] = profile
+    profiler = profile[0]
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+
+
+def dump_profile() -> None:
+    """Write the cumulated stats of this process (see profile_call), if it got profiled."""
+    profile = _profiles.get(os.getpid())
+    if profile is not None:
+        profiler, path = profile
+        profiler.dump_stats(path)
@@ -1,5 +1,8 @@
 """Collection of Functions to clean up strings."""
 
+import re
+from collections.abc import Iterable
+from functools import lru_cache
 from pathlib import Path
 
 replacements: dict[str, str] = {
@@ -18,13 +21,16 @@ replacements: dict[str, str] = {
     "  ": " ",  # 2 spaces
 }
 
+# single characters get translated in one pass, runs of spaces are collapsed afterward
+_translation = str.maketrans({key: value for key, value in replacements.items() if len(key) == 1})
+_multi_space = re.compile(" {2,}")
+# str_filter() joins lines, in texts they have to stay word-boundaries
+_line_breaks = str.maketrans({"\n": " ", "\r": " "})
+
 
 def str_filter(item: str) -> str:
     """Cleanup strings by removing unwanted characters."""
-    item = item.lower()
-    for key, value in replacements.items():
-        item = item.replace(key, value)
-    return item
+    return _multi_space.sub(" ", item.lower().translate(_translation))
 
 
 def import_list(file: Path) -> list[str]:
@@ -37,3 +43,88 @@ def import_list(file: Path) -> list[str]:
     data = [str_filter(date) for date in data]
     data = [date.strip() for date in data]  # remove whitespace from beginning and end
     return [date for date in data if len(date) > 0]
+
+
+class KeywordMatcher:
+    """Find many keywords in one pass over a text (Aho-Corasick automaton).
+
+    Keywords and texts are normalized with str_filter(), so matching is case-insensitive.
+    Build it once per run, scanning is linear in text-length (+ number of matches).
+    """
+
+    def __init__(self, keywords: Iterable[str], *, whole_words: bool = True) -> None:
+        self.whole_words = whole_words
+        self.keywords: list[str] = list(dict.fromkeys(str_filter(kw).strip() for kw in keywords))
+        self.keywords = [keyword for keyword in self.keywords if len(keyword) > 0]
+        # trie: transitions, failure-links and keyword-indices ending in each node
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[int]] = [[]]
+        for index, keyword in enumerate(self.keywords):
+            self._insert(keyword, index)
+        self._link()
+
+    @classmethod
+    def from_file(cls, file: Path, *, whole_words: bool = True) -> "KeywordMatcher":
+        return cls(import_list(file), whole_words=whole_words)
+
+    def _insert(self, keyword: str, index: int) -> None:
+        node = 0
+        for char in keyword:
+            if char not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][char] = len(self._goto) - 1
+            node = self._goto[node][char]
+        self._output[node].append(index)
+
+    def _link(self) -> None:
+        """Breadth-first construction of failure-links."""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str, *, normalized: bool = False) -> list[tuple[int, str]]:
+        """Get all occurrences as (start-position in normalized text, keyword)."""
+        if not normalized:
+            text = str_filter(text.translate(_line_breaks))
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        results = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in output[node]:
+                keyword = self.keywords[index]
+                start = position + 1 - len(keyword)
+                if self.whole_words and not self._is_word(text, start, position + 1):
+                    continue
+                results.append((start, keyword))
+        return results
+
+    @staticmethod
+    def _is_word(text: str, start: int, end: int) -> bool:
+        """Match is not embedded in a longer word."""
+        return (start == 0 or not text[start - 1].isalnum()) and (
+            end == len(text) or not text[end].isalnum()
+        )
+
+    def matches(self, text: str) -> list[str]:
+        """Get unique keywords found in text, in order of first occurrence."""
+        return list(dict.fromkeys(keyword for _, keyword in self.find_all(text)))
+
+
+@lru_cache(maxsize=4)
+def get_keyword_matcher(file: Path) -> KeywordMatcher:
+    """Build matcher once per process and keyword-file."""
+    return KeywordMatcher.from_file(file)
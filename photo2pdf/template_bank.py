@@ -0,0 +1,120 @@
+"""Precomputed reference-features for template matching, shared by all detectors.
+
+The corner-feature is needed in four rotations, three polarities (raw, positive,
+negative) and a few pyramid-scales. All variants are computed once and stored
+as a single .npy in the user-cache, later processes map it with one read.
+Tuned match-thresholds (see `photo2pdf train`) are stored next to it as profile.
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .job_journal import atomic_output
+from .job_journal import atomic_write_text
+from .logger import log
+
+bank_scales = (1.0, 0.5, 0.25)
+polarities = ("raw", "positive", "negative")
+profile_name = "feature_thresholds.json"
+
+_banks: dict[Path, "TemplateBank"] = {}
+
+
+def cache_directory() -> Path:
+    """Per-user cache, i.e. ~/.cache/photo2pdf."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "photo2pdf"
+
+
+def scaled_size(size: int, scale: float) -> int:
+    """Side of a scaled feature, not below 8 pixels."""
+    return max(8, round(size * scale))
+
+
+class TemplateBank:
+    """Array of shape (scales, rotations, polarities, height, width), smaller scales are padded."""
+
+    def __init__(self, templates: np.ndarray, scales: tuple[float, ...] = bank_scales) -> None:
+        self.templates = templates
+        self.scales = scales
+
+    @classmethod
+    def build(
+        cls,
+        img_raw: np.ndarray,
+        binarize: Callable[[np.ndarray], np.ndarray],
+        scales: tuple[float, ...] = bank_scales,
+    ) -> "TemplateBank":
+        """Compute all variants of a (square) grayscale feature.
+
+        :param binarize: turns the raw feature into the positive one (ink = 255)
+        """
+        size = img_raw.shape[0]
+        templates = np.zeros((len(scales), 4, len(polarities), size, size), dtype=np.uint8)
+        for index_scale, scale in enumerate(scales):
+            side = scaled_size(size, scale)
+            img_scaled = cv2.resize(img_raw, (side, side), interpolation=cv2.INTER_AREA)
+            for rotation in range(4):
+                img_rotated = np.rot90(img_scaled, rotation)
+                img_positive = binarize(np.ascontiguousarray(img_rotated))
+                variants = templates[index_scale, rotation, :, :side, :side]
+                variants[0] = img_rotated
+                variants[1] = img_positive
+                cv2.bitwise_not(img_positive, dst=variants[2])
+        return cls(templates, scales)
+
+    def get(self, rotation: int, polarity: str = "positive", scale: float = 1.0) -> np.ndarray:
+        """View of one variant, rotation in ccw 90 deg steps."""
+        index_scale = self.scales.index(scale)
+        side = scaled_size(self.templates.shape[-1], scale)
+        return self.templates[index_scale, rotation % 4, polarities.index(polarity), :side, :side]
+
+
+def load_template_bank(
+    path_feature: Path, binarize: Callable[[np.ndarray], np.ndarray]
+) -> TemplateBank:
+    """Get bank of the feature from this process, the cache or build (and cache) it."""
+    if path_feature in _banks:
+        return _banks[path_feature]
+    stat = path_feature.stat()
+    key = f"{path_feature.resolve()}:{stat.st_size}:{stat.st_mtime_ns}:{bank_scales}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]  # noqa: S324
+    path_bank = cache_directory() / f"template_bank_{digest}.npy"
+    try:
+        bank = TemplateBank(np.load(path_bank, mmap_mode="r"))
+    except (OSError, ValueError):
+        img_raw = cv2.imread(path_feature.as_posix(), 0)
+        bank = TemplateBank.build(img_raw, binarize)
+        try:
+            path_bank.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_output(path_bank) as path_temp, path_temp.open("wb") as file:
+                np.save(file, bank.templates)
+            log.debug(f"\t-> cached template-bank in {path_bank}")
+        except OSError as xpt:
+            log.debug(f"\t-> could not cache template-bank: {xpt!r}")
+    _banks[path_feature] = bank
+    return bank
+
+
+def load_threshold_profile(path: Path | None = None) -> dict[str, dict]:
+    """Tuned thresholds per template-scale, i.e. {"1.0": {"thresholds": [[pos, neg], ...]}}."""
+    path = cache_directory() / profile_name if path is None else path
+    try:
+        with path.open(encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_threshold_profile(profile: dict[str, dict], path: Path | None = None) -> Path:
+    """Store the tuned thresholds, defaults to the user-cache."""
+    path = cache_directory() / profile_name if path is None else path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(path, json.dumps(profile, indent=2), encoding="utf-8")
+    return path
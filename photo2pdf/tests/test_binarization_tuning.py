@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+import pytest
+
+from photo2pdf.binarization_tuning import binarization_score
+from photo2pdf.binarization_tuning import golden_section_max
+from photo2pdf.binarization_tuning import sample_strips
+from photo2pdf.binarization_tuning import tune_darken_percent
+
+dpi = 150
+
+
+def _text_page() -> np.ndarray:
+    page = np.full((1200, 900), 210, dtype=np.uint8)
+    for y in range(60, 1200, 30):
+        cv2.putText(page, "Lorem ipsum dolor 1234", (60, y), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 40, 2)
+    rng = np.random.default_rng(0)
+    return cv2.add(page, rng.integers(0, 20, page.shape, dtype=np.uint8))
+
+
+def test_golden_section_finds_maximum() -> None:
+    calls = []
+
+    def parabola(x: float) -> float:
+        calls.append(x)
+        return -((x - 37.0) ** 2)
+
+    position, value = golden_section_max(parabola, 0, 100, tolerance=0.5)
+    assert position == pytest.approx(37.0, abs=0.5)
+    assert value == pytest.approx(0.0, abs=0.25)
+    assert len(calls) < 20
+
+
+def test_sample_strips_cover_inner_page() -> None:
+    sample = sample_strips(np.zeros((1000, 500), dtype=np.uint8))
+    assert sample.shape == (4 * 30, 400)
+
+
+def test_glyphs_score_better_than_speckles() -> None:
+    glyphs = np.zeros((100, 400), dtype=np.uint8)
+    for x in range(10, 390, 20):
+        cv2.rectangle(glyphs, (x, 40), (x + 8, 60), 255, thickness=2)
+    speckles = np.zeros_like(glyphs)
+    speckles[::7, ::5] = 255
+    assert binarization_score(glyphs, dpi) > 0
+    assert binarization_score(speckles, dpi) < 0
+    assert binarization_score(np.zeros_like(glyphs), dpi) == 0
+
+
+def test_tuning_text_page() -> None:
+    page = _text_page()
+    result = tune_darken_percent(page, (40, 220), dpi)
+    assert result.score > 0
+    # a cut near the paper turns the noise into ink
+    assert result.darken_percent < 80
+    # coarse scan & refinement, instead of every percent
+    assert result.evaluations < 25
+
+
+def test_tuning_blank_page_keeps_default() -> None:
+    page = np.full((800, 600), 200, dtype=np.uint8)
+    result = tune_darken_percent(page, (40, 200), dpi, default=42)
+    assert result.darken_percent == 42
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pytest
+import typer
+from typer.testing import CliRunner
+
+from photo2pdf.cli import cli
+from photo2pdf.cli import parse_darken
+from photo2pdf.cli import parse_paper
+
+
+def test_parse_paper() -> None:
+    assert parse_paper(None) is None
+    assert parse_paper("210x297") == (210, 297)
+    assert parse_paper("210X297") == (210, 297)
+
+
+@pytest.mark.parametrize("paper", ["a4", "210", "210x", "x297", "0x297", "210x-297", "21.0x29.7"])
+def test_parse_paper_rejects_invalid(paper: str) -> None:
+    with pytest.raises(typer.BadParameter, match="--paper"):
+        parse_paper(paper)
+
+
+def test_parse_darken() -> None:
+    assert parse_darken("auto") is None
+    assert parse_darken("60") == 60
+    for darken in ["101", "-1", "dark"]:
+        with pytest.raises(typer.BadParameter, match="--darken"):
+            parse_darken(darken)
+
+
+@pytest.mark.parametrize("command", ["process", "enqueue"])
+def test_invalid_paper_is_a_usage_error(tmp_path: Path, command: str) -> None:
+    result = CliRunner().invoke(cli, [command, tmp_path.as_posix(), "--paper", "a4"])
+    assert result.exit_code == 2
+    assert "--paper" in result.output
+    assert not any(tmp_path.iterdir())
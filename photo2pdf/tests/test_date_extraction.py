@@ -0,0 +1,35 @@
+import pytest
+
+from photo2pdf.date_extraction import extract_date
+from photo2pdf.date_extraction import extract_dates
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("Rechnung vom 01.02.2021", "2021-02-01"),
+        ("Datum: 1. 2. 2021", "2021-02-01"),
+        ("due 2021-02-01.", "2021-02-01"),
+        ("Rechnung vom 12.05.21", "2021-05-12"),
+        ("Rechnung vom 14. März 2021", "2021-03-14"),
+    ],
+)
+def test_extract_date(text: str, expected: str) -> None:
+    assert extract_date(text, "de") == expected
+
+
+@pytest.mark.parametrize("text", ["01.02.20213", "12.05.123", "12.05.202", "12.05.2021.5"])
+def test_extract_date_rejects_truncated_numbers(text: str) -> None:
+    assert extract_date(text, "de") is None
+
+
+def test_extract_dates_ranks_newest_first_and_counts() -> None:
+    text = "Auftrag 03.04.2019, Lieferung 05.06.2020, Auftrag 03.04.2019"
+    candidates = extract_dates(text, "de")
+    assert [c.date.year for c in candidates] == [2020, 2019]
+    assert candidates[1].count == 2
+    assert candidates[1].position == text.index("03.04.2019")
+
+
+def test_extract_date_ignores_implausible_years() -> None:
+    assert extract_date("Gegründet 01.01.1850", "de") is None
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from photo2pdf.deduplication import Fingerprint
+from photo2pdf.deduplication import deduplicate
+from photo2pdf.deduplication import group_duplicates
+
+
+def _page(seed: int) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (200, 150), dtype=np.uint8))
+
+
+def test_multi_page_documents_with_same_cover(tmp_path: Path) -> None:
+    cover = _page(0)
+    files = []
+    for index in range(2):
+        files.append(tmp_path / f"document{index}.tif")
+        cover.save(files[-1], save_all=True, append_images=[_page(index + 1)])
+    selection, duplicates = deduplicate(files, max_distance=24)
+    assert selection == files
+    assert duplicates == {}
+
+
+def test_single_pages_get_deduplicated(tmp_path: Path) -> None:
+    files = [tmp_path / "shot0.png", tmp_path / "shot1.png"]
+    for path in files:
+        _page(0).save(path)
+    selection, duplicates = deduplicate(files, max_distance=24)
+    assert len(selection) == 1
+    assert len(duplicates) == 1
+
+
+def _print(name: str, bits_set: int, sharpness: float) -> Fingerprint:
+    bits = np.zeros(256, dtype=bool)
+    bits[:bits_set] = True
+    return Fingerprint(Path(name), np.packbits(bits).tobytes(), sharpness, 100)
+
+
+@pytest.mark.parametrize("sharpest", ["a", "b", "c"])
+def test_chain_of_three_pages_is_not_merged(sharpest: str) -> None:
+    # a~b and b~c are within 24 bits, but a and c differ in 32 bits
+    prints = [
+        _print(name, bits, 2.0 if name == sharpest else 1.0)
+        for name, bits in [("a", 0), ("b", 16), ("c", 32)]
+    ]
+    groups = group_duplicates(prints, max_distance=24)
+    names = [[fp.path.name for fp in group] for group in groups]
+    assert sorted(name for group in names for name in group) == ["a", "b", "c"]
+    assert not any({"a", "c"} <= set(group) for group in names)
+    assert names[0][0] == sharpest  # best candidate represents its group
+
+
+def test_group_is_sorted_by_quality() -> None:
+    prints = [_print("blurry", 0, 1.0), _print("sharp", 2, 5.0), _print("medium", 1, 3.0)]
+    groups = group_duplicates(prints, max_distance=24)
+    assert [[fp.path.name for fp in group] for group in groups] == [["sharp", "medium", "blurry"]]
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+from photo2pdf.directory_manifest import DirectoryManifest
+from photo2pdf.directory_manifest import manifest_name
+from photo2pdf.directory_manifest import scan_directory
+
+suffixes = [".jpg", ".png"]
+
+
+def test_scan_stats_only_images(tmp_path: Path) -> None:
+    (tmp_path / "a.JPG").write_bytes(b"a")
+    (tmp_path / "a.pdf").write_bytes(b"pdf")
+    (tmp_path / "b.png").mkdir()
+    listing = scan_directory(tmp_path, suffixes)
+    assert set(listing.images) == {"a.JPG"}
+    assert listing.names == {"a.JPG", "a.pdf", "b.png"}
+
+
+def test_round_trip_and_unchanged(tmp_path: Path) -> None:
+    (tmp_path / "a.jpg").write_bytes(b"a")
+    (tmp_path / "a.pdf").write_bytes(b"pdf")
+    listing = scan_directory(tmp_path, suffixes)
+    manifest = DirectoryManifest(tmp_path, "s1")
+    manifest.update("a.jpg", listing.images["a.jpg"], [".pdf"])
+    manifest.save([".pdf"], complete=True)
+
+    loaded = DirectoryManifest.load(tmp_path, "s1")
+    assert loaded.unchanged([".pdf"])
+    assert not loaded.unchanged([".pdf", ".txt"])
+    assert loaded.is_current("a.jpg", listing.images["a.jpg"])
+    names = scan_directory(tmp_path, suffixes).names
+    assert loaded.is_done("a.jpg", [".pdf"], names)
+    # output was deleted -> must be processed again
+    assert not loaded.is_done("a.jpg", [".pdf"], names - {"a.pdf"})
+    assert loaded.is_done("a.jpg", [".pdf"], None)
+
+    (tmp_path / "c.jpg").write_bytes(b"c")
+    assert not DirectoryManifest.load(tmp_path, "s1").unchanged([".pdf"])
+
+
+def test_modified_input_is_not_current(tmp_path: Path) -> None:
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"a")
+    manifest = DirectoryManifest(tmp_path, "s1")
+    manifest.update("a.jpg", path.stat(), [".pdf"])
+    path.write_bytes(b"changed")
+    assert not manifest.is_current("a.jpg", path.stat())
+    assert not manifest.is_current("b.jpg", path.stat())
+
+
+def test_other_settings_or_corrupt_file_are_ignored(tmp_path: Path) -> None:
+    (tmp_path / "a.jpg").write_bytes(b"a")
+    manifest = DirectoryManifest(tmp_path, "s1")
+    manifest.update("a.jpg", (tmp_path / "a.jpg").stat(), [".pdf"])
+    manifest.save([".pdf"], complete=True)
+    assert DirectoryManifest.load(tmp_path, "s2").files == {}
+    (tmp_path / manifest_name).write_text("{", encoding="utf-8")
+    assert DirectoryManifest.load(tmp_path, "s1").files == {}
+
+
+def test_duplicates_are_done(tmp_path: Path) -> None:
+    path = tmp_path / "b.jpg"
+    path.write_bytes(b"b")
+    manifest = DirectoryManifest(tmp_path, "s1")
+    manifest.update("b.jpg", path.stat(), [], duplicate_of="a.jpg")
+    assert manifest.is_done("b.jpg", [".pdf", ".txt"], set())
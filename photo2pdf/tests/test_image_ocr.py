@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from photo2pdf.image_ocr import ImageOCR
+from photo2pdf.image_ocr import compact_image
+
+
+def test_compact_image_16bit_gray() -> None:
+    ramp = np.linspace(0, 0xFFFF, 256 * 16, dtype=np.uint16).reshape(16, 256)
+    image = Image.fromarray(ramp)
+    compact = compact_image(image)
+    assert compact.mode == "L"
+    pixels = np.asarray(compact)
+    assert pixels.min() == 0
+    assert pixels.max() == 255
+    assert len(np.unique(pixels)) == 256  # gray levels survive, no clipping to B/W
+
+
+def test_compact_image_32bit_gray() -> None:
+    pixels = np.array([[0, 0x8000, 0xFFFF]], dtype=np.int32)
+    compact = compact_image(Image.fromarray(pixels))
+    assert np.asarray(compact).tolist() == [[0, 128, 255]]
+
+
+def test_path_input_is_not_opened(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "page.png"
+    Image.new("L", (32, 32), 255).save(path)
+
+    def unexpected(*_args: object) -> None:
+        msg = "tesseract reads the file itself"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr(Image, "open", unexpected)
+    with ImageOCR(path) as ocr:
+        assert ocr.engine_input() == path.as_posix()
+        assert ocr.get_content() != ""
+    assert path.exists()  # close() only removes serialized pages
+
+
+def test_image_input_is_serialized_once(tmp_path: Path) -> None:
+    with ImageOCR(None, image=Image.new("L", (32, 32), 255)) as ocr:
+        path_engine = Path(ocr.engine_input())
+        assert path_engine.exists()
+        assert ocr.engine_input() == path_engine.as_posix()
+    assert not path_engine.exists()
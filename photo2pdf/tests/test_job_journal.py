@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+
+from photo2pdf.job_journal import JobJournal
+from photo2pdf.job_journal import atomic_output
+from photo2pdf.job_journal import atomic_write_text
+
+
+def test_atomic_write_replaces_whole_file(tmp_path: Path) -> None:
+    path = tmp_path / "a.txt"
+    atomic_write_text(path, "new", encoding="utf-8")
+    assert path.read_text(encoding="utf-8") == "new"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_atomic_output_keeps_old_file_on_error(tmp_path: Path) -> None:
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"old")
+
+    def crash() -> None:
+        with atomic_output(path) as path_temp:
+            path_temp.write_bytes(b"half")
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        crash()
+    assert path.read_bytes() == b"old"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_load_latest_record_of_current_settings(tmp_path: Path) -> None:
+    journal = JobJournal(tmp_path, "s1")
+    artifact = journal.artifact_path(tmp_path / "a.jpg", ".pbm")
+    artifact.touch()
+    journal.record(tmp_path / "a.jpg", "preprocess", artifact, dpi=300)
+    journal.record(tmp_path / "a.jpg", "ocr", dpi=200)
+    journal.record(tmp_path / "a.jpg", "ocr", dpi=300)
+    JobJournal(tmp_path, "s2").record(tmp_path / "b.jpg", "ocr")
+    states = journal.load()
+    assert list(states) == ["a.jpg"]
+    assert states["a.jpg"]["ocr"]["info"] == {"dpi": 300}
+    assert journal.artifact(states["a.jpg"], "preprocess") == artifact
+    journal.cleanup(tmp_path / "a.jpg")
+    assert journal.artifact(states["a.jpg"], "preprocess") is None
+
+
+def test_load_skips_corrupt_lines(tmp_path: Path) -> None:
+    journal = JobJournal(tmp_path, "s1")
+    journal.record(tmp_path / "a.jpg", "ocr")
+    with journal.path.open("a", encoding="utf-8") as file:
+        file.write('{"file": "b.jp')  # crashed while writing
+    assert list(journal.load()) == ["a.jpg"]
+
+
+def test_load_omits_finished_files_and_compacts(tmp_path: Path) -> None:
+    journal = JobJournal(tmp_path, "s1")
+    for name in ["a.jpg", "b.jpg"]:
+        journal.record(tmp_path / name, "preprocess")
+        journal.record(tmp_path / name, "ocr")
+    journal.record(tmp_path / "a.jpg", "done")
+    JobJournal(tmp_path, "s2").record(tmp_path / "a.jpg", "ocr")
+    size = journal.path.stat().st_size
+    assert list(journal.load()) == ["b.jpg"]
+    assert journal.path.stat().st_size == size  # only compacted on request
+
+    states = journal.load(compact=True)
+    assert list(states) == ["b.jpg"]
+    assert len(journal.path.read_text(encoding="utf-8").splitlines()) == 3
+    assert journal.load() == states
+    assert list(JobJournal(tmp_path, "s2").load()) == ["a.jpg"]
+
+
+def test_compaction_removes_journal_of_finished_directory(tmp_path: Path) -> None:
+    journal = JobJournal(tmp_path, "s1")
+    journal.record(tmp_path / "a.jpg", "ocr")
+    journal.record(tmp_path / "a.jpg", "done")
+    assert journal.load(compact=True) == {}
+    assert not journal.path.exists()
+
+
+def test_records_after_done_belong_to_a_new_run(tmp_path: Path) -> None:
+    journal = JobJournal(tmp_path, "s1")
+    journal.record(tmp_path / "a.jpg", "ocr")
+    journal.record(tmp_path / "a.jpg", "done")
+    journal.record(tmp_path / "a.jpg", "preprocess")
+    assert list(journal.load(compact=True)["a.jpg"]) == ["preprocess"]
@@ -0,0 +1,75 @@
+from collections.abc import Iterator
+
+import pytest
+
+from photo2pdf import keyword_extraction
+from photo2pdf.keyword_extraction import get_extractor
+from photo2pdf.keyword_extraction import phrase_scores
+from photo2pdf.keyword_extraction import rank_by_corpus
+
+
+@pytest.fixture(autouse=True)
+def _fresh_extractors() -> Iterator[None]:
+    get_extractor.cache_clear()
+    yield
+    get_extractor.cache_clear()
+
+
+def test_letterhead_ranks_last() -> None:
+    documents = [
+        {"acme gmbh": 9.0, "invoice": 4.0},
+        {"acme gmbh": 9.0, "delivery note": 4.0},
+        {"acme gmbh": 9.0},
+    ]
+    ranked = rank_by_corpus(documents)
+    assert ranked == [["invoice", "acme gmbh"], ["delivery note", "acme gmbh"], ["acme gmbh"]]
+    assert rank_by_corpus(documents, limit=1)[0] == ["invoice"]
+
+
+def test_corpus_outside_of_batch_counts() -> None:
+    documents = [{"invoice": 1.0, "reminder": 2.0}]
+    # a single document keeps the order of RAKE
+    assert rank_by_corpus(documents) == [["reminder", "invoice"]]
+    ranked = rank_by_corpus(documents, document_frequency={"reminder": 9}, corpus_size=9)
+    assert ranked == [["invoice", "reminder"]]
+
+
+def test_documents_without_phrases() -> None:
+    assert rank_by_corpus([{}, {}]) == [[], []]
+    assert rank_by_corpus([{}, {"invoice": 1.0}, {}]) == [[], ["invoice"], []]
+
+
+def test_phrase_scores_keep_best() -> None:
+    ranked = [(4.0, "invoice"), (float("inf"), "acme"), (1.0, "invoice"), (0.5, "due")]
+    assert phrase_scores(ranked) == {"invoice": 4.0, "acme": 0.0, "due": 0.5}
+    assert phrase_scores(ranked, limit=2) == {"invoice": 4.0, "acme": 0.0}
+
+
+def test_extractor_is_built_once_per_language(monkeypatch: pytest.MonkeyPatch) -> None:
+    built = []
+
+    def fake_rake(language: str, **_kwargs: int) -> str:
+        built.append(language)
+        return f"rake-{language}"
+
+    monkeypatch.setattr(keyword_extraction, "Rake", fake_rake)
+    assert get_extractor("de") is get_extractor("de")
+    get_extractor("en")
+    assert len(built) == 2
+
+
+def test_missing_resources_skip_keywords(monkeypatch: pytest.MonkeyPatch) -> None:
+    downloads = []
+
+    def fake_rake(**_kwargs: object) -> None:
+        raise LookupError
+
+    def fake_download() -> bool:
+        downloads.append(True)
+        return len(downloads) == 1  # first download "succeeds", resource is still missing
+
+    monkeypatch.setattr(keyword_extraction, "Rake", fake_rake)
+    monkeypatch.setattr(keyword_extraction, "download_nltk_resources", fake_download)
+    assert get_extractor("de") is None
+    assert len(downloads) == 2
+    assert keyword_extraction.extract_keywords("Rechnung", "de") is None
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from photo2pdf.live_metrics import MetricsExporter
+from photo2pdf.live_metrics import tracked_stages
+from photo2pdf.stage_timing import StageTimer
+from photo2pdf.stage_timing import attach_stage_gauge
+
+
+def _samples(text: str) -> dict[str, float]:
+    return {
+        line.rpartition(" ")[0]: float(line.rpartition(" ")[2])
+        for line in text.splitlines()
+        if not line.startswith("#")
+    }
+
+
+def test_render_counts_files() -> None:
+    exporter = MetricsExporter()
+    exporter.files_total = 4
+    exporter.record(1.5)
+    exporter.record(None, failed=True)
+    exporter.record(None, retry=True)
+    samples = _samples(exporter.render())
+    assert samples["photo2pdf_files_total"] == 4
+    assert samples['photo2pdf_files_finished_total{result="done"}'] == 1
+    assert samples['photo2pdf_files_finished_total{result="failed"}'] == 1
+    assert samples["photo2pdf_retries_total"] == 1
+    assert samples["photo2pdf_queue_depth"] == 2
+    assert samples['photo2pdf_file_duration_seconds_bucket{le="2.5"}'] == 1
+    assert samples["photo2pdf_file_duration_seconds_count"] == 1
+
+
+def test_frame_ranges_are_in_flight() -> None:
+    exporter = MetricsExporter()
+    exporter.files_total = 3
+    attach_stage_gauge(exporter.gauge, tracked_stages)
+    try:
+        timer = StageTimer()
+        with timer.measure("frames"), timer.measure("ocr"):
+            samples = _samples(exporter.render())
+    finally:
+        attach_stage_gauge(None, ())
+    assert samples['photo2pdf_stage_in_flight{stage="frames"}'] == 1
+    assert samples['photo2pdf_stage_in_flight{stage="ocr"}'] == 1
+    assert samples["photo2pdf_queue_depth"] == 2
+    assert _samples(exporter.render())['photo2pdf_stage_in_flight{stage="frames"}'] == 0
+
+
+def test_publish_writes_file(tmp_path: Path) -> None:
+    path = tmp_path / "photo2pdf.prom"
+    exporter = MetricsExporter(path)
+    exporter.publish()
+    assert path.read_text(encoding="utf-8") == exporter.text()
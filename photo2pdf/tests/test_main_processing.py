@@ -0,0 +1,204 @@
+import io
+import json
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from photo2pdf.main_processing import FileResult
+from photo2pdf.main_processing import ImageProcessor
+from photo2pdf.main_processing import PageResult
+from photo2pdf.main_processing import gray_pixels
+from photo2pdf.main_processing import imap_unordered
+
+
+def _fake_process_file(
+    _self: ImageProcessor, _path: Path, _stages: dict | None = None, _frames: range | None = None
+) -> dict[str, list[float]]:
+    time.sleep(0.2)  # keeps both files in flight at once
+    return {"total": [0.2]}
+
+
+def test_profile_thread_backend(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    for name in ["a.png", "b.png"]:
+        Image.new("L", (64, 64), 255).save(tmp_path / name)
+    monkeypatch.setattr(ImageProcessor, "process_file", _fake_process_file)
+    path_profile = tmp_path / "profile"
+    processor = ImageProcessor(
+        tmp_path,
+        backend="thread",
+        profile_dir=path_profile,
+        engine_limits={"tesseract": 2, "ghostscript": 2},
+        use_manifest=False,
+        retries=0,
+    )
+    processor.process()
+    assert processor.failures == []
+    assert len(list(path_profile.glob("*.prof"))) == 1
+
+
+def test_profile_process_backend_per_worker(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for name in ["a.png", "b.png"]:
+        Image.new("L", (64, 64), 255).save(tmp_path / name)
+    monkeypatch.setattr(ImageProcessor, "process_file", _fake_process_file)
+    path_profile = tmp_path / "profile"
+    processor = ImageProcessor(tmp_path, profile_dir=path_profile, use_manifest=False, retries=0)
+    processor.process()
+    assert processor.failures == []
+    # workers dumped their stats on exit, one file each (not one per processed file)
+    assert 1 <= len(list(path_profile.glob("*.prof"))) <= 2
+
+
+def test_settings_hash_uses_profile_of_init(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    profile = {"1.0": {"thresholds": [[0.5, 0.5]] * 4, "samples": 3}}
+    processor = ImageProcessor(tmp_path, sheet_size_mm=(210, 297), threshold_profile=profile)
+    fingerprint = processor.settings_hash
+
+    def unexpected(*_args: object) -> dict:
+        msg = "profile must not be read again"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr("photo2pdf.main_processing.load_threshold_profile", unexpected)
+    assert processor.settings_hash == fingerprint
+    # another host with another cache gets the same profile from the queue-settings
+    other = ImageProcessor(tmp_path, sheet_size_mm=(210, 297), threshold_profile=profile)
+    assert other.settings_hash == fingerprint
+
+
+def test_settings_hash_ignores_other_scales(tmp_path: Path) -> None:
+    profile = {"1.0": {"thresholds": [[0.5, 0.5]] * 4, "samples": 3}}
+    fingerprint = ImageProcessor(
+        tmp_path, sheet_size_mm=(210, 297), threshold_profile=profile
+    ).settings_hash
+    retrained = {**profile, "0.5": {"thresholds": [[0.4, 0.4]] * 4, "samples": 9}}
+    processor = ImageProcessor(tmp_path, sheet_size_mm=(210, 297), threshold_profile=retrained)
+    assert processor.settings_hash == fingerprint
+    retrained["1.0"] = {"thresholds": [[0.6, 0.6]] * 4, "samples": 5}
+    processor = ImageProcessor(tmp_path, sheet_size_mm=(210, 297), threshold_profile=retrained)
+    assert processor.settings_hash != fingerprint
+
+
+def test_corpus_keywords_rejected_with_pack(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="pack"):
+        ImageProcessor(tmp_path, pack=True, corpus_keywords=True)
+
+
+def test_save_failures_removes_stale_manifest(tmp_path: Path) -> None:
+    processor = ImageProcessor(tmp_path)
+    processor.failures = [FileResult(tmp_path / "a.jpg", error="truncated", attempts=2)]
+    processor.save_failures()
+    manifest = json.loads(processor.failure_path.read_text(encoding="utf-8"))
+    assert manifest == [
+        {"file": (tmp_path / "a.jpg").as_posix(), "error": "truncated", "attempts": 2}
+    ]
+    processor.failures = []
+    processor.save_failures()
+    assert not processor.failure_path.exists()
+
+
+def test_imap_unordered_bounds_items_in_flight() -> None:
+    lock = threading.Lock()
+    state = {"pulled": 0, "yielded": 0, "in_flight_max": 0}
+
+    def items() -> Iterator[int]:
+        for item in range(50):
+            with lock:
+                state["pulled"] += 1
+                in_flight = state["pulled"] - state["yielded"]
+                state["in_flight_max"] = max(state["in_flight_max"], in_flight)
+            yield item
+
+    def square(item: int) -> int:
+        time.sleep(0.001)
+        return item * item
+
+    results = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for result in imap_unordered(executor, square, items(), limit=4):
+            with lock:
+                state["yielded"] += 1
+            results.append(result)
+    assert sorted(results) == [item * item for item in range(50)]
+    assert state["in_flight_max"] <= 5  # limit + the item that waits for a free slot
+
+
+def test_failed_files_are_isolated_and_retried(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for name in ["good.png", "flaky.png", "bad.png"]:
+        Image.new("L", (64, 64), 255).save(tmp_path / name)
+    calls: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def fake_process_file(
+        _self: ImageProcessor, path: Path, _stages: dict | None = None, _frames: range | None = None
+    ) -> dict[str, list[float]]:
+        with lock:
+            calls[path.name] = calls.get(path.name, 0) + 1
+        if path.name == "bad.png" or (path.name == "flaky.png" and calls[path.name] == 1):
+            msg = "truncated"
+            raise OSError(msg)
+        return {"total": [0.0]}
+
+    monkeypatch.setattr(ImageProcessor, "process_file", fake_process_file)
+    processor = ImageProcessor(tmp_path, backend="thread", use_manifest=False, retries=1)
+    processor.process()
+    assert calls == {"good.png": 1, "flaky.png": 2, "bad.png": 2}
+    assert [(result.path.name, result.attempts) for result in processor.failures] == [
+        ("bad.png", 2)
+    ]
+    assert processor.failures[0].error == "OSError: truncated"
+    manifest = json.loads(processor.failure_path.read_text(encoding="utf-8"))
+    assert [entry["file"] for entry in manifest] == [(tmp_path / "bad.png").as_posix()]
+
+
+def test_gray_pixels_of_any_image() -> None:
+    gray = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    assert gray_pixels(gray) is gray
+    rgb = np.dstack([gray] * 3)
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, format="PNG")
+    for image in [rgb, Image.fromarray(rgb), buffer.getvalue()]:
+        np.testing.assert_array_equal(gray_pixels(image), gray)
+
+
+def test_process_image_reports_errors() -> None:
+    processor = ImageProcessor(sheet_size_mm=(210, 297))
+    result = processor.process_image(b"no image", name="upload")
+    assert result.error is not None
+    assert result.error.startswith("UnidentifiedImageError")
+    assert result.pdf is None
+    with pytest.raises(ValueError, match="process_image"):
+        processor.process()
+
+
+def _fake_process_image(_self: ImageProcessor, image: np.ndarray) -> PageResult:
+    time.sleep(0.05 if image[0, 0] % 2 else 0.0)  # later images finish first
+    return PageResult(text=str(image[0, 0]))
+
+
+def test_iter_images_keeps_input_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ImageProcessor, "process_image", _fake_process_image)
+    pulled = []
+
+    def images() -> Iterator[np.ndarray]:
+        for value in range(12):
+            pulled.append(value)
+            yield np.full((4, 4), value, dtype=np.uint8)
+
+    processor = ImageProcessor()
+    results = processor.iter_images(images(), workers=2, prefetch=1)
+    first = next(results)
+    # submission is bounded: 2 workers * prefetch 1, plus the one that waits
+    assert len(pulled) <= 3
+    texts = [first.text] + [result.text for result in results]
+    assert texts == [str(value) for value in range(12)]
@@ -0,0 +1,64 @@
+import threading
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from photo2pdf.main_processing import ImageProcessor
+from photo2pdf.multi_page import frame_count
+from photo2pdf.multi_page import frame_ranges
+from photo2pdf.multi_page import frame_stage
+from photo2pdf.multi_page import iter_frames
+
+
+def _tiff(path: Path, count: int) -> Path:
+    frames = [Image.new("L", (32, 16), index * 10) for index in range(count)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    return path
+
+
+def test_frame_count(tmp_path: Path) -> None:
+    assert frame_count(_tiff(tmp_path / "a.tif", 3)) == 3
+    Image.new("L", (8, 8)).save(tmp_path / "b.png")
+    assert frame_count(tmp_path / "b.png") == 1
+    (tmp_path / "c.tiff").write_bytes(b"broken")
+    assert frame_count(tmp_path / "c.tiff") == 1
+
+
+def test_iter_frames_decodes_only_the_range(tmp_path: Path) -> None:
+    path = _tiff(tmp_path / "a.tif", 5)
+    values = [(index, img.getpixel((0, 0))) for index, img in iter_frames(path, range(1, 4))]
+    assert values == [(1, 10), (2, 20), (3, 30)]
+
+
+def test_frame_ranges() -> None:
+    assert frame_ranges(10, 4) == [range(4), range(4, 8), range(8, 10)]
+    assert frame_ranges(4, 4) == [range(4)]
+    assert frame_ranges(0, 4) == []
+    assert frame_stage(7) == "frame0007"
+
+
+def test_large_documents_are_spread_in_ranges(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _tiff(tmp_path / "large.tif", 10)
+    _tiff(tmp_path / "small.tif", 2)
+    calls = []
+    lock = threading.Lock()
+
+    def fake_process_file(
+        _self: ImageProcessor, path: Path, _stages: dict | None = None, frames: range | None = None
+    ) -> dict[str, list[float]]:
+        with lock:
+            calls.append((path.name, frames))
+        return {"total": [0.0]} if frames is None else {"frames": [0.0]}
+
+    monkeypatch.setattr(ImageProcessor, "process_file", fake_process_file)
+    processor = ImageProcessor(tmp_path, backend="thread", use_manifest=False, retries=0)
+    processor.process()
+    assert processor.failures == []
+    ranges = [frames for name, frames in calls if frames is not None]
+    assert sorted(ranges, key=lambda frames: frames.start) == frame_ranges(10)
+    assert all(name == "large.tif" for name, frames in calls if frames is not None)
+    # ranges run ahead, the files follow (large one only gets merged)
+    assert sorted(name for name, frames in calls[len(ranges) :]) == ["large.tif", "small.tif"]
@@ -0,0 +1,66 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from photo2pdf import ocr_profiles
+from photo2pdf.ocr_profiles import get_ocr_profile
+from photo2pdf.ocr_profiles import installed_tessdata
+from photo2pdf.ocr_profiles import tessdata_directory
+
+
+@pytest.fixture(autouse=True)
+def _fresh_lookups() -> Iterator[None]:
+    installed_tessdata.cache_clear()
+    tessdata_directory.cache_clear()
+    yield
+    installed_tessdata.cache_clear()
+    tessdata_directory.cache_clear()
+
+
+@pytest.fixture
+def tessdata_fast(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    for lang in ["eng", "deu", "osd"]:
+        (tmp_path / f"{lang}.traineddata").touch()
+    monkeypatch.setenv("PHOTO2PDF_TESSDATA_FAST", tmp_path.as_posix())
+    return tmp_path
+
+
+def test_balanced_uses_tesseract_defaults() -> None:
+    assert get_ocr_profile("balanced").config("deu") == ""
+
+
+def test_fast_profile_options(tessdata_fast: Path) -> None:
+    config = get_ocr_profile("fast").config("deu+eng")
+    assert config == (f'--tessdata-dir "{tessdata_fast}" --oem 1 --psm 6 -c tessedit_do_invert=0')
+
+
+def test_osd_keeps_its_own_engine(tessdata_fast: Path) -> None:
+    config = get_ocr_profile("fast").config(osd=True)
+    assert config == f'--tessdata-dir "{tessdata_fast}" -c tessedit_do_invert=0'
+
+
+def test_missing_language_falls_back_to_installed_models(tessdata_fast: Path) -> None:
+    assert tessdata_directory("fast", "deu") == tessdata_fast
+    assert tessdata_directory("fast", "deu+fra") is None
+    assert "--tessdata-dir" not in get_ocr_profile("fast").config("fra")
+
+
+def test_models_next_to_installed_tessdata(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PHOTO2PDF_TESSDATA_BEST", raising=False)
+    (tmp_path / "tessdata_best").mkdir()
+    (tmp_path / "tessdata_best" / "eng.traineddata").touch()
+    monkeypatch.setattr(ocr_profiles, "installed_tessdata", lambda: tmp_path / "tessdata")
+    assert tessdata_directory("best", "eng") == tmp_path / "tessdata_best"
+
+
+def test_without_tesseract(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PHOTO2PDF_TESSDATA_BEST", raising=False)
+    monkeypatch.setattr(ocr_profiles.pta.pytesseract, "tesseract_cmd", "/nonexistent/tesseract")
+    assert installed_tessdata() is None
+    assert tessdata_directory("best", "eng") is None
+
+
+def test_unknown_profile() -> None:
+    with pytest.raises(ValueError, match="OCR-profile"):
+        get_ocr_profile("perfect")
@@ -0,0 +1,94 @@
+import http.client
+import json
+import os
+import threading
+from collections.abc import Iterator
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from photo2pdf import ocr_service
+from photo2pdf.ocr_service import OCRService
+from photo2pdf.ocr_service import _Handler
+
+
+def _no_warm_up(_settings: dict) -> None:
+    pass
+
+
+def _echo_batch(jobs: list[tuple[bytes, str, bool, bool]]) -> list[dict]:
+    return [
+        {"pdf": None, "text": data.decode(), "meta": None, "durations": {}} for data, *_ in jobs
+    ]
+
+
+def _dying_batch(_jobs: list[tuple[bytes, str, bool, bool]]) -> list[dict]:
+    os._exit(1)
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch) -> Iterator[OCRService]:
+    monkeypatch.setattr(ocr_service, "_warm_up", _no_warm_up)
+    monkeypatch.setattr(ocr_service, "process_batch", _echo_batch)
+    service = OCRService(workers=1, queue_size=1, batch_size=2, timeout_s=2)
+    yield service
+    service.close()
+
+
+def _job(text: str) -> tuple[bytes, str, bool, bool]:
+    return text.encode(), ".png", True, False
+
+
+def test_submit_and_batch(service: OCRService) -> None:
+    futures = [service.submit(_job(text)) for text in ["a", "b", "c"]]
+    assert [future.result(timeout=10)["text"] for future in futures] == ["a", "b", "c"]
+
+
+def test_admission_is_bounded(service: OCRService) -> None:
+    futures = [service.submit(_job("x")) for _ in range(service.capacity + 2)]
+    assert futures[service.capacity :] == [None, None]
+    for future in futures[: service.capacity]:
+        future.result(timeout=10)
+    future = service.submit(_job("x"))  # slots got released
+    assert future.result(timeout=10)["text"] == "x"
+
+
+def test_dead_worker_fails_request_and_releases_slot(
+    service: OCRService, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ocr_service, "process_batch", _dying_batch)
+    futures = [service.submit(_job("x")) for _ in range(service.capacity)]
+    assert service.submit(_job("x")) is None
+    for future in futures:
+        with pytest.raises(TimeoutError):
+            future.result(timeout=10)
+    monkeypatch.setattr(ocr_service, "process_batch", _echo_batch)
+    future = service.submit(_job("again"))
+    assert future.result(timeout=10)["text"] == "again"
+
+
+def _post(port: int, body: bytes, headers: dict[str, str]) -> tuple[int, dict]:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.request("POST", "/ocr", body=body, headers=headers)
+    response = connection.getresponse()
+    content = json.loads(response.read())
+    connection.close()
+    return response.status, content
+
+
+def test_http_status_codes(service: OCRService) -> None:
+    handler = type("Handler", (_Handler,), {"service": service, "timeout_s": 5})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        assert _post(port, b"", {"Content-Type": "image/png"})[0] == 400
+        assert _post(port, b"x", {"Content-Type": "text/plain"})[0] == 415
+        status, content = _post(port, b"page", {"Content-Type": "image/png"})
+        assert status == 200
+        assert content["text"] == "page"
+        assert service.status()["responses"] == {"400": 1, "415": 1, "200": 1}
+        assert service.status()["in_flight"] == 0
+    finally:
+        server.shutdown()
+        server.server_close()
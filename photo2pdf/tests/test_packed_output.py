@@ -0,0 +1,74 @@
+import zipfile
+from pathlib import Path
+
+from photo2pdf.packed_output import PackWriter
+from photo2pdf.packed_output import extract_packs
+from photo2pdf.packed_output import load_pack_index
+from photo2pdf.packed_output import read_packed
+
+entries = {f"scan_{i:03d}.pdf": bytes([i]) * (100 + i) for i in range(5)}
+
+
+def _write(directory: Path, name: str, **kwargs: int) -> PackWriter:
+    with PackWriter(directory, **kwargs) as writer:
+        writer.name = name
+        for entry, data in entries.items():
+            writer.add(entry, data)
+    return writer
+
+
+def test_index_round_trip(tmp_path: Path) -> None:
+    writer = _write(tmp_path, "photo2pdf_a")
+    assert writer.packs == [tmp_path / "photo2pdf_a_001.zip"]
+    index = load_pack_index(tmp_path)
+    assert set(index) == set(entries)
+    for name, data in entries.items():
+        assert read_packed(index[name]) == data
+    # a valid zip, no leftover temp-files
+    with zipfile.ZipFile(writer.packs[0]) as archive:
+        assert archive.testzip() is None
+        assert archive.read("scan_004.pdf") == entries["scan_004.pdf"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "photo2pdf_a_001.zip",
+        "photo2pdf_a_001.zip.index.json",
+    ]
+
+
+def test_parts_are_split_by_size(tmp_path: Path) -> None:
+    writer = _write(tmp_path, "photo2pdf_a", size_max=250)
+    assert len(writer.packs) == 3
+    index = load_pack_index(tmp_path)
+    assert {pack for pack, _, _ in index.values()} == set(writer.packs)
+    assert all(read_packed(index[name]) == data for name, data in entries.items())
+
+
+def test_newest_pack_wins(tmp_path: Path) -> None:
+    _write(tmp_path, "photo2pdf_a")
+    with PackWriter(tmp_path) as writer:
+        writer.name = "photo2pdf_b"
+        writer.add("scan_000.pdf", b"new")
+    index = load_pack_index(tmp_path)
+    assert read_packed(index["scan_000.pdf"]) == b"new"
+    assert read_packed(index["scan_001.pdf"]) == entries["scan_001.pdf"]
+
+
+def test_add_file_moves_it(tmp_path: Path) -> None:
+    path = tmp_path / "scan.txt"
+    path.write_bytes(b"text")
+    with PackWriter(tmp_path) as writer:
+        writer.add_file(path)
+    assert not path.exists()
+    assert read_packed(load_pack_index(tmp_path)["scan.txt"]) == b"text"
+
+
+def test_extract_keeps_existing_files(tmp_path: Path) -> None:
+    (tmp_path / "packs").mkdir()
+    writer = _write(tmp_path / "packs", "photo2pdf_a", size_max=250)
+    destination = tmp_path / "out"
+    destination.mkdir()
+    (destination / "scan_000.pdf").write_bytes(b"keep")
+    assert extract_packs(tmp_path / "packs", destination) == len(entries) - 1
+    assert (destination / "scan_000.pdf").read_bytes() == b"keep"
+    assert (destination / "scan_003.pdf").read_bytes() == entries["scan_003.pdf"]
+    assert extract_packs(writer.packs[0]) == 2
+    assert (tmp_path / "packs" / "scan_000.pdf").exists()
@@ -0,0 +1,63 @@
+import io
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from photo2pdf.packed_page import PackedPage
+
+
+def _page() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return np.where(rng.random((7, 13)) < 0.3, 0, 255).astype(np.uint8)  # width not byte-aligned
+
+
+def test_pack_round_trip() -> None:
+    img = _page()
+    page = PackedPage.from_binary(img, dpi=300)
+    assert page.bits.shape == (7, 2)
+    assert (page.height, page.width, page.nbytes) == (7, 13, 14)
+    np.testing.assert_array_equal(page.unpack(), img)
+
+
+def test_to_image_matches_pixels() -> None:
+    img = _page()
+    image = PackedPage.from_binary(img, dpi=300).to_image()
+    assert image.mode == "1"
+    assert image.info["dpi"] == (300, 300)
+    np.testing.assert_array_equal(np.asarray(image.convert("L")), img)
+
+
+def test_pbm_round_trip(tmp_path: Path) -> None:
+    img = _page()
+    path = tmp_path / "page.pbm"
+    with path.open("wb") as file:
+        PackedPage.from_binary(img).write_pbm(file)
+    # readable by others (tesseract gets the same file)
+    with Image.open(path) as image:
+        np.testing.assert_array_equal(np.asarray(image.convert("L")), img)
+    page = PackedPage.read_pbm(path, dpi=200)
+    assert page.dpi == 200
+    np.testing.assert_array_equal(page.unpack(), img)
+
+
+def test_read_pbm_rejects_other_formats(tmp_path: Path) -> None:
+    path = tmp_path / "page.pbm"
+    buffer = io.BytesIO()
+    Image.fromarray(_page()).save(buffer, format="PNG")
+    path.write_bytes(buffer.getvalue())
+    with pytest.raises(ValueError, match="no binary PBM"):
+        PackedPage.read_pbm(path)
+
+
+def test_share_round_trip() -> None:
+    img = _page()
+    handle = PackedPage.from_binary(img, dpi=300).share()
+    try:
+        page = pickle.loads(pickle.dumps(handle)).load()
+    finally:
+        handle.unlink()
+    assert page.dpi == 300
+    np.testing.assert_array_equal(page.unpack(), img)
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from photo2pdf.pdf_input import concatenate_pages
+from photo2pdf.pdf_input import embedded_image
+from photo2pdf.pdf_input import iter_pages
+from photo2pdf.pdf_input import overlay_text_layers
+from photo2pdf.pdf_input import page_count
+
+pypdf = pytest.importorskip("pypdf")
+
+
+def _text_pdf(path: Path, size_pt: tuple[int, int] = (200, 300)) -> Path:
+    """One page with text in Helvetica, like a layer of tesseract."""
+    name, dictionary = pypdf.generic.NameObject, pypdf.generic.DictionaryObject
+    font = dictionary(
+        {
+            name("/Type"): name("/Font"),
+            name("/Subtype"): name("/Type1"),
+            name("/BaseFont"): name("/Helvetica"),
+        }
+    )
+    writer = pypdf.PdfWriter()
+    page = writer.add_blank_page(*size_pt)
+    page[name("/Resources")] = dictionary({name("/Font"): dictionary({name("/F1"): font})})
+    stream = pypdf.generic.DecodedStreamObject()
+    stream.set_data(b"BT /F1 12 Tf 20 150 Td (Invoice 42) Tj ET")
+    page.replace_contents(stream)
+    writer.write(path)
+    return path
+
+
+def _scan_pdf(path: Path, dpi: int = 150) -> Path:
+    """Image-only page (like an office-copier), A6-ish at the given dpi."""
+    Image.new("L", (dpi * 4, dpi * 6), 200).save(path, resolution=dpi)
+    return path
+
+
+def test_concatenate_pages_keeps_images(tmp_path: Path) -> None:
+    paths = []
+    for index, size in enumerate([(80, 120), (120, 80)]):
+        paths.append(tmp_path / f"page{index}.pdf")
+        Image.new("L", size, 255 - index).save(paths[-1], resolution=72)
+    path_output = tmp_path / "document.pdf"
+    concatenate_pages(paths, path_output)
+    pages = pypdf.PdfReader(path_output).pages
+    assert len(pages) == 2
+    for page, path in zip(pages, paths, strict=True):
+        original = pypdf.PdfReader(path).pages[0].images[0].data
+        assert page.images[0].data == original
+
+
+def test_page_count(tmp_path: Path) -> None:
+    paths = [_scan_pdf(tmp_path / f"page{index}.pdf") for index in range(3)]
+    concatenate_pages(paths, tmp_path / "document.pdf")
+    assert page_count(tmp_path / "document.pdf") == 3
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4 broken")
+    assert page_count(tmp_path / "broken.pdf") == 1
+
+
+def test_iter_pages_skips_text_and_takes_embedded_images(tmp_path: Path) -> None:
+    paths = [_text_pdf(tmp_path / "text.pdf"), _scan_pdf(tmp_path / "scan.pdf", dpi=150)]
+    concatenate_pages(paths, tmp_path / "document.pdf")
+    pages = list(iter_pages(tmp_path / "document.pdf", [0, 1]))
+    assert [(index, text.strip(), dpi) for index, text, _, dpi in pages] == [
+        (0, "Invoice 42", 0),
+        (1, "", 150),
+    ]
+    assert pages[0][2] is None
+    assert pages[1][2].size == (600, 900)
+
+
+def test_partial_image_is_not_taken(tmp_path: Path) -> None:
+    page = pypdf.PdfReader(_scan_pdf(tmp_path / "scan.pdf")).pages[0]
+    assert embedded_image(page) is not None
+    page.mediabox.right = float(page.mediabox.right) * 2  # image covers half of the page
+    assert embedded_image(page) is None
+
+
+def test_overlay_keeps_page_image(tmp_path: Path) -> None:
+    path_scan = _scan_pdf(tmp_path / "scan.pdf")
+    # tesseract renders the layer in the size of its own input
+    path_layer = _text_pdf(tmp_path / "layer.pdf", (100, 150))
+    path_output = tmp_path / "scan.ocr.pdf"
+    overlay_text_layers(path_scan, {0: path_layer}, path_output)
+    page = pypdf.PdfReader(path_output).pages[0]
+    assert "Invoice 42" in page.extract_text()
+    assert page.mediabox == pypdf.PdfReader(path_scan).pages[0].mediabox
+    assert page.images[0].data == pypdf.PdfReader(path_scan).pages[0].images[0].data
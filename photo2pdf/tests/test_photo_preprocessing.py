@@ -0,0 +1,66 @@
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from photo2pdf.photo_preprocessing import SheetFilter
+
+
+def _photo() -> np.ndarray:
+    pixels = np.full((120, 160), 200, dtype=np.uint8)
+    pixels[40:80, 50:110] = 30  # dark text-block on bright paper
+    return pixels
+
+
+def test_set_picture_keeps_caller_array() -> None:
+    pixels = _photo()
+    original = pixels.copy()
+    sheet = SheetFilter((210, 297))
+    sheet.set_picture(pixels)
+    sheet.enhance_details(50)
+    assert np.array_equal(pixels, original)
+    assert set(np.unique(sheet.export_for_tesseract())) <= {0, 255}
+
+
+def test_set_picture_accepts_read_only_array() -> None:
+    pixels = _photo()
+    pixels.flags.writeable = False  # i.e. np.asarray() of a PIL-frame
+    sheet = SheetFilter((210, 297))
+    sheet.set_picture(pixels)
+    sheet.enhance_details(50)
+    assert sheet.export_for_tesseract()[60, 80] == 0
+
+
+# upper-left, lower-left, lower-right, upper-right (like find_corners)
+sheet_corners = [(310.0, 120.0), (250.0, 980.0), (900.0, 1010.0), (950.0, 160.0)]
+
+
+def _sheet_photo() -> np.ndarray:
+    pixels = np.full((1200, 1200), 60, dtype=np.uint8)  # dark table
+    cv2.fillPoly(pixels, [np.array(sheet_corners, dtype=np.int32)], 220)
+    return pixels
+
+
+def test_contour_detector_finds_sheet() -> None:
+    sheet = SheetFilter((210, 297), detector="contour")
+    sheet.set_picture(_sheet_photo())
+    corners = sheet.find_corners_contour()
+    assert corners is not None
+    for found, true in zip(corners, sheet_corners, strict=True):
+        assert math.dist(found, true) < 3
+
+
+def test_contour_detector_falls_back_to_template(monkeypatch: pytest.MonkeyPatch) -> None:
+    sheet = SheetFilter((210, 297), detector="contour")
+    pixels = np.full((600, 600), 60, dtype=np.uint8)
+    cv2.circle(pixels, (300, 300), 250, 220, thickness=-1)  # bright, but no quadrilateral
+    sheet.set_picture(pixels)
+    assert sheet.find_corners_contour() is None
+    monkeypatch.setattr(sheet, "find_corners_template", lambda: sheet_corners)
+    assert sheet.find_corners() == sheet_corners
+
+
+def test_unknown_detector_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Page-detector"):
+        SheetFilter((210, 297), detector="magic")
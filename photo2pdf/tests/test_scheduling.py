@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from photo2pdf.scheduling import CostModel
+from photo2pdf.scheduling import image_megapixels
+from photo2pdf.scheduling import load_cost_history
+
+
+def _image(path: Path, width: int, height: int) -> Path:
+    Image.new("L", (width, height)).save(path)
+    return path
+
+
+def test_megapixels_from_header_or_size(tmp_path: Path) -> None:
+    assert image_megapixels(_image(tmp_path / "a.png", 1000, 500)) == 0.5
+    broken = tmp_path / "b.jpg"
+    broken.write_bytes(b"x" * 1_000_000)
+    assert image_megapixels(broken) is None
+    assert CostModel().megapixels(broken) == pytest.approx(2.0)
+    assert CostModel().megapixels(tmp_path / "missing.jpg") == 0.0
+
+
+def test_order_longest_first_and_stable(tmp_path: Path) -> None:
+    small = _image(tmp_path / "small.png", 100, 100)
+    large = _image(tmp_path / "large.png", 1000, 1000)
+    small2 = _image(tmp_path / "small2.png", 100, 100)
+    assert CostModel().order([small, large, small2]) == [large, small, small2]
+    assert CostModel().order([]) == []
+
+
+def test_history_weights_file_types(tmp_path: Path) -> None:
+    png = _image(tmp_path / "a.png", 1000, 1000)
+    tif = _image(tmp_path / "b.tif", 500, 500)
+    history = {".tif": {"files": 3, "seconds": 30.0, "megapixels": 1.0}}
+    model = CostModel(history)
+    assert model.seconds_per_mpx(".TIF") == 30.0
+    assert model.seconds_per_mpx(".png") == 1.0
+    assert model.order([png, tif]) == [tif, png]
+    # too few files to be trusted
+    history[".tif"]["files"] = 2
+    assert model.seconds_per_mpx(".tif") == 1.0
+
+
+def test_merged_history_decays_former_runs(tmp_path: Path) -> None:
+    png = _image(tmp_path / "a.png", 1000, 1000)
+    model = CostModel({".png": {"files": 4, "seconds": 8.0, "megapixels": 4.0}})
+    model.observe(png, 3.0)
+    model.observe(tmp_path / "b.JPG", 1.0)
+    merged = model.merged_history()
+    assert merged[".png"] == {"files": 3.0, "seconds": 7.0, "megapixels": 3.0}
+    assert merged[".jpg"] == {"files": 1.0, "seconds": 1.0, "megapixels": 0.0}
+    assert model.history[".png"]["files"] == 4
+
+
+def test_load_cost_history(tmp_path: Path) -> None:
+    history = {".png": {"files": 3, "seconds": 3.0, "megapixels": 1.0}}
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps({"cost_history": history}), encoding="utf-8")
+    assert load_cost_history(path) == history
+    assert load_cost_history(None) == {}
+    assert load_cost_history(tmp_path / "report.csv") == {}
+    assert load_cost_history(tmp_path / "missing.json") == {}
+    path.write_text("[]", encoding="utf-8")
+    assert load_cost_history(path) == {}
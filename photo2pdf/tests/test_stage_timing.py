@@ -0,0 +1,63 @@
+import csv
+import json
+import os
+import pstats
+from pathlib import Path
+
+from photo2pdf.stage_timing import StageTimer
+from photo2pdf.stage_timing import dump_profile
+from photo2pdf.stage_timing import percentile
+from photo2pdf.stage_timing import profile_call
+
+
+def _timer() -> StageTimer:
+    timer = StageTimer()
+    for duration in [1.0, 2.0, 3.0]:
+        timer.add("ocr", duration)
+    timer.merge({"compress": [20.0], "ocr": [4.0]})
+    return timer
+
+
+def test_percentile() -> None:
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile([1.0, 2.0], 95) == 1.95
+
+
+def test_summary_sorted_by_total() -> None:
+    summary = _timer().summary()
+    assert list(summary) == ["compress", "ocr"]
+    assert summary["ocr"]["count"] == 4
+    assert summary["ocr"]["total"] == 10.0
+    assert summary["ocr"]["max"] == 4.0
+
+
+def test_save_report_json(tmp_path: Path) -> None:
+    path = tmp_path / "report.json"
+    _timer().save_report(path, extra={"files": 4})
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["files"] == 4
+    assert report["stages"]["compress"]["p50"] == 20.0
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_save_report_csv(tmp_path: Path) -> None:
+    path = tmp_path / "report.csv"
+    _timer().save_report(path)
+    with path.open(newline="", encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["stage", "count", "total", "mean", "p50", "p95", "max"]
+    assert [row[0] for row in rows[1:]] == ["compress", "ocr"]
+
+
+def test_profile_call_dumps_once_cumulated(tmp_path: Path) -> None:
+    for value in range(3):
+        assert profile_call(tmp_path, sorted, [value, 1]) == sorted([value, 1])
+    path = tmp_path / f"worker_{os.getpid()}.prof"
+    assert not path.exists()  # not after every call
+    dump_profile()
+    stats = pstats.Stats(path.as_posix()).stats
+    calls = [
+        stat[1] for func, stat in stats.items() if func[2] == "<built-in method builtins.sorted>"
+    ]
+    assert calls == [3]
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from photo2pdf.string_cleaning import KeywordMatcher
+from photo2pdf.string_cleaning import str_filter
+
+
+def test_keywords_on_own_lines() -> None:
+    matcher = KeywordMatcher(["Invoice", "ACME GmbH"])
+    text = "Invoice\nACME GmbH\r\nMain Street 1"
+    assert matcher.matches(text) == ["invoice", "acme gmbh"]
+
+
+def test_keywords_embedded_in_words() -> None:
+    matcher = KeywordMatcher(["voice"])
+    assert matcher.matches("Invoice\nno. 12") == []
+
+
+def test_str_filter_in_one_pass() -> None:
+    assert str_filter("Dear Sir,\tplease PAY!\r\n") == "dear sir please pay "
+    assert str_filter("a\u00a0b     c") == "a b c"
+
+
+def test_overlapping_keywords() -> None:
+    matcher = KeywordMatcher(["he", "she", "hers", "his"], whole_words=False)
+    assert matcher.find_all("ushers") == [(1, "she"), (2, "he"), (2, "hers")]
+    assert matcher.matches("This") == ["his"]
+
+
+def test_keyword_across_line_break() -> None:
+    matcher = KeywordMatcher(["ACME GmbH", "acme gmbh", ""])
+    assert matcher.keywords == ["acme gmbh"]
+    assert matcher.matches("Sender: ACME\nGmbH, Berlin") == ["acme gmbh"]
+
+
+def test_keywords_from_file(tmp_path: Path) -> None:
+    path = tmp_path / "keywords.txt"
+    path.write_text("\ufeffInvoice # bill\n# comment only\nTax Office\n", encoding="utf-8")
+    matcher = KeywordMatcher.from_file(path)
+    assert matcher.keywords == ["invoice", "tax office"]
+    assert matcher.matches("TAX OFFICE: invoice") == ["tax office", "invoice"]
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from photo2pdf import feature_training
+from photo2pdf.feature_training import separating_threshold
+from photo2pdf.feature_training import train_thresholds
+from photo2pdf.template_bank import TemplateBank
+from photo2pdf.template_bank import load_template_bank
+from photo2pdf.template_bank import load_threshold_profile
+from photo2pdf.template_bank import save_threshold_profile
+
+
+def _binarize(img: np.ndarray) -> np.ndarray:
+    return np.where(img < 128, 255, 0).astype(np.uint8)
+
+
+def _feature() -> np.ndarray:
+    img = np.full((40, 40), 255, dtype=np.uint8)
+    img[:10, :] = 0  # asymmetric, so every rotation differs
+    img[:, :5] = 0
+    return img
+
+
+def test_bank_holds_all_variants() -> None:
+    img = _feature()
+    bank = TemplateBank.build(img, _binarize)
+    assert bank.templates.shape == (3, 4, 3, 40, 40)
+    for rotation in range(4):
+        np.testing.assert_array_equal(bank.get(rotation, "raw"), np.rot90(img, rotation))
+        positive = bank.get(rotation)
+        np.testing.assert_array_equal(positive, _binarize(np.rot90(img, rotation)))
+        np.testing.assert_array_equal(bank.get(rotation, "negative"), 255 - positive)
+    assert bank.get(1, scale=0.5).shape == (20, 20)
+    assert bank.get(5, scale=0.25).shape == (10, 10)
+    np.testing.assert_array_equal(bank.get(5, scale=0.25), bank.get(1, scale=0.25))
+
+
+def test_bank_gets_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", (tmp_path / "cache").as_posix())
+    path_feature = tmp_path / "feature.png"
+    cv2.imwrite(path_feature.as_posix(), _feature())
+    bank = load_template_bank(path_feature, _binarize)
+    assert load_template_bank(path_feature, _binarize) is bank
+    cached = list((tmp_path / "cache" / "photo2pdf").glob("template_bank_*.npy"))
+    assert len(cached) == 1
+    np.testing.assert_array_equal(np.load(cached[0]), bank.templates)
+
+
+def test_threshold_profile_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "profile.json"
+    assert load_threshold_profile(path) == {}
+    profile = {"0.5": {"thresholds": [[0.6, 0.5]] * 4, "samples": 3}}
+    assert save_threshold_profile(profile, path) == path
+    assert load_threshold_profile(path) == profile
+    path.write_text("{", encoding="utf-8")
+    assert load_threshold_profile(path) == {}
+
+
+def test_separating_threshold() -> None:
+    assert separating_threshold([0.8] * 10, [0.4] * 10) == 0.6
+    assert separating_threshold([0.8] * 10, []) == 0.4
+    # overlapping scores stay just below the weak hits
+    assert separating_threshold([0.5] * 10, [0.7] * 10) == 0.45
+    assert separating_threshold([0.05] * 10, []) == 0.1
+
+
+def _fake_match_scores(task: tuple[Path, float]) -> list[tuple[tuple, tuple | None]] | None:
+    path, _scale = task
+    if path.name == "unreadable.jpg":
+        return None
+    return [((0.8, 0.7), (0.4, 0.3))] * 4
+
+
+def test_train_merges_into_profile(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(feature_training, "match_scores", _fake_match_scores)
+    path_profile = tmp_path / "profile.json"
+    other = {"1.0": {"thresholds": [[0.3, 0.3]] * 4, "samples": 9}}
+    save_threshold_profile(other, path_profile)
+    files = [tmp_path / "a.jpg", tmp_path / "b.jpg", tmp_path / "unreadable.jpg"]
+    profile = train_thresholds(files, (0.5,), jobs=1, path_profile=path_profile)
+    assert profile["1.0"] == other["1.0"]
+    assert profile["0.5"] == {"thresholds": [[0.6, 0.5]] * 4, "samples": 2}
+    assert load_threshold_profile(path_profile) == profile
@@ -0,0 +1,72 @@
+import sqlite3
+from pathlib import Path
+
+from photo2pdf.work_queue import WorkQueue
+from photo2pdf.work_queue import attempts_max
+from photo2pdf.work_queue import queue_name
+
+
+def _queue(tmp_path: Path, lease_s: float = 60) -> WorkQueue:
+    for name in ["a.jpg", "b.jpg"]:
+        (tmp_path / name).touch()
+    queue = WorkQueue(tmp_path / queue_name, lease_s=lease_s)
+    queue.enqueue([tmp_path / "a.jpg", tmp_path / "b.jpg"])
+    return queue
+
+
+def test_enqueue_ignores_known_files(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    assert queue.enqueue([tmp_path / "a.jpg"]) == 0
+    assert queue.stats() == {"pending": 2}
+
+
+def test_settings_round_trip(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    queue.set_settings({"sheet_size_mm": [210, 297], "keywords_path": None})
+    assert queue.get_settings() == {"sheet_size_mm": [210, 297], "keywords_path": None}
+
+
+def test_lease_complete(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    items = queue.lease("w1", 2)
+    assert [path.name for _, path in items] == ["a.jpg", "b.jpg"]
+    assert queue.lease("w2") == []
+    queue.complete(items[0][0], "w1", durations={"total": [1.0]})
+    queue.complete(items[1][0], "w2")  # not the owner -> ignored
+    assert queue.stats() == {"done": 1, "leased": 1}
+
+
+def test_reported_errors_are_retried_up_to_attempts_max(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    for _ in range(attempts_max):
+        item_id, _ = queue.lease("w1")[0]
+        queue.complete(item_id, "w1", error="broken")
+    assert queue.stats() == {"failed": 1, "pending": 1}
+
+
+def test_expired_leases_are_reclaimed_until_attempts_max(tmp_path: Path) -> None:
+    queue = _queue(tmp_path, lease_s=-1)  # every lease is expired right away
+    for attempt in range(1, attempts_max + 1):
+        items = queue.lease("crashing", 2)
+        assert len(items) == 2, f"attempt {attempt}"
+    assert queue.lease("w2") == []
+    assert queue.stats() == {"failed": 2}
+    with sqlite3.connect(queue.path) as db:
+        errors = db.execute("SELECT DISTINCT error FROM items").fetchall()
+    assert errors == [("lease expired",)]
+
+
+def test_release_does_not_count_the_attempt(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    for _ in range(attempts_max + 1):
+        queue.lease("w1", 2)
+        queue.release("w1")
+    assert queue.stats() == {"pending": 2}
+    assert len(queue.lease("w1", 2)) == 2
+
+
+def test_heartbeat_extends_only_own_leases(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    queue.lease("w1")
+    queue.lease("w2")
+    assert queue.heartbeat("w1") == 1
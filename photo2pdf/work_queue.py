@@ -0,0 +1,277 @@
+"""Shared work-queue in a SQLite-file, so several machines can process one archive.
+
+`enqueue` registers images, `worker`s (any number, on any machine that sees the
+share) lease items for a limited time and keep the lease alive with heartbeats.
+Leases of crashed or disconnected workers expire and the items return to the queue,
+an item fails after attempts_max leases (i.e. if it kills every worker).
+Paths are stored relative to the queue-file, so the share may be mounted differently.
+
+NOTE: SQLite relies on file-locks, these work on local disks & SMB, but are
+unreliable on some NFS-setups -> put the queue on a share with working locks.
+NOTE: lease_until is set & checked with time.time() of each host, so the clocks
+of all machines must be synced (i.e. NTP), otherwise leases expire early or late.
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from .logger import log
+from .main_processing import ImageProcessor
+
+queue_name = ".photo2pdf_queue.sqlite"
+lease_default_s = 300
+attempts_max = 3
+
+_schema = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    durations TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_until);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class WorkQueue:
+    """Items are 'pending' -> 'leased' -> 'done' / 'failed' (or back to 'pending')."""
+
+    def __init__(self, path: Path, *, lease_s: float = lease_default_s) -> None:
+        self.path = path
+        self.root = path.parent
+        self.lease_s = lease_s
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA busy_timeout = 60000")
+        self._db.executescript(_schema)
+        self._lock = threading.Lock()  # heartbeat-thread shares the connection
+
+    def close(self) -> None:
+        self._db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write-transaction, IMMEDIATE takes the lock up front (no upgrade-deadlocks)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _relative(self, path: Path) -> str:
+        return path.resolve().relative_to(self.root.resolve()).as_posix()
+
+    def set_settings(self, settings: dict) -> None:
+        """Processing-options for all workers (keyword-arguments of ImageProcessor)."""
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in settings.items()],
+            )
+
+    def get_settings(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT key, value FROM settings").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def enqueue(self, files: Iterable[Path], *, retry_failed: bool = False) -> int:
+        """Register files (below the directory of the queue), known files are ignored.
+
+        :return: number of new items
+        """
+        now = time.time()
+        with self._transaction() as db:
+            count = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO items (path, updated) VALUES (?, ?)",
+                [(self._relative(file), now) for file in files],
+            )
+            added = db.total_changes - count
+            if retry_failed:
+                db.execute(
+                    "UPDATE items SET state = 'pending', attempts = 0, error = NULL "
+                    "WHERE state = 'failed'"
+                )
+        return added
+
+    def lease(self, owner: str, count: int = 1) -> list[tuple[int, Path]]:
+        """Take up to count items, expired leases of other workers are reclaimed first."""
+        # local clock decides about expiry of foreign leases -> hosts must be in sync
+        now = time.time()
+        with self._transaction() as db:
+            # the attempt was counted when leased -> an item that keeps killing its
+            # worker (never reaching complete()) fails after attempts_max as well
+            reclaimed = db.execute(
+                "UPDATE items SET state = CASE WHEN attempts < ? THEN 'pending' "
+                "ELSE 'failed' END, owner = NULL, "
+                "error = CASE WHEN attempts < ? THEN error ELSE 'lease expired' END, "
+                "updated = ? WHERE state = 'leased' AND lease_until < ?",
+                (attempts_max, attempts_max, now, now),
+            ).rowcount
+            if reclaimed:
+                log.info(f"\t-> reclaimed {reclaimed} expired leases")
+            rows = db.execute(
+                "SELECT id, path FROM items WHERE state = 'pending' ORDER BY id LIMIT ?",
+                (count,),
+            ).fetchall()
+            db.executemany(
+                "UPDATE items SET state = 'leased', owner = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                [(owner, now + self.lease_s, now, item_id) for item_id, _ in rows],
+            )
+        return [(item_id, self.root / path) for item_id, path in rows]
+
+    def heartbeat(self, owner: str) -> int:
+        """Extend all leases of owner, returns number of held leases."""
+        now = time.time()
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE items SET lease_until = ?, updated = ? "
+                "WHERE state = 'leased' AND owner = ?",
+                (now + self.lease_s, now, owner),
+            ).rowcount
+
+    def complete(
+        self,
+        item_id: int,
+        owner: str,
+        *,
+        error: str | None = None,
+        durations: dict | None = None,
+    ) -> None:
+        """Commit result of a leased item, failed items are retried up to attempts_max."""
+        now = time.time()
+        with self._transaction() as db:
+            if error is None:
+                db.execute(
+                    "UPDATE items SET state = 'done', owner = NULL, error = NULL, durations = ?, "
+                    "updated = ? WHERE id = ? AND owner = ?",
+                    (json.dumps(durations), now, item_id, owner),
+                )
+            else:
+                db.execute(
+                    "UPDATE items SET state = CASE WHEN attempts < ? THEN 'pending' "
+                    "ELSE 'failed' END, owner = NULL, error = ?, updated = ? "
+                    "WHERE id = ? AND owner = ?",
+                    (attempts_max, error, now, item_id, owner),
+                )
+
+    def release(self, owner: str) -> None:
+        """Return all leases of owner (i.e. on shutdown), attempt is not counted."""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE items SET state = 'pending', owner = NULL, attempts = attempts - 1 "
+                "WHERE state = 'leased' AND owner = ?",
+                (owner,),
+            )
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM items GROUP BY state").fetchall()
+        return dict(rows)
+
+
+def worker_name() -> str:
+    """Owner of leases, unique per process across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _Heartbeat(threading.Thread):
+    """Keeps leases alive while a (long) file is processed."""
+
+    def __init__(self, queue: WorkQueue, owner: str) -> None:
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.owner = owner
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.queue.lease_s / 3):
+            try:
+                self.queue.heartbeat(self.owner)
+            except sqlite3.OperationalError as xpt:
+                log.warning(f"\t-> heartbeat failed: {xpt!r}")
+
+
+def run_worker(
+    path_queue: Path,
+    *,
+    lease_s: float = lease_default_s,
+    batch: int = 1,
+    wait_s: float | None = None,
+) -> int:
+    """Lease & process items until the queue is empty.
+
+    :param batch: items leased at once (fewer round-trips, but longer leases)
+    :param wait_s: poll an empty queue for new items in this interval, instead of exiting
+    :return: number of processed items
+    """
+    queue = WorkQueue(path_queue, lease_s=lease_s)
+    owner = worker_name()
+    settings = queue.get_settings()
+    if "sheet_size_mm" in settings and settings["sheet_size_mm"] is not None:
+        settings["sheet_size_mm"] = tuple(settings["sheet_size_mm"])
+    if settings.get("keywords_path") is not None:
+        settings["keywords_path"] = Path(settings["keywords_path"])
+    processor = ImageProcessor(path=queue.root, use_manifest=False, **settings)
+    heartbeat = _Heartbeat(queue, owner)
+    heartbeat.start()
+    processed = 0
+    try:
+        while True:
+            items = queue.lease(owner, batch)
+            if not items:
+                if wait_s is None:
+                    break
+                time.sleep(wait_s)
+                continue
+            for item_id, path in items:
+                result = processor.process_one(path)
+                queue.complete(item_id, owner, error=result.error, durations=result.durations)
+                processed += 1
+    finally:
+        heartbeat.stopped.set()
+        queue.release(owner)
+        queue.close()
+    log.info(f"\t-> worker {owner} processed {processed} items")
+    return processed
+
+
+def run_workers(
+    path_queue: Path,
+    jobs: int,
+    *,
+    lease_s: float = lease_default_s,
+    batch: int = 1,
+    wait_s: float | None = None,
+) -> None:
+    """Start several local worker-processes (each with own lease-owner)."""
+    kwargs = {"lease_s": lease_s, "batch": batch, "wait_s": wait_s}
+    if jobs <= 1:
+        run_worker(path_queue, **kwargs)
+        return
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(path_queue,), kwargs=kwargs)
+        for _ in range(jobs)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()